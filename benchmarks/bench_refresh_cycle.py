@@ -0,0 +1,443 @@
+"""Refresh-cycle benchmarks against the local mock Techem server.
+
+Run from the repository root with:
+
+    pip install -r benchmarks/requirements.txt
+    pytest benchmarks
+"""
+from __future__ import annotations
+import asyncio
+from datetime import date, timedelta
+import pathlib
+import sys
+import time
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from tests.common import (  # noqa: E402, F401
+    EMAIL,
+    PASSWORD,
+    auto_enable_custom_integrations,
+    config_dir,
+    config_entry,
+    lifted_rate_limit,
+    mock_techem,
+    techem_entry,
+)
+from custom_components.techem.const import CONF_COMPARISON_DAYS, CONF_MAX_CONCURRENCY, DOMAIN  # noqa: E402
+from custom_components.techem import resilience  # noqa: E402
+from custom_components.techem.anomaly import ObjectDetector  # noqa: E402
+from custom_components.techem.resilience import PRIORITY_INTERACTIVE, TokenBucket, request_priority  # noqa: E402
+from custom_components.techem.export import export  # noqa: E402
+from custom_components.techem.history import HistoryStore  # noqa: E402
+from custom_components.techem.techem_api import TechemAPI, TechemError  # noqa: E402
+
+REFRESHES = 10
+STATE_WRITE_ROUNDS = 20
+
+
+def report(name: str, **values) -> None:
+    """Print one benchmark result line."""
+    fields = "  ".join(
+        f"{key}={value:.4f}" if isinstance(value, float) else f"{key}={value}"
+        for key, value in values.items()
+    )
+    print(f"\n[bench] {name}: {fields}")
+
+
+@pytest.fixture(autouse=True)
+def rate_limit(lifted_rate_limit) -> None:
+    """Lift the entries' per-host rate limit.
+
+    Benchmarks measure the integration rather than the limiter, which
+    bench_rate_limiter_priority covers.
+    """
+
+
+@pytest.fixture
+def expected_lingering_timers() -> bool:
+    """Allow the delayed snapshot write to outlive a benchmark."""
+    return True
+
+
+def _entry(
+    hass: HomeAssistant,
+    objects: int = 1,
+    max_concurrency: int = 4,
+    first_object: int = 0,
+    comparison_days: list[int] | None = None,
+) -> MockConfigEntry:
+    """Return a Techem config entry with the given number of objects, added to hass."""
+    return techem_entry(
+        hass,
+        [f"bench-object-{index}" for index in range(first_object, first_object + objects)],
+        unique_id=f"dk_{EMAIL}_{first_object}",
+        options={CONF_MAX_CONCURRENCY: max_concurrency, CONF_COMPARISON_DAYS: comparison_days or []},
+    )
+
+
+async def _setup(hass: HomeAssistant, entry: MockConfigEntry) -> float:
+    """Set up the entry, wait for background work and return the setup wall time in seconds."""
+    start = time.perf_counter()
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    elapsed = time.perf_counter() - start
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    while any(not task.done() for task in coordinator._fill_tasks.values()):
+        await asyncio.sleep(0.01)
+    return elapsed
+
+
+async def bench_requests_per_refresh(hass, mock_techem, config_entry):
+    """Count HTTP requests and logins per coordinator refresh."""
+    await _setup(hass, config_entry)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+
+    mock_techem.reset_counters()
+    start = time.perf_counter()
+    for _ in range(REFRESHES):
+        await coordinator.async_refresh()
+    elapsed = time.perf_counter() - start
+
+    report(
+        "requests_per_refresh",
+        requests=mock_techem.requests / REFRESHES,
+        logins=mock_techem.logins / REFRESHES,
+        bytes_in=mock_techem.bytes_in / REFRESHES,
+        bytes_out=mock_techem.bytes_out / REFRESHES,
+        seconds=elapsed / REFRESHES,
+    )
+    # One request per object and refresh, on the token from setup
+    assert mock_techem.requests == REFRESHES
+    assert mock_techem.logins == 0
+    await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.parametrize("latency", [0.0, 0.05, 0.2])
+async def bench_setup_entry_wall_time(hass, mock_techem, config_entry, latency):
+    """Measure async_setup_entry wall time with server latency."""
+    mock_techem.latency = latency
+    elapsed = await _setup(hass, config_entry)
+    report(
+        "setup_entry",
+        latency=latency,
+        seconds=elapsed,
+        requests=mock_techem.requests,
+        logins=mock_techem.logins,
+    )
+    await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.parametrize("rooms", [1, 10, 50])
+async def bench_entity_update_cost(hass, mock_techem, config_entry, rooms):
+    """Measure per-entity state write cost as rooms and meters grow."""
+    mock_techem.rooms = rooms
+    mock_techem.meters_per_room = 3
+    await _setup(hass, config_entry)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    entities = len(hass.states.async_entity_ids("sensor"))
+
+    start = time.perf_counter()
+    for _ in range(STATE_WRITE_ROUNDS):
+        coordinator.async_set_updated_data(coordinator.data)
+        await hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+
+    report(
+        "entity_update_cost",
+        rooms=rooms,
+        meters=rooms * 3,
+        entities=entities,
+        round_ms=elapsed / STATE_WRITE_ROUNDS * 1000,
+        per_entity_us=elapsed / STATE_WRITE_ROUNDS / max(entities, 1) * 1e6,
+    )
+    await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.parametrize(("objects", "max_concurrency"), [(1, 1), (8, 1), (8, 4), (8, 8)])
+async def bench_multi_object_refresh(hass, mock_techem, objects, max_concurrency):
+    """Measure refresh wall time against object count and concurrency budget."""
+    entry = _entry(hass, objects, max_concurrency)
+    await _setup(hass, entry)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    mock_techem.latency = 0.05
+    mock_techem.reset_counters()
+    start = time.perf_counter()
+    await coordinator.async_refresh()
+    elapsed = time.perf_counter() - start
+
+    report(
+        "multi_object_refresh",
+        objects=objects,
+        max_concurrency=max_concurrency,
+        seconds=elapsed,
+        requests=mock_techem.requests,
+        logins=mock_techem.logins,
+    )
+    assert mock_techem.requests == objects
+    assert mock_techem.logins == 0
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+@pytest.mark.parametrize("callers", [1, 10])
+async def bench_concurrent_callers(hass, mock_techem, callers):
+    """Count requests when several callers ask for the same data at once."""
+    api = TechemAPI(async_get_clientsession(hass), EMAIL, PASSWORD, "dk")
+    mock_techem.latency = 0.05
+
+    start = time.perf_counter()
+    await asyncio.gather(*(api.get_all_data("bench-object-0") for _ in range(callers)))
+    elapsed = time.perf_counter() - start
+
+    report(
+        "concurrent_callers",
+        callers=callers,
+        seconds=elapsed,
+        requests=mock_techem.requests,
+        logins=mock_techem.logins,
+    )
+
+
+@pytest.mark.parametrize(("failures", "status"), [(2, 502), (2, 429), (20, 503)])
+async def bench_transient_failures(hass, mock_techem, monkeypatch, failures, status):
+    """Measure refresh outcome and requests sent while Techem is failing."""
+    monkeypatch.setattr(resilience, "BACKOFF_BASE", 0.01)
+    api = TechemAPI(async_get_clientsession(hass), EMAIL, PASSWORD, "dk")
+    await api.get_token()
+    mock_techem.reset_counters()
+    mock_techem.fail_next(failures, status)
+
+    outcomes = []
+    start = time.perf_counter()
+    for _ in range(3):
+        try:
+            await api.get_all_data("bench-object-0")
+            outcomes.append("ok")
+        except TechemError as err:
+            outcomes.append(type(err).__name__)
+    elapsed = time.perf_counter() - start
+
+    report(
+        "transient_failures",
+        failures=failures,
+        status=status,
+        outcomes=",".join(outcomes),
+        breaker=api.breaker.state,
+        seconds=elapsed,
+        requests=mock_techem.requests,
+    )
+
+
+@pytest.mark.parametrize("persisted_queries", [True, False])
+async def bench_persisted_queries(hass, mock_techem, config_entry, persisted_queries):
+    """Compare upload bytes per refresh with and without persisted query support."""
+    mock_techem.persisted_queries = persisted_queries
+    await _setup(hass, config_entry)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+
+    mock_techem.reset_counters()
+    for _ in range(REFRESHES):
+        await coordinator.async_refresh()
+
+    report(
+        "persisted_queries",
+        supported=persisted_queries,
+        requests=mock_techem.requests / REFRESHES,
+        bytes_in=mock_techem.bytes_in / REFRESHES,
+        client=coordinator.api.persisted_queries,
+    )
+    await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+async def bench_bulk_export(hass, mock_techem, tmp_path, workers):
+    """Measure a year-long export of two objects and check that a rerun resumes."""
+    api = TechemAPI(async_get_clientsession(hass), EMAIL, PASSWORD, "dk")
+    mock_techem.latency = 0.05
+    output = str(tmp_path / "history.csv")
+    object_ids = ["bench-object-0", "bench-object-1"]
+
+    start = time.perf_counter()
+    windows = await export(api, object_ids, date(2024, 1, 1), date(2025, 1, 1), output, workers=workers)
+    elapsed = time.perf_counter() - start
+    requests = mock_techem.requests
+    resumed = await export(api, object_ids, date(2024, 1, 1), date(2025, 1, 1), output, workers=workers)
+    # The rerun finds every window in the checkpoint
+    assert resumed == 0
+    assert mock_techem.requests == requests
+
+    with open(output, encoding="utf-8") as file:
+        lines = sum(1 for _ in file)
+    report(
+        "bulk_export",
+        workers=workers,
+        windows=windows,
+        rows=lines - 1,
+        seconds=elapsed,
+        requests=requests,
+        resumed_windows=resumed,
+    )
+
+
+@pytest.mark.parametrize("entries", [1, 4])
+async def bench_shared_clients(hass, mock_techem, entries):
+    """Count logins when several entries of one account are set up."""
+    added = [_entry(hass, first_object=index) for index in range(entries)]
+    # Setting up the integration sets up every entry added so far
+    elapsed = await _setup(hass, added[0])
+    for entry in added[1:]:
+        while any(not task.done() for task in hass.data[DOMAIN][entry.entry_id]._fill_tasks.values()):
+            await asyncio.sleep(0.01)
+
+    report(
+        "shared_clients",
+        entries=entries,
+        seconds=elapsed,
+        requests=mock_techem.requests,
+        logins=mock_techem.logins,
+    )
+    assert mock_techem.logins == 1
+    for entry in added:
+        await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def bench_rate_limiter_priority(hass, mock_techem):
+    """Measure an interactive request queued behind background requests on a rate-limited host."""
+    limiter = TokenBucket(rate=20.0, burst=1)
+    api = TechemAPI(
+        async_get_clientsession(hass), EMAIL, PASSWORD, "dk", limiter
+    )
+    await api.get_token()
+    await api.get_kpi_data("bench-object-0")
+
+    start = time.perf_counter()
+    background = [asyncio.create_task(api.get_kpi_data(f"bench-object-{index}")) for index in range(1, 21)]
+    await asyncio.sleep(0.01)
+    token = request_priority.set(PRIORITY_INTERACTIVE)
+    try:
+        await api.get_kpi_data("bench-object-interactive")
+    finally:
+        request_priority.reset(token)
+    interactive = time.perf_counter() - start
+    await asyncio.gather(*background)
+    elapsed = time.perf_counter() - start
+
+    report(
+        "rate_limiter_priority",
+        rate=limiter.rate,
+        background=len(background),
+        interactive_seconds=interactive,
+        background_seconds=elapsed,
+        waited=limiter.waited,
+    )
+
+
+@pytest.mark.parametrize("scope", [["weekly"], ["kpi"], ["yearly", "weekly", "kpi", "meters"]])
+async def bench_scoped_refresh(hass, mock_techem, config_entry, scope):
+    """Measure a techem.refresh service call for a scope, after its document is registered."""
+    await _setup(hass, config_entry)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    await coordinator.async_refresh_scope(coordinator.object_ids, frozenset(scope))
+    coordinator._scoped_done.clear()
+
+    mock_techem.reset_counters()
+    response = await hass.services.async_call(
+        DOMAIN, "refresh", {"scope": scope}, blocking=True, return_response=True
+    )
+
+    report(
+        "scoped_refresh",
+        scope="+".join(scope),
+        seconds=response["duration"],
+        requests=mock_techem.requests,
+        bytes_in=mock_techem.bytes_in,
+        bytes_out=mock_techem.bytes_out,
+    )
+    await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.parametrize("windows", [0, 10, 50])
+async def bench_comparison_windows(hass, mock_techem, windows):
+    """Count requests and time per refresh with custom comparison windows summed from the history."""
+    entry = _entry(hass, comparison_days=list(range(7, 7 + windows)))
+    await _setup(hass, entry)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    mock_techem.reset_counters()
+    start = time.perf_counter()
+    for _ in range(REFRESHES):
+        await coordinator.async_refresh()
+    elapsed = time.perf_counter() - start
+
+    object_data = coordinator.data[coordinator.object_ids[0]]
+    report(
+        "comparison_windows",
+        windows=len(object_data.comparisons),
+        requests=mock_techem.requests / REFRESHES,
+        bytes_in=mock_techem.bytes_in / REFRESHES,
+        seconds=elapsed / REFRESHES,
+    )
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+@pytest.mark.parametrize("meters", [10, 100, 1000])
+async def bench_anomaly_update(meters):
+    """Time one settled day fed to the anomaly detector of an object with many meters."""
+    detector = ObjectDetector()
+    first = date(2024, 1, 1)
+    for offset in range(60):
+        day = first + timedelta(days=offset)
+        detector.update({day: {"values": [1.0, 0.1], "meters": {str(n): float(n % 7) for n in range(meters)}}}, day)
+
+    day = first + timedelta(days=60)
+    daily = {day: {"values": [1.0, 0.5], "meters": {str(n): float(n % 5) for n in range(meters)}}}
+    start = time.perf_counter()
+    started = detector.update(daily, day)
+    elapsed = time.perf_counter() - start
+
+    report(
+        "anomaly_update",
+        meters=meters,
+        seconds=elapsed,
+        per_series_us=elapsed / (meters + 1) * 1e6,
+        anomalies=len(started),
+    )
+
+
+@pytest.mark.parametrize("meters", [10, 100, 1000])
+async def bench_history_store(hass, meters):
+    """Time loading five years of history for many meters and summing each meter's whole range."""
+    years = 5
+    first = date(2021, 1, 1)
+    end = date(first.year + years, 1, 1)
+    store = HistoryStore(hass, f"bench_{meters}")
+    day = first
+    while day < end:
+        store.update(
+            "bench-object", {day: {"values": [1.0, 0.1], "meters": {str(n): 1.0 for n in range(meters)}}}, end
+        )
+        day += timedelta(days=1)
+    await store.async_save()
+
+    start = time.perf_counter()
+    loaded = HistoryStore(hass, f"bench_{meters}")
+    await loaded.async_load()
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    totals = [loaded.sum("bench-object", f"meter_{n}", first, end) for n in range(meters)]
+    query = time.perf_counter() - start
+
+    assert totals == [float((end - first).days)] * meters
+    report(
+        "history_store",
+        meters=meters,
+        years=years,
+        file_bytes=pathlib.Path(loaded.path).stat().st_size,
+        load_seconds=load,
+        sum_seconds=query,
+    )
@@ -1,16 +1,110 @@
 """Techem Energy Monitor integration."""
 from __future__ import annotations
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
 from homeassistant.core import HomeAssistant
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.event import async_track_time_interval
+from .const import (
+    DOMAIN,
+    CONF_COMPARISON_DAYS,
+    CONF_COUNTRY,
+    CONF_MAX_CONCURRENCY,
+    CONF_OBJECT_ID,
+    CONF_OBJECT_IDS,
+    DEFAULT_MAX_CONCURRENCY,
+)
+from .clients import account_key, account_unique_id, async_get_registry
+from .coordinator import TechemCoordinator, async_remove_stores, token_store
+from .importer import IMPORT_INTERVAL, TechemStatisticsImporter
+from .services import async_setup_services
 
-DOMAIN = "techem"
-PLATFORMS = ["sensor"]
+PLATFORMS = ["sensor", "binary_sensor"]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Register the Techem services."""
+    async_setup_services(hass)
+    return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Techem from a config entry."""
+    registry = async_get_registry(hass)
+    api = registry.acquire(
+        entry.data[CONF_EMAIL],
+        entry.data[CONF_PASSWORD],
+        entry.data[CONF_COUNTRY]
+    )
+    entry.async_on_unload(lambda: registry.release(api))
+    object_ids = entry.data[CONF_OBJECT_IDS]
+    coordinator = TechemCoordinator(
+        hass,
+        entry,
+        api,
+        object_ids,
+        entry.options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY),
+        entry.options.get(CONF_COMPARISON_DAYS, []),
+    )
+    await coordinator.async_load_stores()
+    # Start from the last snapshot when there is one, so setup does not wait on Techem
+    restored = await coordinator.async_restore_snapshot()
+    if not restored:
+        await coordinator.async_config_entry_first_refresh()
+
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    if restored:
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN}_refresh_{entry.entry_id}"
+        )
+
+    if "recorder" in hass.config.components:
+        importer = TechemStatisticsImporter(hass, entry.entry_id, coordinator)
+        entry.async_on_unload(
+            async_track_time_interval(hass, importer.async_run, IMPORT_INTERVAL)
+        )
+        entry.async_create_background_task(
+            hass, importer.async_run(), f"{DOMAIN}_statistics_{entry.entry_id}"
+        )
+    return True
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate an entry for a single object to the list of object ids.
+
+    The entry's unique id, which was the object id, becomes that of its
+    account, unless another entry of the account already has it.
+    """
+    if entry.version == 1:
+        data = {**entry.data}
+        data[CONF_OBJECT_IDS] = [data.pop(CONF_OBJECT_ID)]
+        unique_id = account_unique_id(data[CONF_EMAIL], data[CONF_COUNTRY])
+        if any(
+            other.entry_id != entry.entry_id and other.unique_id == unique_id
+            for other in hass.config_entries.async_entries(DOMAIN)
+        ):
+            unique_id = entry.unique_id
+        hass.config_entries.async_update_entry(entry, data=data, unique_id=unique_id, version=2)
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        hass.data[DOMAIN].pop(entry.entry_id)
+    return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the data persisted for a deleted config entry, and its account's token if no other entry uses it."""
+    await async_remove_stores(hass, entry.entry_id)
+    email, country = entry.data[CONF_EMAIL], entry.data[CONF_COUNTRY]
+    account = account_key(email, country)
+    if not any(
+        other.entry_id != entry.entry_id and account_key(other.data[CONF_EMAIL], other.data[CONF_COUNTRY]) == account
+        for other in hass.config_entries.async_entries(DOMAIN)
+    ):
+        await token_store(hass, email, country).async_remove()
@@ -0,0 +1,195 @@
+"""Streaming anomaly and leak detection on per-day Techem values."""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date
+import math
+from .history import daily_values
+from .storage import ObjectStore
+
+ANOMALY_STORE_VERSION = 1
+# Days weighted by the running mean and variance
+EWMA_SPAN = 28
+EWMA_ALPHA = 2 / (EWMA_SPAN + 1)
+# Days in a row a series must be active before its values are judged
+WARMUP_DAYS = 14
+# Standard deviations from the mean at which a day is out of range
+Z_LIMIT = 3.0
+# Share of the mean a day may always differ by, so near-constant series are not flagged for noise
+MIN_DEVIATION = 0.5
+# Smallest daily change that counts: m³ of water and heat cost allocator units. A series
+# whose mean is below it is idle, like a radiator in summer, and is not judged
+WATER_FLOOR = 0.02
+METER_FLOOR = 0.5
+# Weight with which the baseline follows days above it; a lower day replaces it
+BASELINE_ALPHA = 0.01
+# Days in a row above the usual use, by a standard deviation and at least the floor, before use counts as continuous
+LEAK_DAYS = 7
+# Series checked for continuous use
+LEAK_SERIES = ("water",)
+
+KIND_OUT_OF_RANGE = "out_of_range"
+KIND_CONTINUOUS_USE = "continuous_use"
+
+
+class RunningStats:
+    """Running statistics of one per-day series, updated in O(1) per day.
+
+    mean and var are exponentially weighted over about EWMA_SPAN days.
+    baseline is a lower envelope of the daily values: a day below it
+    replaces it and days above pull it up by BASELINE_ALPHA. Days are
+    judged once the mean has stayed above floor for WARMUP_DAYS, so a
+    series that starts after an idle season first learns its new level.
+    A day is out of range when it differs from the mean by more than
+    Z_LIMIT standard deviations, MIN_DEVIATION of the mean and floor.
+    A leak lifts even the lowest days, so streak counts the days in a row
+    that all exceeded limit, the mean plus a standard deviation and at
+    least floor when the streak started; any usual day ends it.
+    """
+
+    # Fields kept in persistent storage
+    FIELDS = ("day", "count", "value", "mean", "var", "baseline", "streak", "out_of_range", "active", "limit")
+    __slots__ = (*FIELDS, "floor")
+
+    def __init__(self, floor: float = 0.0):
+        """Initialize with no days seen, ignoring changes smaller than floor."""
+        self.floor = floor
+        self.day: int | None = None
+        self.count = 0
+        self.value = 0.0
+        self.mean = 0.0
+        self.var = 0.0
+        self.baseline = 0.0
+        self.streak = 0
+        self.out_of_range = False
+        self.active = 0
+        self.limit = 0.0
+
+    @property
+    def std(self) -> float:
+        """Return the running standard deviation."""
+        return math.sqrt(self.var)
+
+    @property
+    def continuous_use(self) -> bool:
+        """Return True after LEAK_DAYS days in a row above the usual use."""
+        return self.streak >= LEAK_DAYS
+
+    def update(self, day: date, value: float) -> bool:
+        """Add the value of a day after the last one seen, returning False for older days."""
+        ordinal = day.toordinal()
+        if self.day is not None and ordinal <= self.day:
+            return False
+        self.day = ordinal
+        self.value = value
+        if not self.count:
+            self.mean = self.baseline = value
+            self.count = 1
+            return True
+
+        judged = self.active >= WARMUP_DAYS
+        diff = value - self.mean
+        self.out_of_range = judged and abs(diff) > max(
+            Z_LIMIT * self.std, MIN_DEVIATION * abs(self.mean), self.floor
+        )
+        if not self.streak:
+            self.limit = self.mean + max(self.std, self.floor)
+        self.streak = self.streak + 1 if judged and value > self.limit else 0
+
+        self.mean += EWMA_ALPHA * diff
+        self.var = (1 - EWMA_ALPHA) * (self.var + EWMA_ALPHA * diff * diff)
+        self.active = self.active + 1 if self.mean >= self.floor else 0
+        if value < self.baseline:
+            self.baseline = value
+        else:
+            self.baseline += BASELINE_ALPHA * (value - self.baseline)
+        self.count += 1
+        return True
+
+    def as_list(self) -> list:
+        """Return the statistics for persistent storage."""
+        return [getattr(self, name) for name in self.FIELDS]
+
+    def restore(self, data: list) -> None:
+        """Load statistics previously returned by as_list."""
+        for name, value in zip(self.FIELDS, data):
+            setattr(self, name, value)
+        if len(data) < len(self.FIELDS):
+            # Written before the limit was kept, when streak counted days above the mean
+            self.streak = 0
+
+
+@dataclass(slots=True, frozen=True)
+class Anomaly:
+    """An anomaly that started on a day, with the series' statistics after that day."""
+
+    series: str
+    kind: str
+    day: date
+    value: float
+    mean: float
+    std: float
+    baseline: float
+
+    @classmethod
+    def of(cls, series: str, kind: str, day: date, stats: RunningStats) -> Anomaly:
+        """Return the anomaly with a copy of the statistics as they are now."""
+        return cls(series, kind, day, stats.value, stats.mean, stats.std, stats.baseline)
+
+
+class ObjectDetector:
+    """Running statistics of the water and meter series of one object."""
+
+    def __init__(self):
+        """Initialize with no series."""
+        self.series: dict[str, RunningStats] = {}
+
+    def _stats(self, name: str) -> RunningStats:
+        """Return the statistics of a series, creating them on first use."""
+        if (stats := self.series.get(name)) is None:
+            stats = self.series[name] = RunningStats(WATER_FLOOR if name == "water" else METER_FLOOR)
+        return stats
+
+    def update(self, daily: dict[date, dict], last: date) -> list[Anomaly]:
+        """Add settled per-day values as returned by TechemAPI.get_daily_data.
+
+        Days after last, which Techem may still revise, and days already
+        seen are skipped. Returns every anomaly that started, in the order
+        of its day.
+        """
+        started = []
+        for day in sorted(daily):
+            if day > last:
+                break
+            readings = [
+                (name, value) for name, value in daily_values(daily[day])
+                if name == "water" or name.startswith("meter_")
+            ]
+            for name, value in readings:
+                if value is None:
+                    continue
+                stats = self._stats(name)
+                was_out_of_range, was_continuous = stats.out_of_range, stats.continuous_use
+                if not stats.update(day, value):
+                    continue
+                if stats.out_of_range and not was_out_of_range:
+                    started.append(Anomaly.of(name, KIND_OUT_OF_RANGE, day, stats))
+                if name in LEAK_SERIES and stats.continuous_use and not was_continuous:
+                    started.append(Anomaly.of(name, KIND_CONTINUOUS_USE, day, stats))
+        return started
+
+    def as_dict(self) -> dict:
+        """Return every series' statistics for persistent storage."""
+        return {name: stats.as_list() for name, stats in self.series.items()}
+
+    def restore(self, data: dict) -> None:
+        """Load statistics previously returned by as_dict."""
+        for name, stats in data.items():
+            self._stats(name).restore(stats)
+
+
+class AnomalyStore(ObjectStore[ObjectDetector]):
+    """The detectors of every object of an entry, persisted to disk."""
+
+    name = "anomalies"
+    version = ANOMALY_STORE_VERSION
+    factory = ObjectDetector
@@ -0,0 +1,106 @@
+"""Binary sensor platform for Techem integration."""
+from __future__ import annotations
+from datetime import date
+import logging
+from homeassistant.components.binary_sensor import BinarySensorDeviceClass, BinarySensorEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from .anomaly import KIND_CONTINUOUS_USE, KIND_OUT_OF_RANGE, RunningStats
+from .const import DOMAIN
+from .coordinator import TechemCoordinator
+from .entity import TechemEntity
+
+_LOGGER = logging.getLogger(__name__)
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up Techem anomaly binary sensors.
+
+    Meter sensors are added on the first update whose statistics include
+    the meter, like the meter sensors.
+    """
+    coordinator: TechemCoordinator = hass.data[DOMAIN][entry.entry_id]
+    # Meter series that have sensors, per object
+    known: dict[str, set] = {object_id: set() for object_id in coordinator.object_ids}
+
+    sensors = []
+    for object_id in coordinator.object_ids:
+        sensors.extend([
+            TechemAnomalySensor(coordinator, object_id, "water", KIND_CONTINUOUS_USE, "Water Continuous Use"),
+            TechemAnomalySensor(coordinator, object_id, "water", KIND_OUT_OF_RANGE, "Water Out of Range"),
+        ])
+        sensors.extend(_meter_sensors(coordinator, object_id, known[object_id]))
+    async_add_entities(sensors)
+
+    @callback
+    def _async_add_new_sensors() -> None:
+        """Add sensors for meters the statistics hold for the first time."""
+        new_sensors = []
+        for object_id in coordinator.object_ids:
+            new_sensors.extend(_meter_sensors(coordinator, object_id, known[object_id]))
+        if new_sensors:
+            _LOGGER.debug("Adding %d new Techem anomaly sensors", len(new_sensors))
+            async_add_entities(new_sensors)
+
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_new_sensors))
+
+
+def _meter_sensors(coordinator: TechemCoordinator, object_id: str, known: set) -> list[BinarySensorEntity]:
+    """Return the out of range sensors of the meters of one object not in known yet."""
+    object_data = coordinator.data.get(object_id) if coordinator.data else None
+    meters = object_data.kpi.meters if object_data and object_data.kpi else {}
+    sensors = []
+    for series in coordinator.anomalies.get(object_id).series:
+        if series.startswith("meter_") and series not in known:
+            known.add(series)
+            number = series.removeprefix("meter_")
+            room = meters[number].room if number in meters else number
+            sensors.append(
+                TechemAnomalySensor(coordinator, object_id, series, KIND_OUT_OF_RANGE, f"Meter {room} Out of Range")
+            )
+    return sensors
+
+
+class TechemAnomalySensor(TechemEntity, BinarySensorEntity):
+    """Techem binary sensor that is on while a series is out of range or shows continuous use."""
+
+    def __init__(self, coordinator: TechemCoordinator, object_id: str, series: str, kind: str, name: str):
+        """Initialize the sensor and attach it to the object's device."""
+        super().__init__(coordinator, object_id)
+        self._series = series
+        self._kind = kind
+        self._attr_name = f"Techem {name}"
+        self._attr_unique_id = f"techem_{object_id}_{series}_{kind}"
+        self._attr_device_class = (
+            BinarySensorDeviceClass.MOISTURE if kind == KIND_CONTINUOUS_USE else BinarySensorDeviceClass.PROBLEM
+        )
+
+    def _stats(self) -> RunningStats | None:
+        """Return the running statistics of the sensor's series."""
+        return self.coordinator.anomalies.get(self._object_id).series.get(self._series)
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return True while the anomaly lasts, None before any settled day was seen."""
+        if (stats := self._stats()) is None:
+            return None
+        return stats.continuous_use if self._kind == KIND_CONTINUOUS_USE else stats.out_of_range
+
+    @property
+    def extra_state_attributes(self):
+        """Return the last settled day and the statistics it was judged by."""
+        if (stats := self._stats()) is None or stats.day is None:
+            return {}
+        return {
+            "day": date.fromordinal(stats.day).isoformat(),
+            "value": stats.value,
+            "mean": round(stats.mean, 3),
+            "std": round(stats.std, 3),
+            "baseline": round(stats.baseline, 3),
+            "limit": round(stats.limit, 3),
+            "days_above_limit": stats.streak,
+        }
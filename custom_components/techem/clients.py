@@ -0,0 +1,82 @@
+"""Techem clients shared by the config entries of an installation."""
+from __future__ import annotations
+from urllib.parse import urlsplit
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util import slugify
+from .const import COUNTRIES, DATA_CLIENTS, DOMAIN
+from .resilience import RATE_BURST, RATE_LIMIT, TokenBucket
+from .techem_api import TechemAPI
+
+
+def account_key(email: str, country: str) -> str:
+    """Return the key of a Techem account, the same for every entry of it."""
+    return slugify(f"{country}_{email.lower()}")
+
+
+def account_unique_id(email: str, country: str) -> str:
+    """Return the unique id of the config entry of a Techem account."""
+    return f"{country}_{email.lower()}"
+
+
+class TechemClientRegistry:
+    """One TechemAPI per (country, account) and one TokenBucket per Techem host.
+
+    Entries of the same account share a client, and with it the token,
+    single-flight requests, circuit breaker and metrics. Every client of
+    a host shares its rate limiter. Clients are counted per entry and
+    dropped when the last entry using them unloads.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, rate: float = RATE_LIMIT, burst: int = RATE_BURST):
+        """Initialize an empty registry on the shared HTTP session, limiting each host to rate and burst."""
+        self._session = session
+        self._rate = rate
+        self._burst = burst
+        # (country, email) -> [client, number of entries using it]
+        self._clients: dict[tuple[str, str], list] = {}
+        self._limiters: dict[str, TokenBucket] = {}
+
+    def acquire(self, email: str, password: str, country: str) -> TechemAPI:
+        """Return the client of an account, creating it on first use.
+
+        A client already in use keeps its password, which only changes
+        through set_password once a new one was validated.
+        """
+        key = (country, email.lower())
+        if (client := self._clients.get(key)) is None:
+            api = TechemAPI(self._session, email, password, country, self.limiter(country))
+            client = self._clients[key] = [api, 0]
+        client[1] += 1
+        return client[0]
+
+    def set_password(self, email: str, password: str, country: str) -> None:
+        """Give the client of an account, if one is in use, a validated password and drop its token."""
+        if (client := self._clients.get((country, email.lower()))) is not None and client[0].password != password:
+            client[0].password = password
+            client[0].token_manager.invalidate()
+
+    def release(self, api: TechemAPI) -> None:
+        """Drop an entry's use of a client, forgetting the client once unused."""
+        for key, client in self._clients.items():
+            if client[0] is api:
+                client[1] -= 1
+                if not client[1]:
+                    del self._clients[key]
+                return
+
+    def limiter(self, country: str) -> TokenBucket:
+        """Return the rate limiter of a country's Techem host."""
+        host = urlsplit(COUNTRIES[country]["url"]).netloc
+        if (limiter := self._limiters.get(host)) is None:
+            limiter = self._limiters[host] = TokenBucket(self._rate, self._burst)
+        return limiter
+
+
+def async_get_registry(hass: HomeAssistant) -> TechemClientRegistry:
+    """Return the client registry of hass, creating it on first use."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if (registry := data.get(DATA_CLIENTS)) is None:
+        registry = data[DATA_CLIENTS] = TechemClientRegistry(async_get_clientsession(hass))
+    return registry
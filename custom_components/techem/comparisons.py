@@ -0,0 +1,75 @@
+"""Comparison windows summed from the per-day history."""
+from __future__ import annotations
+from collections.abc import Iterable
+from datetime import date, timedelta
+
+# First month and day of the heating season
+HEATING_SEASON_START = (10, 1)
+# Days back to the same weekday a year earlier
+WEEKDAY_YEAR = 364
+# Longest custom comparison window, in days
+MAX_CUSTOM_DAYS = 366
+
+Window = tuple[date, date]
+
+
+def previous_year(day: date) -> date:
+    """Return the same day one year earlier, mapping February 29th to the 28th."""
+    if day.month == 2 and day.day == 29:
+        return day.replace(year=day.year - 1, day=28)
+    return day.replace(year=day.year - 1)
+
+
+def previous_year_end(end: date) -> date:
+    """Return the end one year earlier of a window that runs until, but not including, end.
+
+    The window's last day is moved back a year, so an end of February
+    29th, after February 28th, becomes March 1st.
+    """
+    return previous_year(end - timedelta(days=1)) + timedelta(days=1)
+
+
+def comparison_windows(today: date, custom_days: Iterable[int] = ()) -> dict[str, tuple[Window, Window]]:
+    """Return the (current, comparison) day windows of every comparison.
+
+    Windows run from their first day until, but not including, their
+    last, and end where the yearly and weekly windows do:
+    - month_to_date: this month against the same days of last month
+    - same_week_last_year: the last 7 days against the same weekdays a year earlier
+    - heating_season: this heating season against the same days of the last one
+    - rolling_<n>_days: the last n days against the n days before them
+    """
+    end = today - timedelta(days=1)
+    last = end - timedelta(days=1)
+
+    month_start = last.replace(day=1)
+    previous_month_start = (month_start - timedelta(days=1)).replace(day=1)
+    previous_month_end = min(previous_month_start + (end - month_start), month_start)
+
+    season_start = date(last.year, *HEATING_SEASON_START)
+    if season_start > last:
+        season_start = previous_year(season_start)
+
+    week = timedelta(days=7)
+    year = timedelta(days=WEEKDAY_YEAR)
+    windows = {
+        "month_to_date": ((month_start, end), (previous_month_start, previous_month_end)),
+        "same_week_last_year": ((end - week, end), (end - week - year, end - year)),
+        "heating_season": ((season_start, end), (previous_year(season_start), previous_year_end(end))),
+    }
+    for days in sorted(set(custom_days)):
+        length = timedelta(days=days)
+        windows[f"rolling_{days}_days"] = ((end - length, end), (end - 2 * length, end - length))
+    return windows
+
+
+def comparison_labels(custom_days: Iterable[int] = ()) -> dict[str, str]:
+    """Return the sensor name suffix of every comparison."""
+    labels = {
+        "month_to_date": "Month to Date vs Last Month",
+        "same_week_last_year": "Last 7 Days vs Same Week Last Year",
+        "heating_season": "Heating Season vs Last Season",
+    }
+    for days in sorted(set(custom_days)):
+        labels[f"rolling_{days}_days"] = f"Last {days} Days vs Previous {days} Days"
+    return labels
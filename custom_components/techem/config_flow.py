@@ -1,20 +1,59 @@
 """Config flow for Techem integration."""
 from __future__ import annotations
 import logging
+import re
+from collections.abc import Mapping
 from typing import Any
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
-from .const import DOMAIN, CONF_COUNTRY, CONF_OBJECT_ID, COUNTRIES
-from .techem_api import TechemAPI
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from .const import (
+    DOMAIN,
+    CONF_COMPARISON_DAYS,
+    CONF_COUNTRY,
+    CONF_MAX_CONCURRENCY,
+    CONF_OBJECT_IDS,
+    COUNTRIES,
+    DEFAULT_MAX_CONCURRENCY,
+)
+from .clients import account_key, account_unique_id, async_get_registry
+from .comparisons import MAX_CUSTOM_DAYS
+from .techem_api import TechemAPI, TechemAuthError, TechemError
 
 _LOGGER = logging.getLogger(__name__)
 
+
+def parse_object_ids(value: str) -> list[str]:
+    """Split a comma or whitespace separated list of object ids, dropping duplicates."""
+    return list(dict.fromkeys(part for part in re.split(r"[\s,;]+", value) if part))
+
+
+def parse_comparison_days(value: str) -> list[int]:
+    """Split a comma or whitespace separated list of window lengths, sorted and without duplicates.
+
+    Raises ValueError if a length is not a whole number of 1 to MAX_CUSTOM_DAYS days.
+    """
+    days = sorted({int(part) for part in re.split(r"[\s,;]+", value) if part})
+    if days and not 1 <= days[0] <= days[-1] <= MAX_CUSTOM_DAYS:
+        raise ValueError(f"Comparison windows must be 1 to {MAX_CUSTOM_DAYS} days")
+    return days
+
+
 class TechemConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Techem."""
 
-    VERSION = 1
+    VERSION = 2
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> TechemOptionsFlow:
+        """Return the options flow."""
+        return TechemOptionsFlow(config_entry)
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -23,36 +62,127 @@ class TechemConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
-            # Validate credentials
-            api = TechemAPI(
-                user_input[CONF_EMAIL],
-                user_input[CONF_PASSWORD],
-                user_input[CONF_OBJECT_ID],
-                user_input[CONF_COUNTRY]
-            )
-            
-            token = await self.hass.async_add_executor_job(api.get_token)
-            
-            if token:
-                await self.async_set_unique_id(user_input[CONF_OBJECT_ID])
-                self._abort_if_unique_id_configured()
-                
-                return self.async_create_entry(
-                    title=f"Techem ({user_input[CONF_EMAIL]})",
-                    data=user_input
-                )
+            object_ids = parse_object_ids(user_input[CONF_OBJECT_IDS])
+            if not object_ids:
+                errors[CONF_OBJECT_IDS] = "no_object_ids"
             else:
-                errors["base"] = "invalid_auth"
+                # Validate credentials
+                errors = await self._async_validate(
+                    user_input[CONF_EMAIL],
+                    user_input[CONF_PASSWORD],
+                    user_input[CONF_COUNTRY]
+                )
+
+                if not errors:
+                    await self.async_set_unique_id(
+                        account_unique_id(user_input[CONF_EMAIL], user_input[CONF_COUNTRY])
+                    )
+                    self._abort_if_unique_id_configured()
+                    
+                    return self.async_create_entry(
+                        title=f"Techem ({user_input[CONF_EMAIL]})",
+                        data={**user_input, CONF_OBJECT_IDS: object_ids}
+                    )
 
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema({
                 vol.Required(CONF_EMAIL): str,
                 vol.Required(CONF_PASSWORD): str,
-                vol.Required(CONF_OBJECT_ID): str,
+                vol.Required(CONF_OBJECT_IDS): str,
                 vol.Required(CONF_COUNTRY, default="dk"): vol.In({
                     code: country["name"] for code, country in COUNTRIES.items()
                 })
             }),
             errors=errors
         )
+
+    async def async_step_reauth(self, entry_data: Mapping[str, Any]) -> FlowResult:
+        """Handle a rejected password."""
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Ask for a new password and reload every entry of the account with it."""
+        entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
+        errors = {}
+
+        if user_input is not None:
+            email, password, country = entry.data[CONF_EMAIL], user_input[CONF_PASSWORD], entry.data[CONF_COUNTRY]
+            errors = await self._async_validate(email, password, country)
+            if not errors:
+                # Entries of an account share its client, so they all take the new password
+                key = account_key(email, country)
+                entries = [
+                    other for other in self.hass.config_entries.async_entries(DOMAIN)
+                    if account_key(other.data[CONF_EMAIL], other.data[CONF_COUNTRY]) == key
+                ]
+                async_get_registry(self.hass).set_password(email, password, country)
+                for other in entries:
+                    self.hass.config_entries.async_update_entry(other, data={**other.data, CONF_PASSWORD: password})
+                for other in entries:
+                    await self.hass.config_entries.async_reload(other.entry_id)
+                return self.async_abort(reason="reauth_successful")
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            description_placeholders={"email": entry.data[CONF_EMAIL]},
+            data_schema=vol.Schema({vol.Required(CONF_PASSWORD): str}),
+            errors=errors
+        )
+
+    async def _async_validate(self, email: str, password: str, country: str) -> dict[str, str]:
+        """Log in with the given credentials and return the form errors."""
+        api = TechemAPI(async_get_clientsession(self.hass), email, password, country)
+        try:
+            await api.get_token()
+        except TechemAuthError:
+            return {"base": "invalid_auth"}
+        except TechemError as err:
+            _LOGGER.warning("Could not reach Techem: %s", err)
+            return {"base": "cannot_connect"}
+        return {}
+
+
+class TechemOptionsFlow(config_entries.OptionsFlow):
+    """Handle Techem options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        errors = {}
+
+        if user_input is not None:
+            try:
+                comparison_days = parse_comparison_days(user_input.get(CONF_COMPARISON_DAYS, ""))
+            except ValueError:
+                errors[CONF_COMPARISON_DAYS] = "invalid_comparison_days"
+            else:
+                return self.async_create_entry(
+                    title="", data={**user_input, CONF_COMPARISON_DAYS: comparison_days}
+                )
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Required(
+                    CONF_MAX_CONCURRENCY,
+                    default=self.config_entry.options.get(
+                        CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=16)),
+                vol.Optional(
+                    CONF_COMPARISON_DAYS,
+                    default=", ".join(
+                        str(days) for days in self.config_entry.options.get(CONF_COMPARISON_DAYS, [])
+                    ),
+                ): str,
+            }),
+            errors=errors
+        )
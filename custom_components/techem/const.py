@@ -3,6 +3,15 @@ DOMAIN = "techem"
 
 CONF_COUNTRY = "country"
 CONF_OBJECT_ID = "object_id"
+CONF_OBJECT_IDS = "object_ids"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_COMPARISON_DAYS = "comparison_days"
+
+# Key of the client registry in hass.data[DOMAIN], next to the entry ids
+DATA_CLIENTS = "clients"
+
+# Objects fetched at the same time when an entry covers several
+DEFAULT_MAX_CONCURRENCY = 4
 
 COUNTRIES = {
     "dk": {
@@ -23,4 +32,21 @@ SENSOR_TYPE_WATER = "water"
 SENSOR_TYPE_HEAT = "heat"
 
 # Units  
-UNIT_HCA = "enh"  # Heat cost allocator units (enheder)
\ No newline at end of file
+UNIT_HCA = "enh"  # Heat cost allocator units (enheder)
+
+# Days before today whose values Techem may still revise
+UNSETTLED_DAYS = 3
+# Days fetched per batched GraphQL request of per-day selections
+DAYS_PER_REQUEST = 31
+# Years before the current one the history keeps; last year's totals need at least one
+HISTORY_YEARS = 5
+# Days of a series shown by the series sensors
+SERIES_WINDOW = 30
+# Event fired when a water or meter series goes out of range or shows continuous use
+EVENT_ANOMALY = "techem_anomaly"
+# Days after which an anomaly found late, as when filling history, fires no event
+ANOMALY_EVENT_MAX_AGE = 7
+# Dispatcher signal, formatted with the entry id, sent after every refresh so request statistics update
+SIGNAL_METRICS_UPDATED = "techem_metrics_updated_{}"
+# Parts of an object the techem.refresh service can fetch on their own
+REFRESH_SCOPES = ("yearly", "weekly", "kpi", "meters")
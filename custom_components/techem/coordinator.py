@@ -0,0 +1,490 @@
+"""Data update coordinator for the Techem integration."""
+from __future__ import annotations
+import asyncio
+from datetime import date, timedelta
+import logging
+import time
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_EMAIL
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+from .anomaly import AnomalyStore
+from .clients import account_key
+from .history import HistoryStore, async_remove_history
+from .comparisons import comparison_windows, previous_year, previous_year_end
+from .const import (
+    ANOMALY_EVENT_MAX_AGE,
+    CONF_COUNTRY,
+    DOMAIN,
+    DAYS_PER_REQUEST,
+    EVENT_ANOMALY,
+    SERIES_WINDOW,
+    SIGNAL_METRICS_UPDATED,
+    UNSETTLED_DAYS,
+)
+from .models import ObjectData
+from .resilience import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, in_background, request_priority
+from .scheduler import BASE_INTERVAL, AdaptivePollScheduler
+from .techem_api import TechemAPI, TechemAuthError, TechemCircuitOpenError, TechemError
+
+_LOGGER = logging.getLogger(__name__)
+TOKEN_STORE_VERSION = 1
+SNAPSHOT_STORE_VERSION = 1
+# Seconds to wait before writing the snapshot, so the write is off the refresh path
+SNAPSHOT_SAVE_DELAY = 10
+# Seconds after a scoped refresh during which the same refresh is skipped
+SCOPED_REFRESH_COOLDOWN = 10
+# Per-day stores the history replaced, and the token stored per entry before it was
+# stored per account, deleted on load
+OBSOLETE_STORES = ("days", "series", "token")
+
+
+def token_store(hass: HomeAssistant, email: str, country: str) -> Store:
+    """Return the store of the token of a Techem account, shared by its entries."""
+    return Store(hass, TOKEN_STORE_VERSION, f"{DOMAIN}.token.{account_key(email, country)}")
+
+
+async def async_remove_stores(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete everything persisted for a config entry, except the token of its account."""
+    for name in ("snapshot", "statistics", "anomalies", *OBSOLETE_STORES):
+        await Store(hass, 1, f"{DOMAIN}.{entry_id}.{name}").async_remove()
+    await async_remove_history(hass, entry_id)
+
+
+def period_windows(today: date) -> dict[str, tuple[tuple[date, date], tuple[date, date]]]:
+    """Return the (current, comparison) day windows of the yearly and weekly sections.
+
+    Windows run from their first day until, but not including, their last,
+    matching the periods requested from Techem by TechemAPI.get_data.
+    """
+    end = today - timedelta(days=1)
+    year_start = date(today.year, 1, 1)
+    week_start = end - timedelta(days=7)
+    return {
+        "yearly": ((year_start, end), (previous_year(year_start), previous_year_end(end))),
+        "weekly": ((week_start, end), (week_start - timedelta(days=7), week_start)),
+    }
+
+
+class TechemCoordinator(DataUpdateCoordinator):
+    """Fetch KPI data and new daily values for every object of an entry.
+
+    Objects are fetched in parallel, at most max_concurrency at a time, on
+    one shared client. Totals and comparisons are summed from the per-day
+    stores, so each refresh costs one request per object for the days
+    that are missing or not settled yet. The data maps each object id to
+    an ObjectData parsed once per refresh.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        api: TechemAPI,
+        object_ids: list[str],
+        max_concurrency: int,
+        comparison_days: list[int] | None = None,
+    ):
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=BASE_INTERVAL,
+            # Only notify entities when the parsed data differs from the last refresh
+            always_update=False,
+        )
+        self.api = api
+        self.object_ids = object_ids
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.comparison_days = comparison_days or []
+        self._token_store = token_store(hass, entry.data[CONF_EMAIL], entry.data[CONF_COUNTRY])
+        self._snapshot_store = Store(hass, SNAPSHOT_STORE_VERSION, f"{DOMAIN}.{entry.entry_id}.snapshot")
+        self.anomalies = AnomalyStore(hass, entry.entry_id)
+        self.history = HistoryStore(hass, entry.entry_id)
+        self._fill_tasks: dict[str, asyncio.Task] = {}
+        # Set while a refresh a user asked for may start
+        self._interactive = False
+        self._entry = entry
+        self.scheduler = AdaptivePollScheduler()
+        # Sent after every refresh, as entities are only notified when the data changed
+        self.metrics_signal = SIGNAL_METRICS_UPDATED.format(entry.entry_id)
+        self.last_refresh_duration: float | None = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # (object ids, scope) -> running scoped refresh, and when each last finished
+        self._scoped: dict[tuple[frozenset, frozenset], asyncio.Future] = {}
+        self._scoped_done: dict[tuple[frozenset, frozenset], float] = {}
+
+    async def async_load_stores(self) -> None:
+        """Load the token, anomaly statistics and history from the previous run."""
+        if (stored_token := await self._token_store.async_load()) is None:
+            # Stored per entry before it was stored per account
+            legacy = Store(self.hass, TOKEN_STORE_VERSION, f"{DOMAIN}.{self._entry.entry_id}.token")
+            if stored_token := await legacy.async_load():
+                await self._token_store.async_save(stored_token)
+        if stored_token:
+            self.api.token_manager.restore(stored_token)
+        await self.anomalies.async_load()
+        await self.history.async_load()
+        for name in OBSOLETE_STORES:
+            await Store(self.hass, 1, f"{DOMAIN}.{self._entry.entry_id}.{name}").async_remove()
+
+    async def async_restore_snapshot(self) -> bool:
+        """Load the last good data so entities can be created without a fetch.
+
+        Returns True if a snapshot was restored.
+        """
+        snapshot = await self._snapshot_store.async_load()
+        if not snapshot or not snapshot.get("data"):
+            return False
+        raw = snapshot["data"]
+        if "kpi" in raw:
+            # Written before entries could hold several objects
+            raw = {self.object_ids[0]: raw}
+        try:
+            self.data = {
+                object_id: ObjectData.parse({**raw[object_id], **self._history_sections(object_id)})
+                for object_id in self.object_ids
+                if object_id in raw
+            }
+        except TechemError as err:
+            _LOGGER.warning("Ignoring unreadable Techem snapshot: %s", err)
+            return False
+        self.scheduler.restore(snapshot.get("scheduler") or {})
+        _LOGGER.debug("Restored Techem snapshot from %s", snapshot.get("updated"))
+        return bool(self.data)
+
+    async def async_request_refresh(self) -> None:
+        """Request a refresh whose requests go ahead of background polls.
+
+        Home Assistant calls this when a user asks for an update. Only a
+        refresh that starts right away is interactive; one the debouncer
+        runs later is not, as the priority is not set in the context its
+        timer copies.
+        """
+        self._interactive = True
+        try:
+            await super().async_request_refresh()
+        finally:
+            self._interactive = False
+
+    async def _async_update_data(self) -> dict:
+        """Fetch every object, and persist the token if it changed."""
+        start = time.perf_counter()
+        priority = request_priority.set(PRIORITY_INTERACTIVE if self._interactive else PRIORITY_BACKGROUND)
+        self._interactive = False
+        try:
+            results = await asyncio.gather(
+                *(self._async_fetch_limited(object_id) for object_id in self.object_ids),
+                return_exceptions=True,
+            )
+        finally:
+            request_priority.reset(priority)
+            self.last_refresh_duration = time.perf_counter() - start
+            if self.api.token_manager.changed:
+                self.api.token_manager.changed = False
+                await self._token_store.async_save(self.api.token_manager.as_dict())
+            self._async_publish_metrics()
+
+        data = {}
+        errors = []
+        for object_id, result in zip(self.object_ids, results):
+            if isinstance(result, BaseException):
+                errors.append(result)
+                _LOGGER.warning("Could not update Techem object %s: %s", object_id, result)
+            else:
+                data[object_id] = result
+        if not data:
+            self._raise_failure(errors)
+
+        self.update_interval = self.scheduler.succeeded(self._published(data), dt_util.now())
+        _LOGGER.debug("Next Techem poll in %s", self.update_interval)
+
+        # Objects that failed keep their last good data
+        for object_id in self.object_ids:
+            if object_id not in data and self.data and object_id in self.data:
+                data[object_id] = self.data[object_id]
+        if not self._shutdown_requested:
+            self._snapshot_store.async_delay_save(self._snapshot, SNAPSHOT_SAVE_DELAY)
+        return data
+
+    @staticmethod
+    def _published(data: dict[str, ObjectData]) -> dict[str, dict[str, list]]:
+        """Return the last day with a value, and the value, of each series per object.
+
+        Unlike the totals, whose windows move at midnight, this only
+        changes when Techem publishes a day.
+        """
+        yesterday = date.today() - timedelta(days=1)
+        published = {}
+        for object_id, object_data in data.items():
+            latest = published[object_id] = {}
+            for name, values in object_data.series.items():
+                offset = next((offset for offset, value in enumerate(reversed(values)) if value is not None), None)
+                if offset is not None:
+                    latest[name] = [(yesterday - timedelta(days=offset)).isoformat(), values[-1 - offset]]
+        return published
+
+    @callback
+    def _async_publish_metrics(self) -> None:
+        """Tell the request statistics sensors that a refresh finished."""
+        async_dispatcher_send(self.hass, self.metrics_signal)
+
+    def _snapshot(self) -> dict:
+        """Return the last good data and the scheduler state for the snapshot store."""
+        return {
+            "updated": dt_util.utcnow().isoformat(),
+            "data": {object_id: object_data.to_payload() for object_id, object_data in (self.data or {}).items()},
+            "scheduler": self.scheduler.as_dict(),
+        }
+
+    async def async_shutdown(self) -> None:
+        """Stop refreshing and write the snapshot and pending store changes now.
+
+        Called when the entry unloads, so no delayed write can recreate
+        the files of an entry that is then removed.
+        """
+        await super().async_shutdown()
+        if self.data:
+            await self._snapshot_store.async_save(self._snapshot())
+        for store in (self.anomalies, self.history):
+            await store.async_close()
+
+    def _raise_failure(self, errors: list[BaseException]) -> None:
+        """Schedule a retry and raise the error Home Assistant should see for a failed refresh."""
+        self.update_interval = self.scheduler.failed()
+        for err in errors:
+            if isinstance(err, TechemAuthError):
+                raise ConfigEntryAuthFailed(str(err)) from err
+        err = errors[0]
+        if isinstance(err, TechemCircuitOpenError):
+            self.update_interval = max(
+                self.update_interval, timedelta(seconds=self.api.breaker.retry_in)
+            )
+        if isinstance(err, TechemError):
+            raise UpdateFailed(str(err)) from err
+        raise err
+
+    async def _async_fetch_limited(self, object_id: str) -> ObjectData:
+        """Fetch and parse one object once a concurrency slot is free."""
+        async with self._semaphore:
+            return ObjectData.parse(await self._async_fetch(object_id))
+
+    async def _async_fetch(self, object_id: str) -> dict:
+        """Return the raw yearly, weekly, KPI, series, year-to-date and comparison sections of one object."""
+        # Same notion of today as the periods TechemAPI requests
+        today = date.today()
+        windows = period_windows(today)
+        comparisons = comparison_windows(today, self.comparison_days)
+        days = self._window_days({**windows, **comparisons})
+        missing = self.history.missing(object_id, days)
+        self.cache_hits += len(days) - len(missing)
+        self.cache_misses += len(missing)
+        # Days the series sensors show, and the last days that may still be revised
+        recent = self.history.missing(
+            object_id, (today - timedelta(days=offset) for offset in range(1, SERIES_WINDOW + 1))
+        )
+        recent.extend(today - timedelta(days=offset) for offset in range(1, UNSETTLED_DAYS + 1))
+        fetch = sorted(set(missing) | set(recent))
+
+        if len(fetch) > DAYS_PER_REQUEST:
+            task = self._fill_tasks.get(object_id)
+            if task is None or task.done():
+                # Not at the priority of the refresh that found the days missing
+                self._fill_tasks[object_id] = in_background(
+                    self._entry.async_create_background_task,
+                    self.hass,
+                    self._async_fill(object_id, fetch),
+                    f"{DOMAIN}_fill_{self._entry.entry_id}_{object_id}",
+                )
+            return {**await self.api.get_all_data(object_id), **self._history_sections(object_id)}
+
+        data = await self.api.get_refresh_data(object_id, fetch, meters=True)
+        self._store_daily(object_id, data["daily"], today)
+
+        return {
+            "kpi": data["kpi"],
+            **self._history_sections(object_id),
+            "comparisons": self._window_sums(object_id, comparisons),
+            **self._window_sums(object_id, windows),
+        }
+
+    async def _async_fill(self, object_id: str, days: list[date]) -> None:
+        """Fetch missing days of one object into the history in batched requests.
+
+        Meter readings are only asked for days since the start of last
+        year, which the year-to-date comparisons cover. Once done, a
+        refresh is requested so the sensors use the filled days.
+        """
+        meters_start = previous_year(date(date.today().year, 1, 1))
+        for start in range(0, len(days), DAYS_PER_REQUEST):
+            chunk = days[start:start + DAYS_PER_REQUEST]
+            try:
+                await self.async_fetch_days(object_id, chunk, meters=chunk[-1] >= meters_start)
+            except Exception as err:
+                _LOGGER.warning("Filling the Techem history stopped at %s: %s", chunk[0], err)
+                return
+        _LOGGER.debug("Filled the Techem history of %s with %d days", object_id, len(days))
+        # A background refresh, not one a user asked for
+        await super().async_request_refresh()
+
+    async def async_refresh_scope(self, object_ids: list[str], scope: frozenset[str]) -> bool:
+        """Fetch only the scope of the given objects and update the sensors with it.
+
+        The scope holds parts of REFRESH_SCOPES; parts outside it keep
+        their last values. Identical calls while one runs share it, and
+        one within SCOPED_REFRESH_COOLDOWN seconds of the last is skipped
+        and returns False. Raises TechemError if an object fails.
+        """
+        key = (frozenset(object_ids), scope)
+        if (flight := self._scoped.get(key)) is None:
+            finished = self._scoped_done.get(key)
+            if finished is not None and time.monotonic() - finished < SCOPED_REFRESH_COOLDOWN:
+                return False
+            flight = self._scoped[key] = asyncio.ensure_future(self._async_refresh_scope(object_ids, scope))
+            flight.add_done_callback(lambda done: self._scoped_finished(key, done))
+        await asyncio.shield(flight)
+        return True
+
+    def _scoped_finished(self, key: tuple[frozenset, frozenset], flight: asyncio.Future) -> None:
+        """Forget a finished scoped refresh, starting the cooldown if it succeeded."""
+        del self._scoped[key]
+        if not flight.cancelled() and flight.exception() is None:
+            self._scoped_done[key] = time.monotonic()
+
+    async def _async_refresh_scope(self, object_ids: list[str], scope: frozenset[str]) -> None:
+        """Fetch the scope of every given object at interactive priority and publish the data."""
+        token = request_priority.set(PRIORITY_INTERACTIVE)
+        try:
+            results = await asyncio.gather(
+                *(self._async_fetch_scope(object_id, scope) for object_id in object_ids)
+            )
+        finally:
+            request_priority.reset(token)
+            self._async_publish_metrics()
+        self.async_set_updated_data({**(self.data or {}), **dict(zip(object_ids, results))})
+
+    async def _async_fetch_scope(self, object_id: str, scope: frozenset[str]) -> ObjectData:
+        """Fetch the scope of one object in one request, keeping the rest of its data.
+
+        Yearly and weekly totals need the days missing from their windows
+        and the unsettled days; meters need the meter readings of the
+        unsettled days. If too many days are missing the object is
+        refreshed in full. Comparisons the object already has are summed
+        again whenever days were fetched.
+        """
+        today = date.today()
+        windows = {period: window for period, window in period_windows(today).items() if period in scope}
+        days = set()
+        if windows or "meters" in scope:
+            days.update(today - timedelta(days=offset) for offset in range(1, UNSETTLED_DAYS + 1))
+            days.update(self.history.missing(object_id, self._window_days(windows)))
+        if len(days) > DAYS_PER_REQUEST:
+            return await self._async_fetch_limited(object_id)
+
+        async with self._semaphore:
+            data = await self.api.get_refresh_data(
+                object_id, sorted(days), meters="meters" in scope, kpi="kpi" in scope
+            )
+        previous = self.data.get(object_id) if self.data else None
+        sections = previous.to_payload() if previous else {}
+        if "kpi" in scope:
+            sections["kpi"] = data["kpi"]
+        if data["daily"]:
+            self._store_daily(object_id, data["daily"], today)
+            if sections.get("comparisons"):
+                # Only once a full refresh found their days in the history
+                sections["comparisons"] = self._window_sums(
+                    object_id, comparison_windows(today, self.comparison_days)
+                )
+        sections.update(self._history_sections(object_id))
+        sections.update(self._window_sums(object_id, windows))
+        return ObjectData.parse(sections)
+
+    async def async_fetch_days(self, object_id: str, days: list[date], meters: bool = True) -> None:
+        """Fetch up to DAYS_PER_REQUEST days of one object into the history in one request."""
+        async with self._semaphore:
+            daily = await self.api.get_daily_data(object_id, days, meters=meters)
+        self._store_daily(object_id, daily, date.today())
+
+    async def async_wait_for_fill(self, object_id: str) -> None:
+        """Wait until a running history fill of one object finished."""
+        if (task := self._fill_tasks.get(object_id)) is not None and not task.done():
+            await asyncio.shield(task)
+
+    def _store_daily(self, object_id: str, daily: dict[date, dict], today: date) -> None:
+        """Add fetched days to the history and anomaly statistics of an object."""
+        self.history.update(object_id, daily, today)
+        self.history.async_schedule_save()
+
+        started = self.anomalies.get(object_id).update(daily, today - timedelta(days=UNSETTLED_DAYS))
+        self.anomalies.async_schedule_save()
+        for anomaly in started:
+            _LOGGER.debug("Techem %s of %s on %s: %s", anomaly.kind, anomaly.series, anomaly.day, anomaly.value)
+            if (today - anomaly.day).days <= ANOMALY_EVENT_MAX_AGE:
+                self.hass.bus.async_fire(
+                    EVENT_ANOMALY,
+                    {
+                        "object_id": object_id,
+                        "series": anomaly.series,
+                        "kind": anomaly.kind,
+                        "day": anomaly.day.isoformat(),
+                        "value": anomaly.value,
+                        "mean": round(anomaly.mean, 3),
+                        "std": round(anomaly.std, 3),
+                        "baseline": round(anomaly.baseline, 3),
+                    },
+                )
+
+    def _history_sections(self, object_id: str) -> dict[str, dict]:
+        """Return the series and year-to-date sections of an object, read from the history.
+
+        series holds the last SERIES_WINDOW days of each series, up to
+        yesterday. year_to_date holds each meter's units this year to date
+        and over the same days last year, each None unless the meter's
+        history reaches back to the period's first day, so a meter whose
+        readings start later is not shown as using less.
+        """
+        today = date.today()
+        year_start = date(today.year, 1, 1)
+        periods = ((year_start, today), (previous_year(year_start), previous_year_end(today)))
+        year_to_date = {}
+        for series in self.history.series(object_id):
+            if series.startswith("meter_"):
+                first = self.history.first(object_id, series)
+                year_to_date[series] = [
+                    self.history.sum(object_id, series, start, end) if first is not None and first <= start else None
+                    for start, end in periods
+                ]
+        return {
+            "series": self.history.window(object_id, today - timedelta(days=1), SERIES_WINDOW),
+            "year_to_date": year_to_date,
+        }
+
+    def _window_sums(self, object_id: str, windows: dict) -> dict[str, dict]:
+        """Return the totals of each window from the history, shaped like Techem's TenantTable rows."""
+        return {
+            name: {
+                "values": self._sums(object_id, *current),
+                "comparisonValues": self._sums(object_id, *comparison),
+            }
+            for name, (current, comparison) in windows.items()
+        }
+
+    def _sums(self, object_id: str, start: date, end: date) -> list[float]:
+        """Return the summed [energy, water] of the days from start until end."""
+        return [self.history.sum(object_id, series, start, end) for series in ("energy", "water")]
+
+    @staticmethod
+    def _window_days(windows: dict) -> list[date]:
+        """Return every day covered by the given windows, oldest first."""
+        days = set()
+        for current, comparison in windows.values():
+            for start, end in (current, comparison):
+                days.update(start + timedelta(days=offset) for offset in range((end - start).days))
+        return sorted(days)
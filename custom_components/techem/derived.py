@@ -0,0 +1,105 @@
+"""Sensor values derived from parsed Techem data, computed once per refresh."""
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from homeassistant.util import slugify
+
+if TYPE_CHECKING:
+    from .models import ConsumptionRow, KpiSummary
+
+# Quantity of a consumption row and the decimals it is shown with
+QUANTITIES = (("energy", 1), ("water", 3))
+# Decimals of the daily series that are not energy or water
+SERIES_DIGITS = 1
+# Trailing days summed by the series windows
+SERIES_WINDOWS = (("last_7_days", 7), ("last_30_days", 30))
+# Periods of the year-to-date totals of meters and rooms
+YEAR_TO_DATE = ("this_year", "same_period_last_year")
+DAYS_PER_WEEK = 7
+KPI_COMPARISONS = (
+    ("previous_period", "previous_period"),
+    ("previous_year", "previous_year"),
+    ("property", "property_comparison"),
+)
+
+
+def percent_change(current: float, previous: float) -> float | None:
+    """Return the whole-number percentage change from previous to current."""
+    if previous and previous > 0:
+        # "or 0.0" turns the -0.0 of equal totals summed in another order into 0.0
+        return round((current - previous) / previous * 100, 0) or 0.0
+    return None
+
+
+def series_digits(name: str) -> int:
+    """Return the decimals a daily series is shown with."""
+    return dict(QUANTITIES).get(name, SERIES_DIGITS)
+
+
+def _window_sum(values: tuple[float | None, ...], digits: int) -> float | None:
+    """Return the rounded sum of the known values, or None if none are known."""
+    known = [value for value in values if value is not None]
+    return round(sum(known), digits) if known else None
+
+
+def _total(values: list[float | None], digits: int) -> float | None:
+    """Return the rounded sum of the values, or None if there are none or one is unknown."""
+    if not values or None in values:
+        return None
+    return round(sum(values), digits)
+
+
+def derive_values(
+    yearly: ConsumptionRow | None,
+    weekly: ConsumptionRow | None,
+    kpi: KpiSummary | None,
+    series: dict[str, tuple[float | None, ...]],
+    comparisons: dict[str, ConsumptionRow],
+    year_to_date: dict[str, tuple[float | None, float | None]],
+) -> dict[str, float | None]:
+    """Return every sensor value of an object, keyed by the sensor's unique id suffix.
+
+    Comparison windows get the same keys as the yearly and weekly periods.
+    Sections that are missing leave their keys out, so sensors read None.
+    A room's year-to-date totals are the sums of its meters', None unless
+    every one of them is known.
+    """
+    values: dict[str, float | None] = {}
+    for period, row in (("yearly", yearly), ("weekly", weekly), *comparisons.items()):
+        if row is None:
+            continue
+        for quantity, digits in QUANTITIES:
+            current = getattr(row, quantity)
+            previous = getattr(row, f"comparison_{quantity}")
+            values[f"{quantity}_{period}"] = round(current, digits)
+            values[f"{quantity}_{period}_comparison"] = round(previous, digits)
+            values[f"{quantity}_comparison_{period}"] = percent_change(current, previous)
+            if period == "weekly":
+                values[f"{quantity}_daily_average"] = round(current / DAYS_PER_WEEK, digits)
+
+    if kpi is not None:
+        values["heat_total"] = round(kpi.total, 1)
+        for key, field in KPI_COMPARISONS:
+            values[f"comparison_{key}"] = (
+                percent_change(kpi.total, getattr(kpi, field)) if kpi.total else None
+            )
+        for label, room in kpi.rooms.items():
+            values[f"room_{slugify(label)}"] = room.value
+        room_meters: dict[str, list[str]] = {label: [] for label in kpi.rooms}
+        for number, meter in kpi.meters.items():
+            values[f"meter_{number}"] = meter.value
+            room_meters.setdefault(meter.room, []).append(f"meter_{number}")
+        for label in kpi.rooms:
+            meters = [year_to_date.get(key, (None, None)) for key in room_meters[label]]
+            for index, period in enumerate(YEAR_TO_DATE):
+                values[f"room_{slugify(label)}_{period}"] = _total([totals[index] for totals in meters], SERIES_DIGITS)
+
+    for key, totals in year_to_date.items():
+        for period, total in zip(YEAR_TO_DATE, totals):
+            values[f"{key}_{period}"] = _total([total], SERIES_DIGITS)
+
+    for name, days in series.items():
+        digits = series_digits(name)
+        values[f"{name}_yesterday"] = _window_sum(days[-1:], digits)
+        for window, length in SERIES_WINDOWS:
+            values[f"{name}_{window}"] = _window_sum(days[-length:], digits)
+    return values
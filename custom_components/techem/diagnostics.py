@@ -0,0 +1,53 @@
+"""Diagnostics support for the Techem integration."""
+from __future__ import annotations
+from typing import Any
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN
+from .coordinator import TechemCoordinator
+
+# The title and unique id contain the account email
+TO_REDACT = {CONF_EMAIL, CONF_PASSWORD, "title", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return request statistics and coordinator state for a config entry."""
+    coordinator: TechemCoordinator = hass.data[DOMAIN][entry.entry_id]
+    api = coordinator.api
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "api": {
+            "token_valid": api.token_manager.valid,
+            "token_expires_at": api.token_manager.expires_at,
+            "breaker": api.breaker.state,
+            "breaker_failures": api.breaker.failures,
+            "persisted_queries": api.persisted_queries,
+            "rate_limited_requests": api.limiter.waited if api.limiter else None,
+            **api.metrics.as_dict(),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": str(coordinator.update_interval),
+            "last_refresh_duration": coordinator.last_refresh_duration,
+            "cache_hits": coordinator.cache_hits,
+            "cache_misses": coordinator.cache_misses,
+            "publish_hours": coordinator.scheduler.publish_hours,
+            "history_columns": coordinator.history.partitions,
+        },
+        "objects": {
+            object_id: {
+                "rooms": len(data.kpi.rooms) if data.kpi else 0,
+                "meters": len(data.kpi.meters) if data.kpi else 0,
+                "anomalies": sorted(
+                    series
+                    for series, stats in coordinator.anomalies.get(object_id).series.items()
+                    if stats.out_of_range or stats.continuous_use
+                ),
+            }
+            for object_id, data in (coordinator.data or {}).items()
+        },
+    }
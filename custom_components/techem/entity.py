@@ -0,0 +1,41 @@
+"""Base entity for the Techem integration."""
+from __future__ import annotations
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .const import DOMAIN
+from .coordinator import TechemCoordinator
+
+
+class TechemEntity(CoordinatorEntity[TechemCoordinator]):
+    """Techem entity attached to its object's device, writing its state only when it changed."""
+
+    def __init__(self, coordinator: TechemCoordinator, object_id: str):
+        """Initialize the entity and attach it to the object's device."""
+        super().__init__(coordinator)
+        self._object_id = object_id
+        self._written: tuple | None = None
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, object_id)},
+            name=f"Techem {object_id}",
+            manufacturer="Techem",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    def _state_signature(self) -> tuple:
+        """Return what a state write would record for this entity."""
+        return self.available, self.state, self.extra_state_attributes
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the state written when the entity is added."""
+        await super().async_added_to_hass()
+        self._written = self._state_signature()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if the value, attributes or availability changed."""
+        signature = self._state_signature()
+        if signature == self._written:
+            return
+        self._written = signature
+        self.async_write_ha_state()
@@ -0,0 +1,247 @@
+"""Bulk export of Techem per-day consumption to CSV or JSON Lines.
+
+The date range of every object is split into windows of DAYS_PER_REQUEST
+days, fetched in parallel by a bounded pool of workers. Each window is
+written as soon as it arrives, so memory stays flat however long the
+range. Rows are (day, object, meter, quantity, value): energy and water
+per object, and heat cost allocator units per meter. Windows are written
+in the order they complete.
+
+After each window the output size is appended to a checkpoint file. A
+run with the same arguments cuts the output back to the last completed
+window and skips every window already written. Without a checkpoint, an
+output that is not empty is only replaced when overwrite is given.
+
+Importing the package loads Home Assistant, so run it with the Python
+environment Home Assistant is installed in, from its config directory:
+
+    python -m custom_components.techem.export --email me@example.com \\
+        --object 12345 --start 2023-01-01 --output history.csv
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+from collections.abc import Iterable, Iterator
+import csv
+from datetime import date, timedelta
+import getpass
+import io
+import json
+import logging
+import os
+import sys
+import aiohttp
+from .const import COUNTRIES, DAYS_PER_REQUEST, DEFAULT_MAX_CONCURRENCY
+from .techem_api import TechemAPI, TechemError
+
+_LOGGER = logging.getLogger(__name__)
+
+FIELDS = ("day", "object", "meter", "quantity", "value")
+# Quantities of a TenantTable row, in the order of its values
+ROW_QUANTITIES = ("energy", "water")
+METER_QUANTITY = "hca"
+FORMATS = ("csv", "jsonl")
+
+
+def windows(
+    object_ids: Iterable[str], start: date, end: date, days: int = DAYS_PER_REQUEST
+) -> Iterator[tuple[str, date, date]]:
+    """Yield (object id, first day, end) windows of at most days days covering start until end."""
+    for object_id in object_ids:
+        first = start
+        while first < end:
+            last = min(first + timedelta(days=days), end)
+            yield object_id, first, last
+            first = last
+
+
+def window_rows(object_id: str, daily: dict[date, dict]) -> Iterator[dict]:
+    """Yield the export rows of days as returned by TechemAPI.get_daily_data."""
+    for day, values in sorted(daily.items()):
+        day_text = day.isoformat()
+        for quantity, value in zip(ROW_QUANTITIES, values["values"] or ()):
+            yield {"day": day_text, "object": object_id, "meter": None, "quantity": quantity, "value": value}
+        for number, value in (values.get("meters") or {}).items():
+            yield {"day": day_text, "object": object_id, "meter": number, "quantity": METER_QUANTITY, "value": value}
+
+
+def encode_rows(rows: Iterable[dict], fmt: str, header: bool = False) -> bytes:
+    """Return rows encoded as CSV, optionally with a header line, or as JSON Lines."""
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, FIELDS, lineterminator="\n")
+        if header:
+            writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            buffer.write(json.dumps(row, separators=(",", ":")))
+            buffer.write("\n")
+    return buffer.getvalue().encode()
+
+
+class Checkpoint:
+    """The windows already written and the output size after the last of them."""
+
+    def __init__(self, path: str):
+        """Initialize an empty checkpoint stored at path."""
+        self.path = path
+        self.done: set[tuple[str, str, str]] = set()
+        self.offset = 0
+
+    @staticmethod
+    def key(window: tuple[str, date, date]) -> tuple[str, str, str]:
+        """Return the key a window is recorded under."""
+        object_id, first, last = window
+        return object_id, first.isoformat(), last.isoformat()
+
+    def load(self) -> None:
+        """Read the checkpoint file, ignoring a line cut short by an interruption."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    self.done.add(tuple(record["window"]))
+                    self.offset = record["offset"]
+        except FileNotFoundError:
+            pass
+
+    def record(self, window: tuple[str, date, date], offset: int) -> None:
+        """Append a written window and the output size after it."""
+        key = self.key(window)
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"window": key, "offset": offset}) + "\n")
+        self.done.add(key)
+        self.offset = offset
+
+
+async def export(
+    api: TechemAPI,
+    object_ids: list[str],
+    start: date,
+    end: date,
+    output: str,
+    fmt: str = "csv",
+    checkpoint_path: str | None = None,
+    workers: int = DEFAULT_MAX_CONCURRENCY,
+    meters: bool = True,
+    overwrite: bool = False,
+) -> int:
+    """Export the days from start until end of every object and return the windows written.
+
+    Raises TechemError if a window cannot be fetched; windows written
+    before that are kept in the checkpoint. Raises FileExistsError if the
+    output is not empty and has no checkpoint, unless overwrite is True.
+    """
+    checkpoint = Checkpoint(checkpoint_path or f"{output}.checkpoint")
+    checkpoint.load()
+    if checkpoint.offset and not os.path.exists(output):
+        _LOGGER.warning("Output %s is missing, starting the export over", output)
+        os.remove(checkpoint.path)
+        checkpoint = Checkpoint(checkpoint.path)
+    if not checkpoint.done and os.path.exists(output) and os.path.getsize(output):
+        if not overwrite:
+            raise FileExistsError(f"{output} is not empty and has no checkpoint to resume from")
+        _LOGGER.warning("Overwriting %s", output)
+
+    pending = (
+        window
+        for window in windows(object_ids, start, end)
+        if checkpoint.key(window) not in checkpoint.done
+    )
+    written = 0
+
+    with open(output, "ab") as stream:
+        if checkpoint.done or overwrite:
+            # Drop rows of a window that was cut short, or everything when overwriting
+            stream.truncate(checkpoint.offset)
+            stream.seek(checkpoint.offset)
+
+        async def worker() -> None:
+            """Fetch and write windows until none are left."""
+            nonlocal written
+            for window in pending:
+                object_id, first, last = window
+                days = [first + timedelta(days=offset) for offset in range((last - first).days)]
+                daily = await api.get_daily_data(object_id, days, meters)
+                if len(daily) < len(days):
+                    raise TechemError(f"Techem failed to return days of {object_id} from {first} until {last}")
+                stream.write(encode_rows(window_rows(object_id, daily), fmt, header=not stream.tell()))
+                stream.flush()
+                checkpoint.record(window, stream.tell())
+                written += 1
+                _LOGGER.debug("Exported %s from %s until %s", object_id, first, last)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(max(workers, 1))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return written
+
+
+async def _run(args: argparse.Namespace, password: str) -> int:
+    """Export with the parsed arguments on a new HTTP session."""
+    fmt = args.format or ("jsonl" if args.output.endswith((".jsonl", ".json")) else "csv")
+    async with aiohttp.ClientSession() as session:
+        api = TechemAPI(session, args.email, password, args.country)
+        return await export(
+            api,
+            args.object,
+            args.start,
+            args.end,
+            args.output,
+            fmt,
+            args.checkpoint,
+            args.workers,
+            not args.no_meters,
+            args.overwrite,
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Parse arguments, export and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", help="defaults to $TECHEM_PASSWORD, or is prompted for")
+    parser.add_argument("--country", choices=sorted(COUNTRIES), default="dk")
+    parser.add_argument("--object", action="append", required=True, help="object id, may be repeated")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="first day, YYYY-MM-DD")
+    parser.add_argument(
+        "--end", type=date.fromisoformat, default=date.today(), help="day the export stops before, default today"
+    )
+    parser.add_argument("--output", required=True, help="file the rows are appended to")
+    parser.add_argument("--format", choices=FORMATS, help="default from the output extension, else csv")
+    parser.add_argument("--checkpoint", help="default: the output path with .checkpoint appended")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_CONCURRENCY, help="windows fetched at once")
+    parser.add_argument("--no-meters", action="store_true", help="only export energy and water")
+    parser.add_argument(
+        "--overwrite", action="store_true", help="replace an output that has no checkpoint to resume from"
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+
+    password = args.password or os.environ.get("TECHEM_PASSWORD") or getpass.getpass("Techem password: ")
+    try:
+        written = asyncio.run(_run(args, password))
+    except TechemError as err:
+        _LOGGER.error("Export stopped, run again to resume: %s", err)
+        return 1
+    except FileExistsError as err:
+        _LOGGER.error("%s; pass --overwrite to replace it", err)
+        return 1
+    except KeyboardInterrupt:
+        _LOGGER.error("Export interrupted, run again to resume")
+        return 1
+    _LOGGER.info("Exported %d windows to %s", written, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
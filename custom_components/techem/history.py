@@ -0,0 +1,387 @@
+"""Columnar multi-year history of per-day Techem values."""
+from __future__ import annotations
+from array import array
+import asyncio
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+import logging
+import mmap
+import os
+import struct
+import sys
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import STORAGE_DIR
+from .const import DOMAIN, HISTORY_YEARS, UNSETTLED_DAYS
+from .storage import SAVE_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+HISTORY_VERSION = 2
+# One float64 per day of a year, NaN for days without a value; version 1 held float32
+TYPECODES = {1: "f", 2: "d"}
+DAYS_PER_PARTITION = 366
+MAGIC = b"TCHH"
+# Magic, version, byte order (0 little, 1 big) and number of partitions
+HEADER = struct.Struct("<4sBBxxI")
+# Year and key length of a partition, followed by the key "<object id>\0<series>"
+INDEX_ENTRY = struct.Struct("<HH")
+NAN = float("nan")
+# Series holding the ordinal of the day each day's values were fetched on
+FETCHED = "fetched"
+
+Partition = memoryview | array
+PartitionKey = tuple[str, str, int]
+
+
+def daily_values(values: dict) -> list[tuple[str, float]]:
+    """Return the series names and values of one day as returned by TechemAPI.get_daily_data.
+
+    Energy and water are left out of a day Techem returned no values for.
+    """
+    named = []
+    if consumption := values["values"]:
+        energy, water = consumption
+        named.extend((("energy", energy), ("water", water)))
+    if meters := values.get("meters"):
+        named.append(("heat", sum(meters.values())))
+        named.extend((f"meter_{number}", value) for number, value in meters.items())
+    return named
+
+
+def history_path(hass: HomeAssistant, entry_id: str) -> str:
+    """Return the history file of a config entry."""
+    return hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry_id}.history")
+
+
+async def async_remove_history(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete the history file of a config entry."""
+
+    def remove() -> None:
+        try:
+            os.remove(history_path(hass, entry_id))
+        except FileNotFoundError:
+            pass
+
+    await hass.async_add_executor_job(remove)
+
+
+def _align(offset: int) -> int:
+    """Round a file offset up to a multiple of 8, where partitions start."""
+    return (offset + 7) & ~7
+
+
+def _running_sums(partition: Partition) -> array:
+    """Return the running sums of a column, where index i sums the known values of the days before day i."""
+    # NaN marks a day without a value and is the only value not equal to itself
+    return array("d", accumulate((value if value == value else 0.0 for value in partition), initial=0.0))
+
+
+class HistoryStore:
+    """Per-day values of every object and series of an entry, partitioned by year.
+
+    This is the one per-day store: totals, comparisons and series
+    sensors all read it. Each (object id, series, year) is one column of
+    DAYS_PER_PARTITION float64 values indexed by day of the year, and the
+    FETCHED series records when each day was fetched, so days Techem may
+    still have revised are fetched again. The file holds a small index
+    followed by the columns back to back, and is memory-mapped on load,
+    so columns are read straight from the page cache and cost no RAM
+    until they are queried. Running sums of each column, built on load
+    and again after a column changed, answer sums over any window in
+    constant time per year. A column is copied to memory the first time
+    one of its days changes; the file is rewritten after SAVE_DELAY
+    seconds, when Home Assistant stops and when the store is closed.
+    Only the current year and the HISTORY_YEARS before it are kept, so
+    the file stops growing; older columns are dropped on load and when
+    a new year starts.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        """Initialize an empty history."""
+        self._hass = hass
+        self.path = history_path(hass, entry_id)
+        self._partitions: dict[PartitionKey, Partition] = {}
+        # Running sums of the value columns, dropped when a column changes
+        self._running_sums: dict[PartitionKey, array] = {}
+        # (object id, series) -> years that have a column, and the first day with a value
+        self._years: dict[tuple[str, str], set[int]] = {}
+        self._first: dict[tuple[str, str], date | None] = {}
+        # First year kept, once older columns were dropped
+        self._oldest: int | None = None
+        self._mmap: mmap.mmap | None = None
+        self._dirty = False
+        # The write running in the executor, which reads the columns until it is done
+        self._saving: asyncio.Future[None] | None = None
+        self._unsub_save: CALLBACK_TYPE | None = None
+        self._unsub_final_write: CALLBACK_TYPE | None = None
+        self._closed = False
+
+    @property
+    def partitions(self) -> int:
+        """Return the number of year columns held."""
+        return len(self._partitions)
+
+    async def async_load(self) -> None:
+        """Map the history file, if there is one."""
+        self._partitions, self._running_sums = await self._hass.async_add_executor_job(self._load)
+        self._years.clear()
+        self._first.clear()
+        for object_id, series, year in self._partitions:
+            self._years.setdefault((object_id, series), set()).add(year)
+        self._prune(date.today().year - HISTORY_YEARS)
+
+    def _load(self) -> tuple[dict[PartitionKey, Partition], dict[PartitionKey, array]]:
+        """Map the history file and return a view of each of its columns and the running sums of the values."""
+        try:
+            with open(self.path, "rb") as file:
+                if os.fstat(file.fileno()).st_size < HEADER.size:
+                    return {}, {}
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return {}, {}
+        try:
+            partitions = self._read(mapped)
+        except (ValueError, struct.error) as err:
+            _LOGGER.warning("Ignoring unreadable Techem history %s: %s", self.path, err)
+            mapped.close()
+            return {}, {}
+        self._mmap = mapped
+        running_sums = {key: _running_sums(partition) for key, partition in partitions.items() if key[1] != FETCHED}
+        return partitions, running_sums
+
+    @staticmethod
+    def _read(buffer: mmap.mmap) -> dict[PartitionKey, Partition]:
+        """Return the columns of a history file, copied only if its byte order or type is not ours."""
+        magic, version, order, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version not in TYPECODES:
+            raise ValueError(f"unknown format {magic!r} version {version}")
+        typecode = TYPECODES[version]
+        partition_bytes = DAYS_PER_PARTITION * array(typecode).itemsize
+        offset = HEADER.size
+        keys = []
+        for _ in range(count):
+            year, length = INDEX_ENTRY.unpack_from(buffer, offset)
+            offset += INDEX_ENTRY.size
+            object_id, series = buffer[offset:offset + length].decode().split("\0")
+            offset += length
+            keys.append((object_id, series, year))
+        offset = _align(offset)
+        if offset + count * partition_bytes > len(buffer):
+            raise ValueError("truncated")
+
+        swap = order != (sys.byteorder == "big")
+        view = memoryview(buffer)
+        partitions: dict[PartitionKey, Partition] = {}
+        for index, key in enumerate(keys):
+            start = offset + index * partition_bytes
+            partition: Partition = view[start:start + partition_bytes].cast(typecode)
+            if swap or typecode != TYPECODES[HISTORY_VERSION]:
+                partition = array(typecode, partition)
+                if swap:
+                    partition.byteswap()
+                partition = array(TYPECODES[HISTORY_VERSION], partition)
+            partitions[key] = partition
+        return partitions
+
+    def update(self, object_id: str, daily: dict[date, dict], fetched: date) -> None:
+        """Store per-day values and meter readings as returned by TechemAPI.get_daily_data, fetched on fetched.
+
+        Days of years the history no longer keeps are left out.
+        """
+        oldest = fetched.year - HISTORY_YEARS
+        if oldest != self._oldest:
+            self._prune(oldest)
+        for day, values in daily.items():
+            if day.year < oldest:
+                continue
+            index = day.timetuple().tm_yday - 1
+            for series, value in daily_values(values):
+                if value is not None:
+                    self._set((object_id, series, day.year), index, value)
+            # Also for a day Techem returned without values, as before move-in, so once
+            # settled it is not asked for again
+            self._set((object_id, FETCHED, day.year), index, fetched.toordinal())
+
+    def _prune(self, oldest: int) -> None:
+        """Drop the columns of the years before oldest."""
+        self._oldest = oldest
+        for key in [key for key in self._partitions if key[2] < oldest]:
+            del self._partitions[key]
+            self._running_sums.pop(key, None)
+            years = self._years[key[:2]]
+            years.discard(key[2])
+            if not years:
+                del self._years[key[:2]]
+            self._first.pop(key[:2], None)
+            self._dirty = True
+
+    def _set(self, key: PartitionKey, index: int, value: float) -> None:
+        """Store one value, copying a mapped column to memory on its first change."""
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = array(TYPECODES[HISTORY_VERSION], (NAN,)) * DAYS_PER_PARTITION
+            self._years.setdefault(key[:2], set()).add(key[2])
+        elif partition[index] == value:
+            return
+        elif isinstance(partition, memoryview):
+            partition = self._partitions[key] = array(TYPECODES[HISTORY_VERSION], partition)
+        partition[index] = value
+        self._dirty = True
+        self._first.pop(key[:2], None)
+        self._running_sums.pop(key, None)
+
+    def _value(self, object_id: str, series: str, day: date) -> float | None:
+        """Return the value of one day, or None if it has none."""
+        partition = self._partitions.get((object_id, series, day.year))
+        if partition is None:
+            return None
+        value = partition[day.timetuple().tm_yday - 1]
+        return value if value == value else None
+
+    def missing(self, object_id: str, days: Iterable[date]) -> list[date]:
+        """Return the days Techem has not returned yet or returned before they settled."""
+        missing = []
+        for day in days:
+            fetched = self._value(object_id, FETCHED, day)
+            if fetched is None or fetched - day.toordinal() < UNSETTLED_DAYS:
+                missing.append(day)
+        return missing
+
+    def first(self, object_id: str, series: str) -> date | None:
+        """Return the first day of a series that has a value, None if there is none."""
+        key = (object_id, series)
+        if key not in self._first:
+            self._first[key] = None
+            for year in sorted(self._years.get(key, ())):
+                partition = self._partitions[(object_id, series, year)]
+                # NaN marks a day without a value and is the only value not equal to itself
+                index = next((index for index, value in enumerate(partition) if value == value), None)
+                if index is not None:
+                    self._first[key] = date(year, 1, 1) + timedelta(days=index)
+                    break
+        return self._first[key]
+
+    def _spans(self, object_id: str, series: str, start: date, end: date):
+        """Yield the column key, first day-of-year index and days of each year from start until end."""
+        day = start
+        while day < end:
+            last = min(end, date(day.year + 1, 1, 1))
+            yield (object_id, series, day.year), day.timetuple().tm_yday - 1, (last - day).days
+            day = last
+
+    def slice(self, object_id: str, series: str, start: date, end: date) -> list[float | None]:
+        """Return the values of the days from start until end, None for days without one."""
+        values: list[float | None] = []
+        for key, first, days in self._spans(object_id, series, start, end):
+            if (partition := self._partitions.get(key)) is None:
+                values.extend([None] * days)
+            else:
+                # NaN marks a day without a value and is the only value not equal to itself
+                values.extend(value if value == value else None for value in partition[first:first + days])
+        return values
+
+    def series(self, object_id: str) -> list[str]:
+        """Return the names of the series an object has values of."""
+        return [series for owner, series in self._years if owner == object_id and series != FETCHED]
+
+    def window(self, object_id: str, last: date, days: int) -> dict[str, list[float | None]]:
+        """Return the days up to and including last of every series of an object, oldest first."""
+        start = last - timedelta(days=days - 1)
+        end = last + timedelta(days=1)
+        return {series: self.slice(object_id, series, start, end) for series in self.series(object_id)}
+
+    def sum(self, object_id: str, series: str, start: date, end: date) -> float:
+        """Return the sum of the known values of the days from start until end."""
+        total = 0.0
+        for key, first, days in self._spans(object_id, series, start, end):
+            if (partition := self._partitions.get(key)) is None:
+                continue
+            if (running_sums := self._running_sums.get(key)) is None:
+                running_sums = self._running_sums[key] = _running_sums(partition)
+            total += running_sums[first + days] - running_sums[first]
+        return total
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Write the history to disk after a short delay, and before Home Assistant stops."""
+        if not self._dirty or self._closed:
+            return
+        if self._unsub_save is None:
+            self._unsub_save = async_call_later(self._hass, SAVE_DELAY, self._async_save_later)
+        if self._unsub_final_write is None:
+            self._unsub_final_write = self._hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_final_write
+            )
+
+    async def _async_save_later(self, _now: datetime) -> None:
+        """Write the history once the save delay has passed."""
+        self._unsub_save = None
+        await self.async_save()
+
+    async def _async_final_write(self, _event: Event) -> None:
+        """Write the history when Home Assistant stops."""
+        self._unsub_final_write = None
+        await self.async_save()
+
+    async def async_close(self) -> None:
+        """Cancel the scheduled writes, write pending changes now and unmap the file.
+
+        A write already running is waited for first, as it reads the mapped
+        columns. The history is empty afterwards and is not written again.
+        """
+        self._closed = True
+        if self._unsub_save is not None:
+            self._unsub_save()
+            self._unsub_save = None
+        if self._unsub_final_write is not None:
+            self._unsub_final_write()
+            self._unsub_final_write = None
+        await self.async_save()
+        for partition in self._partitions.values():
+            if isinstance(partition, memoryview):
+                partition.release()
+        self._partitions = {}
+        self._running_sums.clear()
+        self._years.clear()
+        self._first.clear()
+        self._oldest = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    async def async_save(self) -> None:
+        """Write the history to disk if it changed, once a write already running is done."""
+        while (saving := self._saving) is not None and not saving.done():
+            await asyncio.wait((saving,))
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._saving = self._hass.async_add_executor_job(self._write, list(self._partitions.items()))
+        # Shielded, so a cancelled caller does not mark the write done while it still runs
+        await asyncio.shield(self._saving)
+
+    def _write(self, partitions: list[tuple[PartitionKey, Partition]]) -> None:
+        """Write the index and the columns to a new file that then replaces the old one.
+
+        The old file stays mapped, and valid, until the next load.
+        """
+        index = bytearray()
+        for (object_id, series, year), _ in partitions:
+            key = f"{object_id}\0{series}".encode()
+            index += INDEX_ENTRY.pack(year, len(key)) + key
+        header = HEADER.pack(MAGIC, HISTORY_VERSION, sys.byteorder == "big", len(partitions))
+        padding = _align(HEADER.size + len(index)) - HEADER.size - len(index)
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(header)
+            file.write(index)
+            file.write(bytes(padding))
+            for _, partition in partitions:
+                file.write(partition)
+        os.replace(temp_path, self.path)
+        _LOGGER.debug("Wrote %d Techem history columns to %s", len(partitions), self.path)
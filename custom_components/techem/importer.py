@@ -0,0 +1,140 @@
+"""Import Techem daily consumption into Home Assistant long-term statistics."""
+from __future__ import annotations
+import asyncio
+from datetime import date, timedelta
+import logging
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.const import UnitOfEnergy, UnitOfVolume
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+from .const import DOMAIN, DAYS_PER_REQUEST, UNIT_HCA, UNSETTLED_DAYS
+from .coordinator import TechemCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+IMPORT_INTERVAL = timedelta(hours=6)
+# How far back the first import reaches
+BACKFILL_DAYS = 400
+CURSOR_STORE_VERSION = 1
+
+
+class TechemStatisticsImporter:
+    """Backfill and incrementally import daily totals as external statistics.
+
+    Energy, water and per-meter HCA values of every object are imported
+    one row per day from the coordinator's history. Only days the history
+    lacks, or holds without meter readings once the object has meters,
+    are fetched from Techem, into the history. A cursor per object with
+    the next day to import and the running sums is persisted after every
+    chunk, so an interrupted import resumes where it stopped. A day Techem
+    did not return stops the import before it until a later run gets it.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, coordinator: TechemCoordinator):
+        """Initialize the importer."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self._object_ids = coordinator.object_ids
+        self._store = Store(hass, CURSOR_STORE_VERSION, f"{DOMAIN}.{entry_id}.statistics")
+        self._cursor: dict | None = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def statistic_id(object_id: str, key: str) -> str:
+        """Return the external statistic id for energy, water or a meter of an object."""
+        return f"{DOMAIN}:{slugify(object_id)}_{key}"
+
+    async def async_run(self, *_args) -> None:
+        """Import every settled day after the cursor of each object."""
+        if self._lock.locked():
+            return
+        async with self._lock:
+            if self._cursor is None:
+                cursor = await self._store.async_load() or {}
+                if "next_day" in cursor:
+                    # Written before entries could hold several objects
+                    cursor = {self._object_ids[0]: cursor}
+                self._cursor = cursor
+
+            for object_id in self._object_ids:
+                # The days the coordinator is filling in need no request of their own
+                await self._coordinator.async_wait_for_fill(object_id)
+                await self._async_import_object(object_id)
+
+    async def _async_import_object(self, object_id: str) -> None:
+        """Import every settled day after the cursor of one object."""
+        cursor = self._cursor.setdefault(object_id, {})
+        last_day = dt_util.now().date() - timedelta(days=UNSETTLED_DAYS)
+        if "next_day" in cursor:
+            day = date.fromisoformat(cursor["next_day"])
+        else:
+            day = last_day - timedelta(days=BACKFILL_DAYS)
+
+        while day <= last_day:
+            count = min(DAYS_PER_REQUEST, (last_day - day).days + 1)
+            days = [day + timedelta(days=offset) for offset in range(count)]
+            if missing := self._missing(object_id, days):
+                try:
+                    await self._coordinator.async_fetch_days(object_id, missing)
+                except Exception as err:
+                    _LOGGER.warning("Statistics import of %s stopped at %s: %s", object_id, day, err)
+                    return
+                # Days Techem failed to return are imported once a later run fetched them
+                if missing := self._coordinator.history.missing(object_id, days):
+                    days = days[:days.index(missing[0])]
+
+            if days:
+                self._import(object_id, cursor, days)
+                day = days[-1] + timedelta(days=1)
+                cursor["next_day"] = day.isoformat()
+                await self._store.async_save(self._cursor)
+            if missing:
+                _LOGGER.debug("Statistics import of %s stopped at %s, which Techem did not return", object_id, day)
+                return
+
+    def _missing(self, object_id: str, days: list[date]) -> list[date]:
+        """Return the days the history lacks, or holds without meter readings although the object has meters."""
+        history = self._coordinator.history
+        missing = set(history.missing(object_id, days))
+        if history.first(object_id, "heat") is not None:
+            heat = history.slice(object_id, "heat", days[0], days[-1] + timedelta(days=1))
+            missing.update(day for day, value in zip(days, heat) if value is None)
+        return sorted(missing)
+
+    def _import(self, object_id: str, cursor: dict, days: list[date]) -> None:
+        """Add one statistics row per day and series from the history, continuing the running sums."""
+        sums = cursor.setdefault("sums", {})
+        window = self._coordinator.history.window(object_id, days[-1], len(days))
+        for name, values in window.items():
+            if name in ("energy", "water"):
+                key = name
+            elif name.startswith("meter_"):
+                key = f"meter_{slugify(name.removeprefix('meter_'))}"
+            else:
+                continue
+            rows = []
+            for day, value in zip(days, values):
+                if value is None:
+                    continue
+                sums[key] = sums.get(key, 0.0) + value
+                rows.append(StatisticData(start=dt_util.start_of_local_day(day), state=value, sum=sums[key]))
+            if rows:
+                async_add_external_statistics(self._hass, self._metadata(object_id, key), rows)
+
+    def _metadata(self, object_id: str, key: str) -> StatisticMetaData:
+        """Return the statistic metadata for a series key."""
+        if key == "energy":
+            name, unit = "Energy", UnitOfEnergy.KILO_WATT_HOUR
+        elif key == "water":
+            name, unit = "Water", UnitOfVolume.CUBIC_METERS
+        else:
+            name, unit = f"Meter {key.removeprefix('meter_')}", UNIT_HCA
+        return StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"Techem {name} ({object_id})",
+            source=DOMAIN,
+            statistic_id=self.statistic_id(object_id, key),
+            unit_of_measurement=unit,
+        )
@@ -0,0 +1,84 @@
+"""Request counters and latency histograms for the Techem API client."""
+from __future__ import annotations
+from bisect import bisect_left
+
+# Upper bounds of the latency histogram buckets in milliseconds, the last one is open
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class OperationStats:
+    """Counters and a latency histogram for one GraphQL operation."""
+
+    def __init__(self):
+        """Initialize empty counters."""
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms: float, sent: int, received: int, error: bool) -> None:
+        """Record one request."""
+        self.requests += 1
+        self.errors += error
+        self.bytes_sent += sent
+        self.bytes_received += received
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.histogram[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def as_dict(self) -> dict:
+        """Return the counters for diagnostics."""
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "mean_ms": round(self.total_ms / self.requests, 1) if self.requests else None,
+            "max_ms": round(self.max_ms, 1),
+            "latency_histogram": dict(zip(labels, self.histogram)),
+        }
+
+
+class TechemMetrics:
+    """Per-operation request statistics, retry counts and token cache use of one client."""
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.operations: dict[str, OperationStats] = {}
+        self.retries = 0
+        self.coalesced = 0
+        self.token_hits = 0
+        self.token_misses = 0
+
+    def record(self, operation: str, elapsed_ms: float, sent: int, received: int, error: bool) -> None:
+        """Record one request of the given operation."""
+        if (stats := self.operations.get(operation)) is None:
+            stats = self.operations[operation] = OperationStats()
+        stats.record(elapsed_ms, sent, received, error)
+
+    @property
+    def requests(self) -> int:
+        """Return the number of requests sent."""
+        return sum(stats.requests for stats in self.operations.values())
+
+    @property
+    def logins(self) -> int:
+        """Return the number of login requests sent."""
+        stats = self.operations.get("login")
+        return stats.requests if stats else 0
+
+    def as_dict(self) -> dict:
+        """Return every statistic for diagnostics."""
+        return {
+            "requests": self.requests,
+            "logins": self.logins,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+            "token_hits": self.token_hits,
+            "token_misses": self.token_misses,
+            "operations": {name: stats.as_dict() for name, stats in self.operations.items()},
+        }
@@ -0,0 +1,173 @@
+"""Parsed Techem data held by the coordinator."""
+from __future__ import annotations
+from dataclasses import dataclass
+from .derived import derive_values
+from .techem_api import TechemParseError
+
+
+def _number(value) -> float:
+    """Return value as a float, rejecting anything that is not a number."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(f"expected a number, got {value!r}")
+    return float(value)
+
+
+def _optional(value) -> float | None:
+    """Return value as a float, or None if it is None."""
+    return None if value is None else _number(value)
+
+
+@dataclass(slots=True, frozen=True)
+class ConsumptionRow:
+    """Energy (kWh) and water (m³) of a period and of its comparison period."""
+
+    energy: float
+    water: float
+    comparison_energy: float
+    comparison_water: float
+
+    @classmethod
+    def parse(cls, row: dict) -> ConsumptionRow:
+        """Parse a TenantTable row."""
+        energy, water = row["values"][:2]
+        comparison_energy, comparison_water = row["comparisonValues"][:2]
+        return cls(_number(energy), _number(water), _number(comparison_energy), _number(comparison_water))
+
+    def to_payload(self) -> dict:
+        """Return the row shaped like Techem's response."""
+        return {
+            "values": [self.energy, self.water],
+            "comparisonValues": [self.comparison_energy, self.comparison_water],
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class Room:
+    """Heat cost allocator units of one room, rounded for display."""
+
+    label: str
+    value: float
+
+
+@dataclass(slots=True, frozen=True)
+class Meter:
+    """Heat cost allocator units of one meter, rounded for display."""
+
+    number: str
+    room: str
+    value: float
+
+
+@dataclass(slots=True, frozen=True)
+class KpiSummary:
+    """Heat units of the KPI period with comparison totals, rooms and meters."""
+
+    total: float
+    previous_period: float
+    previous_year: float
+    property_comparison: float
+    rooms: dict[str, Room]
+    meters: dict[str, Meter]
+
+    @classmethod
+    def parse(cls, kpi: dict) -> KpiSummary:
+        """Parse a UnitQuantityKPIs result."""
+        rooms = {}
+        for room in kpi.get("rooms") or []:
+            rooms[room["label"]] = Room(room["label"], round(_number(room["value"]), 1))
+        meters = {}
+        for meter in kpi.get("meters") or []:
+            details = meter["object"]["group"]["meter"]
+            meters[details["number"]] = Meter(
+                details["number"], details["roomName"], round(_number(meter["value"]), 1)
+            )
+        return cls(
+            _number(kpi.get("total") or 0),
+            _number(kpi.get("previousPeriod") or 0),
+            _number(kpi.get("previousYear") or 0),
+            _number(kpi.get("propertyComparison") or 0),
+            rooms,
+            meters,
+        )
+
+    def to_payload(self) -> dict:
+        """Return the summary shaped like Techem's response."""
+        return {
+            "total": self.total,
+            "previousPeriod": self.previous_period,
+            "previousYear": self.previous_year,
+            "propertyComparison": self.property_comparison,
+            "rooms": [{"label": room.label, "value": room.value} for room in self.rooms.values()],
+            "meters": [
+                {
+                    "object": {"group": {"meter": {"number": meter.number, "roomName": meter.room}}},
+                    "value": meter.value,
+                }
+                for meter in self.meters.values()
+            ],
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class ObjectData:
+    """Everything the sensors of one Techem object read.
+
+    comparisons maps each comparison window to its totals, and
+    year_to_date each meter series to its units this year to date and
+    over the same days last year. values holds every sensor value,
+    derived once at parse time and keyed by the sensor's unique id suffix.
+    """
+
+    yearly: ConsumptionRow | None
+    weekly: ConsumptionRow | None
+    kpi: KpiSummary | None
+    series: dict[str, tuple[float | None, ...]]
+    comparisons: dict[str, ConsumptionRow]
+    year_to_date: dict[str, tuple[float | None, float | None]]
+    values: dict[str, float | None]
+
+    @classmethod
+    def parse(cls, sections: dict) -> ObjectData:
+        """Parse the yearly, weekly and kpi sections, daily series, comparisons and year-to-date totals of one object.
+
+        Raises TechemParseError if a section does not look like Techem's
+        response.
+        """
+        try:
+            yearly = ConsumptionRow.parse(sections["yearly"]) if sections.get("yearly") else None
+            weekly = ConsumptionRow.parse(sections["weekly"]) if sections.get("weekly") else None
+            kpi = KpiSummary.parse(sections["kpi"]) if sections.get("kpi") else None
+            series = {
+                name: tuple(_optional(value) for value in values)
+                for name, values in (sections.get("series") or {}).items()
+            }
+            comparisons = {
+                name: ConsumptionRow.parse(row)
+                for name, row in (sections.get("comparisons") or {}).items()
+            }
+            year_to_date = {
+                name: (_optional(this_year), _optional(last_year))
+                for name, (this_year, last_year) in (sections.get("year_to_date") or {}).items()
+            }
+        except (KeyError, IndexError, TypeError, ValueError) as err:
+            raise TechemParseError(f"Unexpected Techem response: {err!r}") from err
+        return cls(
+            yearly,
+            weekly,
+            kpi,
+            series,
+            comparisons,
+            year_to_date,
+            derive_values(yearly, weekly, kpi, series, comparisons, year_to_date),
+        )
+
+    def to_payload(self) -> dict:
+        """Return the sections shaped like Techem's responses, plus the series, comparisons and year-to-date totals."""
+        payload = {
+            name: section.to_payload() if section else None
+            for name, section in (("yearly", self.yearly), ("weekly", self.weekly), ("kpi", self.kpi))
+        }
+        payload["series"] = {name: list(values) for name, values in self.series.items()}
+        payload["comparisons"] = {name: row.to_payload() for name, row in self.comparisons.items()}
+        payload["year_to_date"] = {name: list(totals) for name, totals in self.year_to_date.items()}
+        return payload
@@ -0,0 +1,177 @@
+"""Retry backoff, circuit breaker and rate limiting for Techem requests."""
+from __future__ import annotations
+import asyncio
+from collections.abc import Callable
+from contextvars import ContextVar, copy_context
+import heapq
+import itertools
+import random
+import time
+from typing import TypeVar
+
+# Attempts per request, including the first one
+RETRY_ATTEMPTS = 4
+# Seconds a request may spend retrying before giving up
+RETRY_BUDGET = 60.0
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 20.0
+# Consecutive failed requests that open the breaker
+BREAKER_THRESHOLD = 5
+# Seconds the breaker stays open before a trial request is let through
+BREAKER_RESET = 300.0
+# Requests per second sent to one Techem host, and how many may go at once after a pause
+RATE_LIMIT = 5.0
+RATE_BURST = 20
+# Waiting requests are served lowest priority first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+# Priority of the requests sent by the current task
+request_priority: ContextVar[int] = ContextVar("techem_request_priority", default=PRIORITY_BACKGROUND)
+
+_T = TypeVar("_T")
+
+
+def in_background(function: Callable[..., _T], *args) -> _T:
+    """Call function at background priority, as must code that creates a task or timer.
+
+    Tasks and timers copy the context they are created in, so without this
+    one started during an interactive refresh would keep its priority.
+    """
+    context = copy_context()
+    context.run(request_priority.set, PRIORITY_BACKGROUND)
+    return context.run(function, *args)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Return a fully jittered exponential delay before retry number attempt."""
+    return random.uniform(0, min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX))
+
+
+class CircuitBreaker:
+    """Stop sending requests to an endpoint that keeps failing.
+
+    After BREAKER_THRESHOLD consecutive failures the breaker opens and
+    requests are refused for BREAKER_RESET seconds. Then a single trial
+    request is allowed: success closes the breaker, failure opens it again,
+    and a trial that is abandoned lets the next request try instead.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, reset_after: float = BREAKER_RESET):
+        """Initialize a closed breaker."""
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        """Return "closed", "open" or "half_open"."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return "open"
+        return "half_open"
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds until the breaker lets a trial request through."""
+        if self.opened_at is None:
+            return 0.0
+        return max(self.reset_after - (time.monotonic() - self.opened_at), 0.0)
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def succeeded(self) -> None:
+        """Record a successful request and close the breaker."""
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def failed(self) -> None:
+        """Record a failed request, opening the breaker at the threshold."""
+        self.failures += 1
+        self._trial = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+    def abandoned(self) -> None:
+        """Record a request that ended without an answer, such as a cancelled one."""
+        self._trial = False
+
+
+class TokenBucket:
+    """Limit the request rate to one host, serving waiting requests by priority.
+
+    Each request takes a token. Tokens refill at rate per second up to
+    burst. While the bucket is empty, requests wait in order of priority,
+    then of arrival, so interactive refreshes overtake background polls.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT, burst: int = RATE_BURST):
+        """Initialize a full bucket."""
+        self.rate = rate
+        self.burst = burst
+        self.waited = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def acquire(self, priority: int | None = None) -> None:
+        """Wait for a token; priority defaults to that of the current task."""
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+        if priority is None:
+            priority = request_priority.get()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self.waited += 1
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation, so give the token back
+                self._tokens = min(self._tokens + 1, self.burst)
+                self._release()
+            raise
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst)
+        self._updated = now
+
+    def _schedule(self) -> None:
+        """Wake the waiters when the next token is due."""
+        if self._timer is None and self._waiters:
+            delay = max((1 - self._tokens) / self.rate, 0)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        """Run the timer's release."""
+        self._timer = None
+        self._release()
+
+    def _release(self) -> None:
+        """Hand the available tokens to the first waiters still waiting."""
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+        self._schedule()
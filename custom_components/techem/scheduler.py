@@ -0,0 +1,116 @@
+"""Adaptive polling schedule for the Techem coordinator."""
+from __future__ import annotations
+from datetime import datetime, timedelta
+import hashlib
+import json
+
+BASE_INTERVAL = timedelta(hours=1)
+MIN_INTERVAL = timedelta(minutes=15)
+MAX_INTERVAL = timedelta(hours=6)
+ERROR_INTERVAL = timedelta(minutes=15)
+BACKOFF_FACTOR = 1.5
+# Weight kept by the publish-hour histogram each time new data is seen
+HISTORY_DECAY = 0.9
+# Hours with at least this share of the busiest hour's weight count as publish hours
+PUBLISH_SHARE = 0.5
+# Changes seen before the histogram is trusted
+MIN_OBSERVATIONS = 3
+
+
+def fingerprint(data: dict) -> str:
+    """Return a stable hash of the published values."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+class AdaptivePollScheduler:
+    """Choose the next poll interval from when Techem data actually changes.
+
+    Every successful poll fingerprints the values Techem published, which
+    the coordinator passes as the last day with a value of each series.
+    When the fingerprint changes, the hours since the previous poll (when
+    the data must have been published) share one unit of weight in a
+    decaying histogram, and the interval goes back to BASE_INTERVAL. The
+    first poll after a restart only takes the fingerprint, as the time of
+    the poll before it is not known. While nothing changes the interval
+    grows by BACKOFF_FACTOR up to MAX_INTERVAL, but polls are pulled
+    forward to the next learned publish hour and run every MIN_INTERVAL
+    during it. Failures back off exponentially from ERROR_INTERVAL.
+    """
+
+    def __init__(self):
+        """Initialize with no history."""
+        self._fingerprint: str | None = None
+        self._last_poll: datetime | None = None
+        self._interval = BASE_INTERVAL
+        self._errors = 0
+        self._hours = [0.0] * 24
+        self._observations = 0
+
+    @property
+    def publish_hours(self) -> list[int]:
+        """Return the local hours in which new data is usually published."""
+        if self._observations < MIN_OBSERVATIONS:
+            return []
+        busiest = max(self._hours)
+        return [hour for hour, weight in enumerate(self._hours) if weight >= busiest * PUBLISH_SHARE]
+
+    def succeeded(self, data: dict, now: datetime) -> timedelta:
+        """Record a successful poll of the published values and return the interval until the next one."""
+        self._errors = 0
+        current = fingerprint(data)
+        if current != self._fingerprint:
+            if self._fingerprint is not None and self._last_poll is not None:
+                self._learn(self._last_poll, now)
+            self._fingerprint = current
+            self._interval = BASE_INTERVAL
+        else:
+            self._interval = min(self._interval * BACKOFF_FACTOR, MAX_INTERVAL)
+        self._last_poll = now
+        return self._next_interval(now)
+
+    def _learn(self, since: datetime, now: datetime) -> None:
+        """Record that new data was published between since and now."""
+        hours = []
+        moment = since
+        while moment < now and len(hours) < 24:
+            hours.append(moment.hour)
+            moment = moment.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        hours = hours or [now.hour]
+        self._hours = [weight * HISTORY_DECAY for weight in self._hours]
+        for hour in hours:
+            self._hours[hour] += 1 / len(hours)
+        self._observations += 1
+
+    def failed(self) -> timedelta:
+        """Record a failed poll and return the interval until the next attempt."""
+        self._errors += 1
+        return min(ERROR_INTERVAL * 2 ** (self._errors - 1), MAX_INTERVAL)
+
+    def _next_interval(self, now: datetime) -> timedelta:
+        """Return the backed-off interval, shortened to reach the next publish hour."""
+        hours = self.publish_hours
+        if not hours:
+            return self._interval
+        if now.hour in hours:
+            return MIN_INTERVAL
+        start_of_hour = now.replace(minute=0, second=0, microsecond=0)
+        wait = min(
+            start_of_hour + timedelta(hours=(hour - now.hour) % 24) - now
+            for hour in hours
+        )
+        return min(self._interval, max(wait, MIN_INTERVAL))
+
+    def as_dict(self) -> dict:
+        """Return the learned state for persistent storage."""
+        return {
+            "fingerprint": self._fingerprint,
+            "hours": self._hours,
+            "observations": self._observations,
+        }
+
+    def restore(self, data: dict) -> None:
+        """Load state previously returned by as_dict."""
+        self._fingerprint = data.get("fingerprint")
+        self._hours = list(data.get("hours") or self._hours)
+        self._observations = data.get("observations", 0)
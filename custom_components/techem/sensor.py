@@ -1,312 +1,413 @@
 """Sensor platform for Techem integration."""
 from __future__ import annotations
-from datetime import timedelta
 import logging
-from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from collections.abc import Callable
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_EMAIL, CONF_PASSWORD, UnitOfEnergy, UnitOfVolume, PERCENTAGE
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, UnitOfEnergy, UnitOfTime, UnitOfVolume, PERCENTAGE
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, CoordinatorEntity
 from homeassistant.util import slugify
-from .const import DOMAIN, CONF_COUNTRY, CONF_OBJECT_ID, UNIT_HCA
-from .techem_api import TechemAPI
+from .comparisons import comparison_labels
+from .const import DOMAIN, SERIES_WINDOW, UNIT_HCA
+from .coordinator import TechemCoordinator
+from .entity import TechemEntity
+from .derived import YEAR_TO_DATE, series_digits
 
 _LOGGER = logging.getLogger(__name__)
-SCAN_INTERVAL = timedelta(hours=1)
 
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    """Set up Techem sensors."""
-    api = TechemAPI(
-        entry.data[CONF_EMAIL],
-        entry.data[CONF_PASSWORD],
-        entry.data[CONF_OBJECT_ID],
-        entry.data[CONF_COUNTRY]
-    )
-
-    # Create coordinators for yearly and weekly data
-    yearly_coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name="techem_yearly",
-        update_method=lambda: hass.async_add_executor_job(api.get_data, True),
-        update_interval=SCAN_INTERVAL,
-    )
-
-    weekly_coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name="techem_weekly",
-        update_method=lambda: hass.async_add_executor_job(api.get_data, False),
-        update_interval=SCAN_INTERVAL,
-    )
-
-    # Create coordinator for KPI data (rooms, meters, comparisons)
-    kpi_coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name="techem_kpi",
-        update_method=lambda: hass.async_add_executor_job(api.get_kpi_data, 30),
-        update_interval=SCAN_INTERVAL,
-    )
-
-    # Fetch initial data
-    await yearly_coordinator.async_config_entry_first_refresh()
-    await weekly_coordinator.async_config_entry_first_refresh()
-    await kpi_coordinator.async_config_entry_first_refresh()
-
-    object_id = entry.data[CONF_OBJECT_ID]
+    """Set up Techem sensors.
+
+    KPI, room and meter sensors are added on the first update that
+    reports them, so new meters, or KPI data that failed at startup, do
+    not need a reload.
+    """
+    coordinator: TechemCoordinator = hass.data[DOMAIN][entry.entry_id]
+    # "kpi" and the rooms and meters that have sensors, per object
+    known: dict[str, set] = {object_id: set() for object_id in coordinator.object_ids}
+
+    sensors = []
+    for object_id in coordinator.object_ids:
+        sensors.extend(_object_sensors(coordinator, object_id))
+        sensors.extend(_kpi_sensors(coordinator, object_id, known[object_id]))
+    sensors.extend(_diagnostic_sensors(coordinator))
+    async_add_entities(sensors)
+
+    @callback
+    def _async_add_new_sensors() -> None:
+        """Add sensors for KPI data, rooms and meters the last update reported for the first time."""
+        new_sensors = []
+        for object_id in coordinator.object_ids:
+            new_sensors.extend(_kpi_sensors(coordinator, object_id, known[object_id]))
+        if new_sensors:
+            _LOGGER.debug("Adding %d new Techem sensors", len(new_sensors))
+            async_add_entities(new_sensors)
+
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_new_sensors))
+
 
+def _object_sensors(coordinator: TechemCoordinator, object_id: str) -> list[SensorEntity]:
+    """Return the sensors of one Techem object that do not depend on KPI data."""
     sensors = [
         # Base yearly sensors (4)
-        TechemBaseSensor(yearly_coordinator, "energy", "Energy This Year", UnitOfEnergy.KILO_WATT_HOUR, 0, object_id, "yearly"),
-        TechemBaseSensor(yearly_coordinator, "water", "Water This Year", UnitOfVolume.CUBIC_METERS, 1, object_id, "yearly"),
-        TechemComparisonSensor(yearly_coordinator, "energy", "Energy Compared to Last Year", PERCENTAGE, 0, object_id, "yearly"),
-        TechemComparisonSensor(yearly_coordinator, "water", "Water Compared to Last Year", PERCENTAGE, 1, object_id, "yearly"),
+        TechemBaseSensor(coordinator, "energy", "Energy This Year", UnitOfEnergy.KILO_WATT_HOUR, object_id, "yearly"),
+        TechemBaseSensor(coordinator, "water", "Water This Year", UnitOfVolume.CUBIC_METERS, object_id, "yearly"),
+        TechemComparisonSensor(coordinator, "energy", "Energy Compared to Last Year", PERCENTAGE, object_id, "yearly"),
+        TechemComparisonSensor(coordinator, "water", "Water Compared to Last Year", PERCENTAGE, object_id, "yearly"),
         
         # Base weekly sensors (6)
-        TechemBaseSensor(weekly_coordinator, "energy", "Energy This Week", UnitOfEnergy.KILO_WATT_HOUR, 0, object_id, "weekly"),
-        TechemBaseSensor(weekly_coordinator, "water", "Water This Week", UnitOfVolume.CUBIC_METERS, 1, object_id, "weekly"),
-        TechemDailyAverageSensor(weekly_coordinator, "energy", "Energy Daily Average Last 7 Days", UnitOfEnergy.KILO_WATT_HOUR, 0, object_id),
-        TechemDailyAverageSensor(weekly_coordinator, "water", "Water Daily Average Last 7 Days", UnitOfVolume.CUBIC_METERS, 1, object_id),
-        TechemComparisonSensor(weekly_coordinator, "energy", "Energy Compared to Previous Week", PERCENTAGE, 0, object_id, "weekly"),
-        TechemComparisonSensor(weekly_coordinator, "water", "Water Compared to Previous Week", PERCENTAGE, 1, object_id, "weekly"),
+        TechemBaseSensor(coordinator, "energy", "Energy This Week", UnitOfEnergy.KILO_WATT_HOUR, object_id, "weekly"),
+        TechemBaseSensor(coordinator, "water", "Water This Week", UnitOfVolume.CUBIC_METERS, object_id, "weekly"),
+        TechemDailyAverageSensor(coordinator, "energy", "Energy Daily Average Last 7 Days", UnitOfEnergy.KILO_WATT_HOUR, object_id),
+        TechemDailyAverageSensor(coordinator, "water", "Water Daily Average Last 7 Days", UnitOfVolume.CUBIC_METERS, object_id),
+        TechemComparisonSensor(coordinator, "energy", "Energy Compared to Previous Week", PERCENTAGE, object_id, "weekly"),
+        TechemComparisonSensor(coordinator, "water", "Water Compared to Previous Week", PERCENTAGE, object_id, "weekly"),
     ]
 
-    # Add KPI-based sensors if data is available
-    if kpi_coordinator.data:
-        # Total heat sensor
-        sensors.append(
-            TechemTotalHeatSensor(kpi_coordinator, object_id)
-        )
-        
-        # Property comparison sensors
+    # Per-day series sensors (6)
+    sensors.extend(_series_sensors(coordinator, "energy", "Energy", UnitOfEnergy.KILO_WATT_HOUR, object_id))
+    sensors.extend(_series_sensors(coordinator, "water", "Water", UnitOfVolume.CUBIC_METERS, object_id))
+
+    # Comparisons summed from the history (2 per window)
+    for window, label in comparison_labels(coordinator.comparison_days).items():
         sensors.extend([
-            TechemPropertyComparisonSensor(kpi_coordinator, "previous_period", "Heat vs Previous Period", object_id),
-            TechemPropertyComparisonSensor(kpi_coordinator, "previous_year", "Heat vs Previous Year", object_id),
-            TechemPropertyComparisonSensor(kpi_coordinator, "property", "Heat vs Property Average", object_id),
+            TechemWindowComparisonSensor(coordinator, "energy", f"Energy {label}", object_id, window),
+            TechemWindowComparisonSensor(coordinator, "water", f"Water {label}", object_id, window),
         ])
-        
-        # Dynamic room sensors
-        rooms = kpi_coordinator.data.get("rooms", [])
-        for room in rooms:
-            sensors.append(
-                TechemRoomSensor(kpi_coordinator, room["label"], object_id)
-            )
-        
-        # Dynamic meter sensors
-        meters = kpi_coordinator.data.get("meters", [])
-        for meter in meters:
-            meter_number = meter["object"]["group"]["meter"]["number"]
-            room_name = meter["object"]["group"]["meter"]["roomName"]
-            sensors.append(
-                TechemMeterSensor(kpi_coordinator, meter_number, room_name, object_id)
-            )
 
-    async_add_entities(sensors)
+    return sensors
+
+
+def _kpi_sensors(coordinator: TechemCoordinator, object_id: str, known: set) -> list[SensorEntity]:
+    """Return the KPI, room and meter sensors of one object not in known yet.
+
+    known collects "kpi" and the ("room", label) and ("meter", number)
+    pairs sensors were returned for, so every sensor is created once.
+    """
+    object_data = coordinator.data.get(object_id) if coordinator.data else None
+    if not object_data or not object_data.kpi:
+        return []
+
+    sensors: list[TechemSensor] = []
+    if "kpi" not in known:
+        known.add("kpi")
+        # Total heat, property comparison and heat series sensors
+        sensors.extend([
+            TechemTotalHeatSensor(coordinator, object_id),
+            TechemPropertyComparisonSensor(coordinator, "previous_period", "Heat vs Previous Period", object_id),
+            TechemPropertyComparisonSensor(coordinator, "previous_year", "Heat vs Previous Year", object_id),
+            TechemPropertyComparisonSensor(coordinator, "property", "Heat vs Property Average", object_id),
+        ])
+        sensors.extend(_series_sensors(coordinator, "heat", "Heat", UNIT_HCA, object_id))
+
+    # Dynamic room sensors
+    for room_label in object_data.kpi.rooms:
+        if ("room", room_label) not in known:
+            known.add(("room", room_label))
+            sensors.append(TechemRoomSensor(coordinator, room_label, object_id))
+
+    # Dynamic meter sensors
+    for meter_number, meter in object_data.kpi.meters.items():
+        if ("meter", meter_number) not in known:
+            known.add(("meter", meter_number))
+            sensors.append(TechemMeterSensor(coordinator, meter_number, meter.room, object_id))
+
+    return sensors
+
+
+def _series_sensors(
+    coordinator: TechemCoordinator, series: str, label: str, unit: str, object_id: str
+) -> list[SensorEntity]:
+    """Return the yesterday, last 7 days and last 30 days sensors of a daily series."""
+    return [
+        TechemSeriesSensor(coordinator, series, f"{label} Yesterday", unit, object_id, "yesterday"),
+        TechemSeriesSensor(coordinator, series, f"{label} Last 7 Days", unit, object_id, "last_7_days"),
+        TechemSeriesSensor(coordinator, series, f"{label} Last 30 Days", unit, object_id, "last_30_days"),
+    ]
+
+
+def _diagnostic_sensors(coordinator: TechemCoordinator) -> list[SensorEntity]:
+    """Return the request statistics sensors, attached to the first object's device."""
+    metrics = coordinator.api.metrics
+
+    def refresh_duration(coordinator: TechemCoordinator):
+        """Return the last refresh duration in seconds."""
+        if coordinator.last_refresh_duration is None:
+            return None
+        return round(coordinator.last_refresh_duration, 3)
+
+    return [
+        TechemDiagnosticSensor(coordinator, "refresh_duration", "Last Refresh Duration", UnitOfTime.SECONDS, refresh_duration),
+        TechemDiagnosticSensor(coordinator, "requests", "Requests", None, lambda _: metrics.requests),
+        TechemDiagnosticSensor(coordinator, "logins", "Logins", None, lambda _: metrics.logins),
+        TechemDiagnosticSensor(coordinator, "retries", "Retries", None, lambda _: metrics.retries),
+    ]
+
+
+class TechemSensor(TechemEntity, SensorEntity):
+    """Techem sensor reading its precomputed value from the object's data.
+
+    Sensors with _removable set are unavailable while the object's data
+    has no value for their key, as for a room or meter Techem stopped
+    reporting.
+    """
 
+    _removable = False
 
-class TechemBaseSensor(CoordinatorEntity, SensorEntity):
+    def __init__(self, coordinator: TechemCoordinator, object_id: str):
+        """Initialize the sensor and attach it to the object's device."""
+        super().__init__(coordinator, object_id)
+        self._key = ""
+
+    def _value(self, key: str) -> float | None:
+        """Return a derived value of the sensor's object."""
+        if self.coordinator.data and (object_data := self.coordinator.data.get(self._object_id)):
+            return object_data.values.get(key)
+        return None
+
+    @property
+    def available(self) -> bool:
+        """Return False if the last refresh failed or a removable sensor's key is gone."""
+        if not super().available:
+            return False
+        if not self._removable:
+            return True
+        object_data = self.coordinator.data.get(self._object_id) if self.coordinator.data else None
+        return object_data is not None and self._key in object_data.values
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._value(self._key)
+
+    def _year_to_date(self) -> dict[str, float | None]:
+        """Return the sensor's units this year to date and over the same days last year."""
+        return {period: self._value(f"{self._key}_{period}") for period in YEAR_TO_DATE}
+
+
+class TechemBaseSensor(TechemSensor):
     """Techem base sensor showing current period value."""
 
-    def __init__(self, coordinator, sensor_type: str, name: str, unit: str, index: int, object_id: str, period: str):
+    def __init__(self, coordinator, sensor_type: str, name: str, unit: str, object_id: str, period: str):
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._sensor_type = sensor_type
-        self._index = index
+        super().__init__(coordinator, object_id)
+        self._key = f"{sensor_type}_{period}"
         self._attr_name = f"Techem {name}"
-        self._attr_unique_id = f"techem_{object_id}_{sensor_type}_{period}"
+        self._attr_unique_id = f"techem_{object_id}_{self._key}"
         self._attr_native_unit_of_measurement = unit
         self._attr_state_class = SensorStateClass.TOTAL_INCREASING
 
-    @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        if self.coordinator.data and "values" in self.coordinator.data:
-            raw_value = self.coordinator.data["values"][self._index]
-            if self._sensor_type == "water":
-                return round(raw_value, 3)
-            return round(raw_value, 1)
-        return None
-
     @property
     def extra_state_attributes(self):
         """Return extra attributes."""
-        if self.coordinator.data and "comparisonValues" in self.coordinator.data:
-            comp_value = self.coordinator.data["comparisonValues"][self._index]
-            if self._sensor_type == "water":
-                comp = round(comp_value, 3)
-            else:
-                comp = round(comp_value, 1)
-            return {"comparison": comp}
+        if (comparison := self._value(f"{self._key}_comparison")) is not None:
+            return {"comparison": comparison}
         return {}
 
 
-class TechemComparisonSensor(CoordinatorEntity, SensorEntity):
+class TechemComparisonSensor(TechemSensor):
     """Techem comparison sensor showing percentage change."""
 
-    def __init__(self, coordinator, sensor_type: str, name: str, unit: str, index: int, object_id: str, period: str):
+    def __init__(self, coordinator, sensor_type: str, name: str, unit: str, object_id: str, period: str):
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._sensor_type = sensor_type
-        self._index = index
+        super().__init__(coordinator, object_id)
+        self._key = f"{sensor_type}_comparison_{period}"
         self._attr_name = f"Techem {name}"
-        self._attr_unique_id = f"techem_{object_id}_{sensor_type}_comparison_{period}"
+        self._attr_unique_id = f"techem_{object_id}_{self._key}"
         self._attr_native_unit_of_measurement = unit
         self._attr_icon = "mdi:percent"
 
+
+class TechemWindowComparisonSensor(TechemComparisonSensor):
+    """Techem comparison of two day windows summed from the history."""
+
+    def __init__(self, coordinator, sensor_type: str, name: str, object_id: str, window: str):
+        """Initialize the sensor."""
+        super().__init__(coordinator, sensor_type, name, PERCENTAGE, object_id, window)
+        self._totals = (f"{sensor_type}_{window}", f"{sensor_type}_{window}_comparison")
+
     @property
-    def native_value(self):
-        """Return the percentage change."""
-        if self.coordinator.data and "values" in self.coordinator.data and "comparisonValues" in self.coordinator.data:
-            current = self.coordinator.data["values"][self._index]
-            last = self.coordinator.data["comparisonValues"][self._index]
-            
-            if last and last > 0:
-                diff = current - last
-                percent = (diff / last) * 100
-                return round(percent, 0)
-        return None
+    def extra_state_attributes(self):
+        """Return the totals of both windows."""
+        current, comparison = (self._value(key) for key in self._totals)
+        if current is None:
+            return {}
+        return {"current": current, "comparison": comparison}
 
 
-class TechemDailyAverageSensor(CoordinatorEntity, SensorEntity):
+class TechemDailyAverageSensor(TechemSensor):
     """Techem daily average sensor for weekly data."""
 
-    def __init__(self, coordinator, sensor_type: str, name: str, unit: str, index: int, object_id: str):
+    def __init__(self, coordinator, sensor_type: str, name: str, unit: str, object_id: str):
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._sensor_type = sensor_type
-        self._index = index
+        super().__init__(coordinator, object_id)
+        self._key = f"{sensor_type}_daily_average"
         self._attr_name = f"Techem {name}"
-        self._attr_unique_id = f"techem_{object_id}_{sensor_type}_daily_average"
+        self._attr_unique_id = f"techem_{object_id}_{self._key}"
         self._attr_native_unit_of_measurement = unit
         self._attr_icon = "mdi:calendar-today"
 
-    @property
-    def native_value(self):
-        """Return the daily average."""
-        if self.coordinator.data and "values" in self.coordinator.data:
-            weekly_value = self.coordinator.data["values"][self._index]
-            daily_avg = weekly_value / 7
-            
-            if self._sensor_type == "water":
-                return round(daily_avg, 3)
-            return round(daily_avg, 1)
-        return None
-
 
-class TechemTotalHeatSensor(CoordinatorEntity, SensorEntity):
+class TechemTotalHeatSensor(TechemSensor):
     """Techem total heat consumption sensor."""
 
     def __init__(self, coordinator, object_id: str):
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, object_id)
+        self._key = "heat_total"
         self._attr_name = "Techem Heat Total"
-        self._attr_unique_id = f"techem_{object_id}_heat_total"
+        self._attr_unique_id = f"techem_{object_id}_{self._key}"
         self._attr_native_unit_of_measurement = UNIT_HCA
         self._attr_state_class = SensorStateClass.TOTAL_INCREASING
         self._attr_icon = "mdi:radiator"
 
-    @property
-    def native_value(self):
-        """Return the total heat consumption."""
-        if self.coordinator.data:
-            return round(self.coordinator.data.get("total", 0), 1)
-        return None
-
 
-class TechemPropertyComparisonSensor(CoordinatorEntity, SensorEntity):
+class TechemPropertyComparisonSensor(TechemSensor):
     """Techem property comparison sensor."""
 
     def __init__(self, coordinator, comparison_type: str, name: str, object_id: str):
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._comparison_type = comparison_type
+        super().__init__(coordinator, object_id)
+        self._key = f"comparison_{comparison_type}"
         self._attr_name = f"Techem {name}"
-        self._attr_unique_id = f"techem_{object_id}_comparison_{comparison_type}"
+        self._attr_unique_id = f"techem_{object_id}_{self._key}"
         self._attr_native_unit_of_measurement = PERCENTAGE
         self._attr_icon = "mdi:percent"
 
-    @property
-    def native_value(self):
-        """Return the comparison percentage."""
-        if not self.coordinator.data:
-            return None
-            
-        total = self.coordinator.data.get("total", 0)
-        if total == 0:
-            return None
-            
-        if self._comparison_type == "previous_period":
-            compare_value = self.coordinator.data.get("previousPeriod", 0)
-        elif self._comparison_type == "previous_year":
-            compare_value = self.coordinator.data.get("previousYear", 0)
-        elif self._comparison_type == "property":
-            compare_value = self.coordinator.data.get("propertyComparison", 0)
-        else:
-            return None
-            
-        if compare_value and compare_value > 0:
-            diff = total - compare_value
-            percent = (diff / compare_value) * 100
-            return round(percent, 0)
-        return None
-
 
-class TechemRoomSensor(CoordinatorEntity, SensorEntity):
+class TechemRoomSensor(TechemSensor):
     """Techem room consumption sensor."""
 
+    _removable = True
+
     def __init__(self, coordinator, room_label: str, object_id: str):
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._room_label = room_label
+        super().__init__(coordinator, object_id)
+        self._key = f"room_{slugify(room_label)}"
         self._attr_name = f"Techem Heat {room_label}"
-        self._attr_unique_id = f"techem_{object_id}_room_{slugify(room_label)}"
+        self._attr_unique_id = f"techem_{object_id}_{self._key}"
         self._attr_native_unit_of_measurement = UNIT_HCA
         self._attr_state_class = SensorStateClass.TOTAL_INCREASING
         self._attr_icon = "mdi:home-thermometer"
+        self._room_label = room_label
 
     @property
-    def native_value(self):
-        """Return the room consumption."""
-        if self.coordinator.data and "rooms" in self.coordinator.data:
-            for room in self.coordinator.data["rooms"]:
-                if room["label"] == self._room_label:
-                    return round(room["value"], 1)
-        return None
+    def extra_state_attributes(self):
+        """Return the room's meters' units this year and over the same days last year."""
+        return self._year_to_date()
 
 
-class TechemMeterSensor(CoordinatorEntity, SensorEntity):
+class TechemMeterSensor(TechemSensor):
     """Techem individual meter sensor."""
 
+    _removable = True
+
     def __init__(self, coordinator, meter_number: str, room_name: str, object_id: str):
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, object_id)
+        self._key = f"meter_{meter_number}"
         self._meter_number = meter_number
         self._room_name = room_name
         self._attr_name = f"Techem Meter {room_name}"
-        self._attr_unique_id = f"techem_{object_id}_meter_{meter_number}"
+        self._attr_unique_id = f"techem_{object_id}_{self._key}"
         self._attr_native_unit_of_measurement = UNIT_HCA
         self._attr_state_class = SensorStateClass.TOTAL_INCREASING
         self._attr_icon = "mdi:gauge"
 
     @property
-    def native_value(self):
-        """Return the meter reading."""
-        if self.coordinator.data and "meters" in self.coordinator.data:
-            for meter in self.coordinator.data["meters"]:
-                if meter["object"]["group"]["meter"]["number"] == self._meter_number:
-                    return round(meter["value"], 1)
-        return None
+    def extra_state_attributes(self):
+        """Return meter details and the meter's recent daily units."""
+        return {
+            "meter_number": self._meter_number,
+            "room": self._room_name,
+            "yesterday": self._value(f"{self._key}_yesterday"),
+            "last_7_days": self._value(f"{self._key}_last_7_days"),
+            "last_30_days": self._value(f"{self._key}_last_30_days"),
+            **self._year_to_date(),
+        }
+
+
+class TechemSeriesSensor(TechemSensor):
+    """Techem sensor summing the last days of a daily series.
+
+    The yesterday sensor also carries the last SERIES_WINDOW days as a
+    compact list attribute, which is kept out of the recorder.
+    """
+
+    _unrecorded_attributes = frozenset({"series"})
+
+    def __init__(self, coordinator, series: str, name: str, unit: str, object_id: str, window: str):
+        """Initialize the sensor."""
+        super().__init__(coordinator, object_id)
+        self._series = series
+        self._window = window
+        self._key = f"{series}_{window}"
+        self._attr_name = f"Techem {name}"
+        self._attr_unique_id = f"techem_{object_id}_{self._key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_icon = "mdi:chart-bar"
 
     @property
     def extra_state_attributes(self):
-        """Return meter details."""
+        """Return the last SERIES_WINDOW days, oldest first, on the yesterday sensor."""
+        if self._window != "yesterday":
+            return None
+        object_data = self.coordinator.data.get(self._object_id) if self.coordinator.data else None
+        if not object_data or not (days := object_data.series.get(self._series)):
+            return None
+        digits = series_digits(self._series)
         return {
-            "meter_number": self._meter_number,
-            "room": self._room_name
-        }
\ No newline at end of file
+            "series": [None if value is None else round(value, digits) for value in days[-SERIES_WINDOW:]],
+        }
+
+
+class TechemDiagnosticSensor(TechemSensor):
+    """Techem request statistics sensor, disabled by default."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator,
+        key: str,
+        name: str,
+        unit: str | None,
+        value_fn: Callable[[TechemCoordinator], float | int | None],
+    ):
+        """Initialize the sensor."""
+        super().__init__(coordinator, coordinator.object_ids[0])
+        self._value_fn = value_fn
+        self._attr_name = f"Techem {name}"
+        self._attr_unique_id = f"techem_{coordinator.config_entry.entry_id}_diagnostic_{key}"
+        self._attr_native_unit_of_measurement = unit
+        if unit == UnitOfTime.SECONDS:
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        else:
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        self._attr_icon = "mdi:chart-line"
+
+    async def async_added_to_hass(self) -> None:
+        """Also update after refreshes that left the data unchanged."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(self.hass, self.coordinator.metrics_signal, self._handle_coordinator_update)
+        )
+
+    @property
+    def available(self) -> bool:
+        """Stay available when a refresh fails, that is when the statistics matter."""
+        return True
+
+    @property
+    def native_value(self):
+        """Return the statistic."""
+        return self._value_fn(self.coordinator)
@@ -0,0 +1,74 @@
+"""Services of the Techem integration."""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from .const import DOMAIN, REFRESH_SCOPES
+from .coordinator import TechemCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_REFRESH = "refresh"
+ATTR_SCOPE = "scope"
+ATTR_OBJECT_IDS = "object_ids"
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_SCOPE, default=list(REFRESH_SCOPES)): vol.All(
+            cv.ensure_list, [vol.In(REFRESH_SCOPES)]
+        ),
+        vol.Optional(ATTR_OBJECT_IDS): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Techem services."""
+
+    async def async_refresh(call: ServiceCall) -> ServiceResponse:
+        """Refresh the scope of the requested objects, or of every object."""
+        scope = frozenset(call.data[ATTR_SCOPE])
+        coordinators = [
+            coordinator
+            for coordinator in hass.data.get(DOMAIN, {}).values()
+            if isinstance(coordinator, TechemCoordinator)
+        ]
+        requested = call.data.get(ATTR_OBJECT_IDS)
+        if requested is not None:
+            known = {object_id for coordinator in coordinators for object_id in coordinator.object_ids}
+            if unknown := set(requested) - known:
+                raise ServiceValidationError(f"Unknown Techem object ids: {', '.join(sorted(unknown))}")
+
+        refreshes = []
+        for coordinator in coordinators:
+            object_ids = [
+                object_id
+                for object_id in coordinator.object_ids
+                if requested is None or object_id in requested
+            ]
+            if object_ids:
+                refreshes.append((object_ids, coordinator.async_refresh_scope(object_ids, scope)))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(refresh for _, refresh in refreshes), return_exceptions=True)
+        duration = time.perf_counter() - start
+
+        response = {"duration": round(duration, 3), "refreshed": [], "debounced": []}
+        for (object_ids, _), result in zip(refreshes, results):
+            if isinstance(result, BaseException):
+                raise HomeAssistantError(f"Techem refresh failed: {result}") from result
+            response["refreshed" if result else "debounced"].extend(object_ids)
+        _LOGGER.debug("Refreshed %s of %s in %.3f s", sorted(scope), response["refreshed"], duration)
+        return response
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REFRESH,
+        async_refresh,
+        schema=REFRESH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
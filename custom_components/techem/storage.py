@@ -0,0 +1,93 @@
+"""Per-entry storage shared by the Techem stores."""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Any, Generic, TypeVar
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from .const import DOMAIN
+
+# Seconds to wait before writing a store, so several updates share one write
+SAVE_DELAY = 30
+
+_ItemT = TypeVar("_ItemT")
+
+
+class EntryStore(ABC):
+    """Data of one config entry kept in Home Assistant's storage.
+
+    Subclasses set name and version and convert their data with _restore
+    and _data. Changes are written SAVE_DELAY seconds after they are
+    scheduled; async_close writes what is still pending and stops later
+    writes, so nothing is written once the entry is unloaded.
+    """
+
+    name: str
+    version = 1
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        """Initialize the store of an entry."""
+        self._store = Store(hass, self.version, f"{DOMAIN}.{entry_id}.{self.name}")
+        self._pending = False
+        self._closed = False
+
+    async def async_load(self) -> None:
+        """Load the data from disk."""
+        self._restore(await self._store.async_load() or {})
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Write the data to disk after a short delay, unless the store was closed."""
+        if self._closed:
+            return
+        self._pending = True
+        self._store.async_delay_save(self._pending_data, SAVE_DELAY)
+
+    def _pending_data(self) -> Any:
+        """Return the data for a delayed write."""
+        self._pending = False
+        return self._data()
+
+    async def async_close(self) -> None:
+        """Write pending changes now, instead of after the delay, and ignore later ones."""
+        self._closed = True
+        if self._pending:
+            self._pending = False
+            await self._store.async_save(self._data())
+
+    @abstractmethod
+    def _restore(self, data: Any) -> None:
+        """Load data previously returned by _data."""
+
+    @abstractmethod
+    def _data(self) -> Any:
+        """Return the data for persistent storage."""
+
+
+class ObjectStore(EntryStore, Generic[_ItemT]):
+    """An EntryStore holding one item per object id, created on first use.
+
+    Items are made by factory and provide as_dict and restore.
+    """
+
+    factory: Callable[[], _ItemT]
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        """Initialize with no items."""
+        super().__init__(hass, entry_id)
+        self.objects: dict[str, _ItemT] = {}
+
+    def get(self, object_id: str) -> _ItemT:
+        """Return the item of an object, creating it on first use."""
+        if (item := self.objects.get(object_id)) is None:
+            item = self.objects[object_id] = self.factory()
+        return item
+
+    def _restore(self, data: dict) -> None:
+        """Load every object's item."""
+        for object_id, item in data.items():
+            self.get(object_id).restore(item)
+
+    def _data(self) -> dict:
+        """Return every object's item for persistent storage."""
+        return {object_id: item.as_dict() for object_id, item in self.objects.items()}
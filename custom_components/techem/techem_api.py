@@ -1,83 +1,460 @@
 """Techem API client."""
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+import base64
 import logging
-import requests
+import time
 import datetime
 import json
+from typing import Any
+import aiohttp
 from .const import COUNTRIES
+from .metrics import TechemMetrics
+from .resilience import RETRY_ATTEMPTS, RETRY_BUDGET, CircuitBreaker, TokenBucket, backoff_delay
+from .templates import (
+    BATCH,
+    KPI,
+    LOGIN,
+    MODE_PERSISTED,
+    MODE_REGISTER,
+    PERSISTED_QUERY_NOT_FOUND,
+    TENANT_TABLE,
+    RequestTemplate,
+    daily_template,
+    encode_variables,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Refresh the token this many seconds before the JWT says it expires
+TOKEN_REFRESH_MARGIN = 300
+# Lifetime assumed for tokens that carry no "exp" claim
+DEFAULT_TOKEN_LIFETIME = 3600
+# GraphQL error codes, in extensions.code, that reject the token
+AUTH_ERROR_CODES = ("UNAUTHENTICATED",)
+# GraphQL error code, in extensions.code, that denies access to the requested object
+FORBIDDEN_ERROR_CODE = "FORBIDDEN"
+# HTTP statuses worth retrying besides 5xx
+TRANSIENT_STATUSES = (408, 425)
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36"
+
+
+class TechemError(Exception):
+    """Base class for Techem API errors."""
+
+
+class TechemAuthError(TechemError):
+    """The credentials or the token were rejected."""
+
+
+class TechemForbiddenError(TechemError):
+    """The account may not access the requested object; the token is still valid."""
+
+
+class TechemTransientError(TechemError):
+    """A timeout, connection error or server error that may pass on retry."""
+
+
+class TechemRateLimitError(TechemTransientError):
+    """Techem asked us to slow down."""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        """Initialize with the delay Techem asked for, if any."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TechemBadRequestError(TechemError):
+    """The endpoint rejected the request itself with status 400."""
+
+
+class TechemGraphQLError(TechemError):
+    """The GraphQL query was rejected."""
+
+
+class TechemCircuitOpenError(TechemError):
+    """Requests are paused because the endpoint keeps failing."""
+
+
+class TechemParseError(TechemError):
+    """A response did not have the expected shape."""
+
+
+class TokenManager:
+    """Cache a Techem JWT in memory and track when it expires."""
+
+    def __init__(self, refresh_margin: int = TOKEN_REFRESH_MARGIN):
+        """Initialize an empty token cache."""
+        self.token = ""
+        self.expires_at = 0.0
+        self.refresh_margin = refresh_margin
+        self.changed = False
+
+    @staticmethod
+    def decode_expiry(token: str) -> float | None:
+        """Return the "exp" claim of a JWT, or None if it cannot be read."""
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            claims = json.loads(base64.urlsafe_b64decode(payload))
+            return float(claims["exp"])
+        except (IndexError, KeyError, TypeError, ValueError):
+            return None
+
+    @property
+    def valid(self) -> bool:
+        """Return True if the cached token can still be used."""
+        return bool(self.token) and time.time() < self.expires_at - self.refresh_margin
+
+    def set(self, token: str) -> None:
+        """Store a freshly issued token."""
+        expiry = self.decode_expiry(token)
+        if expiry is None:
+            expiry = time.time() + DEFAULT_TOKEN_LIFETIME
+        self.token = token
+        self.expires_at = expiry
+        self.changed = True
+
+    def invalidate(self) -> None:
+        """Forget the cached token, forcing a new login."""
+        if self.token:
+            self.token = ""
+            self.expires_at = 0.0
+            self.changed = True
+
+    def as_dict(self) -> dict:
+        """Return the cache contents for persistent storage."""
+        return {"token": self.token, "expires_at": self.expires_at}
+
+    def restore(self, data: dict) -> None:
+        """Load cache contents previously returned by as_dict.
+
+        A valid cached token is kept unless the stored one expires later,
+        as another entry of the account may have logged in already.
+        """
+        expires_at = float(data.get("expires_at", 0))
+        if self.valid and expires_at <= self.expires_at:
+            return
+        self.token = data.get("token", "")
+        self.expires_at = expires_at
+        self.changed = False
+
+
 class TechemAPI:
     """Techem API client."""
 
-    def __init__(self, email: str, password: str, object_id: str, country: str):
-        """Initialize the API client."""
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        email: str,
+        password: str,
+        country: str,
+        limiter: TokenBucket | None = None,
+    ):
+        """Initialize the API client on a shared aiohttp session.
+
+        One client can fetch any object the account has access to; every
+        data method takes the object id to query. Every request, retries
+        included, first takes a token from limiter when one is given.
+        """
+        self._session = session
         self.email = email
         self.password = password
-        self.object_id = object_id
         self.country_config = COUNTRIES[country]
         self.url = self.country_config["url"]
         self.referer = self.country_config["referer"]
-
-    def get_token(self) -> str:
-        """Get authentication token."""
-        token_body = {
-            "query": """
-                mutation nucleolusLogin($credentials: CredentialsInput!) {
-                    loginWithEmailAndPassword(credentials: $credentials) {
-                        ok { token }
-                    }
-                }
-            """,
-            "variables": {
-                "credentials": {
-                    "username": self.email,
-                    "password": self.password,
-                    "targetResource": "tenant"
-                }
-            }
-        }
-        
-        headers = {
+        self.token_manager = TokenManager()
+        # Key -> [shared future, number of callers waiting on it]
+        self._in_flight: dict[Hashable, list] = {}
+        # Whether the endpoint takes persisted queries; None until the first try
+        self.persisted_queries: bool | None = None
+        self._static_headers = {
             "Accept": "*/*",
-            "Accept-Encoding": "gzip, deflate, br",
             "Content-Type": "application/json",
+            "Origin": self.referer.rstrip('/'),
             "Referer": self.referer,
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36"
+            "User-Agent": USER_AGENT,
         }
+        self._auth_token: str | None = None
+        self._auth_headers = self._static_headers
+        self.breaker = CircuitBreaker()
+        self.metrics = TechemMetrics()
+        self.limiter = limiter
+
+    async def _single_flight(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run factory once for concurrent callers with the same key and share its result.
 
+        The shared request is shielded, so a caller that is cancelled does
+        not cancel it for the others; it is cancelled once every caller is.
+        Results are shared, not copied, and must not be modified by callers.
+        """
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.metrics.coalesced += 1
+        else:
+            future = asyncio.ensure_future(factory())
+            flight = self._in_flight[key] = [future, 0]
+            future.add_done_callback(lambda done: self._flight_done(key, flight))
+        future = flight[0]
+        flight[1] += 1
         try:
-            _LOGGER.debug("Attempting login to %s", self.url)
-            response = requests.post(self.url, headers=headers, json=token_body, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            _LOGGER.debug("Response data: %s", data)
-            
-            login_data = data.get("data", {}).get("loginWithEmailAndPassword", {})
-            ok_data = login_data.get("ok")
-            
-            if ok_data:
-                token = ok_data.get("token", "")
-                if token:
-                    _LOGGER.info("Successfully authenticated")
-                    return token
-            
-            _LOGGER.error("Authentication failed - no token in response")
-        except Exception as err:
-            _LOGGER.error("Failed to get token: %s", err)
-        
-        return ""
+            return await asyncio.shield(future)
+        finally:
+            flight[1] -= 1
+            if not flight[1] and not future.done():
+                future.cancel()
 
-    def get_data(self, yearly: bool, days_offset: int = 1) -> dict | None:
-        """Get consumption data."""
-        token = self.get_token()
+    def _flight_done(self, key: Hashable, flight: list) -> None:
+        """Forget a finished request, marking its exception as retrieved."""
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        if not flight[0].cancelled():
+            flight[0].exception()
+
+    async def get_token(self, force: bool = False, rejected: str | None = None) -> str:
+        """Get authentication token, reusing the cached one while it is valid.
+
+        Concurrent logins share one request. A forced login is skipped if
+        the token that was rejected has already been replaced. Raises
+        TechemAuthError if the credentials are rejected.
+        """
+        if self.token_manager.valid and (not force or (rejected and self.token_manager.token != rejected)):
+            self.metrics.token_hits += 1
+            return self.token_manager.token
+        self.metrics.token_misses += 1
+        return await self._single_flight("login", self._refresh_token)
+
+    async def _refresh_token(self) -> str:
+        """Log in and store the new token."""
+        try:
+            token = await self._login()
+        except TechemError:
+            self.token_manager.invalidate()
+            raise
+        self.token_manager.set(token)
+        return token
+
+    async def _login(self) -> str:
+        """Log in with email and password and return a new token."""
+        variables = encode_variables({
+            "credentials": {
+                "username": self.email,
+                "password": self.password,
+                "targetResource": "tenant"
+            }
+        })
+
+        _LOGGER.debug("Attempting login to %s", self.url)
+        try:
+            data = await self._request(LOGIN, variables, self._headers())
+        except (TechemGraphQLError, TechemForbiddenError) as err:
+            raise TechemAuthError(f"Login rejected: {err}") from err
+
+        login_data = (data.get("data") or {}).get("loginWithEmailAndPassword") or {}
+        token = (login_data.get("ok") or {}).get("token")
         if not token:
-            _LOGGER.error("Cannot get data without token")
-            return None
+            raise TechemAuthError("Authentication failed - no token in response")
+        _LOGGER.info("Successfully authenticated")
+        return token
+
+    async def _request(self, template: RequestTemplate, variables: bytes, headers: dict) -> dict:
+        """Post a GraphQL request, retrying transient errors within RETRY_BUDGET.
+
+        Retries wait a jittered exponential delay, or as long as Techem asks
+        on rate limiting. Every failed attempt counts towards the circuit
+        breaker, which refuses requests while the endpoint is down. Any
+        answer from the endpoint, a rejection included, counts as success.
+        """
+        deadline = time.monotonic() + RETRY_BUDGET
+        for attempt in range(RETRY_ATTEMPTS):
+            if not self.breaker.allow():
+                raise TechemCircuitOpenError(
+                    f"Techem requests paused for {self.breaker.retry_in:.0f} s after repeated failures"
+                )
+            try:
+                data = await self._post(template, variables, headers)
+            except asyncio.CancelledError:
+                self.breaker.abandoned()
+                raise
+            except TechemTransientError as err:
+                self.breaker.failed()
+                delay = backoff_delay(attempt)
+                if isinstance(err, TechemRateLimitError) and err.retry_after is not None:
+                    delay = err.retry_after
+                if attempt + 1 == RETRY_ATTEMPTS or time.monotonic() + delay > deadline:
+                    raise
+                _LOGGER.debug("Techem request failed (%s), retrying in %.1f s", err, delay)
+                self.metrics.retries += 1
+                await asyncio.sleep(delay)
+            except TechemError:
+                self.breaker.succeeded()
+                raise
+            else:
+                self.breaker.succeeded()
+                return data
+        raise TechemTransientError("Retries exhausted")
+
+    async def _post(self, template: RequestTemplate, variables: bytes, headers: dict) -> dict:
+        """Post a GraphQL request once and return the decoded JSON.
+
+        Unless the endpoint is known not to support them, persisted queries
+        send the document's hash only. An unknown hash is sent again with
+        the document, which registers it. Any other GraphQL error or
+        rejected request, as from an endpoint that does not support
+        persisted queries and asks for a query string, has the document
+        sent in full, and persisted queries are turned off once that
+        succeeds. Authentication, access and transport errors are raised
+        as is.
+        """
+        if not template.persisted or self.persisted_queries is False:
+            return await self._post_body(template.name, template.body(variables), headers)
+        try:
+            data = await self._post_body(template.name, template.body(variables, MODE_PERSISTED), headers)
+        except (TechemBadRequestError, TechemGraphQLError) as err:
+            if PERSISTED_QUERY_NOT_FOUND not in str(err):
+                data = await self._post_body(template.name, template.body(variables), headers)
+                _LOGGER.debug("Persisted queries not supported (%s), sending full documents", err)
+                self.persisted_queries = False
+                return data
+            data = await self._post_body(template.name, template.body(variables, MODE_REGISTER), headers)
+        self.persisted_queries = True
+        return data
+
+    async def _post_body(self, name: str, payload: bytes, headers: dict) -> dict:
+        """Post an encoded body once and return the decoded JSON.
+
+        Failures are raised as the TechemError subclass that describes them.
+        A response with errors but some data is returned as is. Latency and
+        sizes are recorded per operation in metrics.
+        """
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        raw = b""
+        error = True
+        start = time.perf_counter()
+        try:
+            status, raw, retry_after = await self._send(payload, headers)
+            data = self._check(status, raw, retry_after)
+            error = False
+            return data
+        finally:
+            self.metrics.record(
+                name,
+                (time.perf_counter() - start) * 1000,
+                len(payload),
+                len(raw),
+                error,
+            )
+
+    async def _send(self, payload: bytes, headers: dict) -> tuple[int, bytes, str | None]:
+        """Send an encoded body and return the status, raw response and Retry-After header."""
+        try:
+            async with self._session.post(
+                self.url, headers=headers, data=payload, timeout=REQUEST_TIMEOUT
+            ) as response:
+                return response.status, await response.read(), response.headers.get("Retry-After")
+        except asyncio.TimeoutError as err:
+            raise TechemTransientError("Request to Techem timed out") from err
+        except aiohttp.ClientError as err:
+            raise TechemTransientError(f"Request to Techem failed: {err}") from err
+
+    def _check(self, status: int, raw: bytes, retry_after: str | None) -> dict:
+        """Decode a response, raising the TechemError subclass for a failure.
+
+        A response whose body is not a JSON object, or whose data and
+        errors members do not have the types GraphQL gives them, raises
+        TechemParseError.
+        """
+        if status == 401:
+            raise TechemAuthError(f"Techem rejected the request with status {status}")
+        if status == 403:
+            raise TechemForbiddenError("Techem denied access with status 403")
+        if status == 429:
+            raise TechemRateLimitError(
+                "Techem is rate limiting requests",
+                float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        if status >= 500 or status in TRANSIENT_STATUSES:
+            raise TechemTransientError(f"Techem returned status {status}")
+        if status == 400:
+            raise TechemBadRequestError(f"Techem returned status 400: {self._messages(raw)}")
+        if status >= 400:
+            raise TechemError(f"Techem returned status {status}")
 
+        try:
+            data = json.loads(raw)
+        except ValueError as err:
+            raise TechemParseError("Techem returned a response that is not JSON") from err
+        if not isinstance(data, dict):
+            raise TechemParseError(f"Techem returned a JSON {type(data).__name__} instead of an object")
+        errors = data.get("errors") or []
+        if not isinstance(data.get("data", {}), (dict, type(None))) or not (
+            isinstance(errors, list) and all(isinstance(error, dict) for error in errors)
+        ):
+            raise TechemParseError("Techem returned malformed data or errors")
+        messages = "; ".join(str(error.get("message", "")) for error in errors)
+        if self._is_auth_error(errors):
+            raise TechemAuthError(messages)
+        if errors and not data.get("data"):
+            if any((error.get("extensions") or {}).get("code") == FORBIDDEN_ERROR_CODE for error in errors):
+                raise TechemForbiddenError(messages)
+            raise TechemGraphQLError(messages)
+        if errors:
+            _LOGGER.debug("Techem returned partial data: %s", messages)
+        return data
+
+    @staticmethod
+    def _messages(raw: bytes) -> str:
+        """Return the GraphQL error messages of a failed response, or its start if it has none."""
+        try:
+            data = json.loads(raw)
+            return "; ".join(str(error.get("message", "")) for error in data["errors"])
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return raw[:200].decode(errors="replace")
+
+    @staticmethod
+    def _is_auth_error(errors: list[dict]) -> bool:
+        """Return True if the code of a GraphQL error says the token was rejected."""
+        return any((error.get("extensions") or {}).get("code") in AUTH_ERROR_CODES for error in errors)
+
+    async def _post_authenticated(self, template: RequestTemplate, variables: dict) -> dict:
+        """Post a GraphQL request, sharing it with concurrent identical posts.
+
+        The document hash and the encoded objectId, period and compareWith
+        variables are the key that identifies a query.
+        """
+        encoded = encode_variables(variables)
+        return await self._single_flight(
+            (template.sha256, encoded), lambda: self._post_with_token(template, encoded)
+        )
+
+    async def _post_with_token(self, template: RequestTemplate, variables: bytes) -> dict:
+        """Post a GraphQL request with the cached token, logging in again once on auth errors."""
+        token = await self.get_token()
+        try:
+            return await self._request(template, variables, self._headers(token))
+        except TechemAuthError:
+            _LOGGER.debug("Token rejected, logging in again")
+        token = await self.get_token(force=True, rejected=token)
+        return await self._request(template, variables, self._headers(token))
+
+    def _headers(self, token: str | None = None) -> dict:
+        """Return the prebuilt request headers, with authorization if a token is given.
+
+        The returned dict is shared between requests and must not be modified.
+        """
+        if not token:
+            return self._static_headers
+        if token != self._auth_token:
+            self._auth_token = token
+            self._auth_headers = {**self._static_headers, "Authorization": f"JWT {token}"}
+        return self._auth_headers
+
+    def _table_input(self, object_id: str, yearly: bool, days_offset: int = 1) -> dict:
+        """Return the TenantTable input for the yearly or weekly period."""
         today = datetime.datetime.now()
-        
+
         if yearly:
             start = datetime.datetime(today.year, 1, 1)
             end = today - datetime.timedelta(days=days_offset)
@@ -87,123 +464,175 @@ class TechemAPI:
             end = today - datetime.timedelta(days=days_offset)
             compare = "previous-period"
 
-        body = {
-            "query": """
-                query TenantTable($table: TenantTableInput!) {
-                    tenantTable(table: $table) {
-                        rows { values comparisonValues }
-                    }
-                }
-            """,
-            "variables": {
-                "table": {
-                    "aggregationLevel": "UNIT",
-                    "objectId": self.object_id,
-                    "periodBegin": start.strftime("%Y-%m-%dT00:00:00"),
-                    "periodEnd": end.strftime("%Y-%m-%dT00:00:00"),
-                    "compareWith": compare
-                }
-            },
-            "operationName": "TenantTable"
+        return self._table_period(object_id, start, end, compare)
+
+    def _table_period(
+        self, object_id: str, start: datetime.date, end: datetime.date, compare: str
+    ) -> dict:
+        """Return the TenantTable input for the period from start until end."""
+        return {
+            "aggregationLevel": "UNIT",
+            "objectId": object_id,
+            "periodBegin": start.strftime("%Y-%m-%dT00:00:00"),
+            "periodEnd": end.strftime("%Y-%m-%dT00:00:00"),
+            "compareWith": compare
         }
 
-        headers = {
-            "Accept": "*/*",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Content-Type": "application/json",
-            "Authorization": f"JWT {token}",
-            "Origin": self.referer.rstrip('/'),
-            "Referer": self.referer,
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36"
+    def _kpi_input(self, object_id: str, days_back: int = 30) -> dict:
+        """Return the UnitQuantityKPIs input for the last days_back days."""
+        today = datetime.datetime.now()
+        start = today - datetime.timedelta(days=days_back)
+        end = today - datetime.timedelta(days=1)  # Yesterday
+
+        return self._kpi_period(object_id, start, end)
+
+    def _kpi_period(self, object_id: str, start: datetime.date, end: datetime.date) -> dict:
+        """Return the UnitQuantityKPIs input for the period from start until end."""
+        return {
+            "objectId": object_id,
+            "quantity": "hca",
+            "periodBegin": start.strftime("%Y-%m-%d"),
+            "periodEnd": end.strftime("%Y-%m-%d")
         }
 
+    async def get_data(self, object_id: str, yearly: bool, days_offset: int = 1) -> dict | None:
+        """Get consumption data."""
+        variables = {"table": self._table_input(object_id, yearly, days_offset)}
+
         try:
-            response = requests.post(self.url, headers=headers, json=body, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
+            data = await self._post_authenticated(TENANT_TABLE, variables)
+
             rows = data.get("data", {}).get("tenantTable", {}).get("rows", [])
             if rows:
                 _LOGGER.debug("Successfully retrieved data")
                 return rows[0]
-        except Exception as err:
-            _LOGGER.error("Failed to get data: %s", err)
+        except TechemError as err:
+            _LOGGER.debug("Failed to get data: %s", err)
             raise
         return None
 
-    def get_kpi_data(self, days_back: int = 30) -> dict | None:
+    async def get_kpi_data(self, object_id: str, days_back: int = 30) -> dict | None:
         """Get KPI data including room and meter breakdown."""
-        token = self.get_token()
-        if not token:
-            _LOGGER.error("Cannot get KPI data without token")
-            return None
-
-        today = datetime.datetime.now()
-        start = today - datetime.timedelta(days=days_back)
-        end = today - datetime.timedelta(days=1)  # Yesterday
-
-        body = {
-            "query": """
-                query UnitQuantityKPIs($input: UnitQuantityKPIsInput!) {
-                    unitQuantityKpis(input: $input) {
-                        total
-                        previousPeriod
-                        previousYear
-                        propertyComparison
-                        rooms {
-                            label
-                            value
-                        }
-                        meters {
-                            object {
-                                id
-                                group {
-                                    id
-                                    quantity
-                                    meter {
-                                        id
-                                        number
-                                        roomName
-                                    }
-                                }
-                            }
-                            value
-                        }
-                    }
-                }
-            """,
-            "variables": {
-                "input": {
-                    "objectId": self.object_id,
-                    "quantity": "hca",
-                    "periodBegin": start.strftime("%Y-%m-%d"),
-                    "periodEnd": end.strftime("%Y-%m-%d")
-                }
-            },
-            "operationName": "UnitQuantityKPIs"
-        }
-
-        headers = {
-            "Accept": "*/*",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Content-Type": "application/json",
-            "Authorization": f"JWT {token}",
-            "Origin": self.referer.rstrip('/'),
-            "Referer": self.referer,
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36"
-        }
+        variables = {"input": self._kpi_input(object_id, days_back)}
 
         try:
-            response = requests.post(self.url, headers=headers, json=body, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
+            data = await self._post_authenticated(KPI, variables)
+
             kpi_data = data.get("data", {}).get("unitQuantityKpis")
             if kpi_data:
                 _LOGGER.debug("Successfully retrieved KPI data")
                 return kpi_data
-        except Exception as err:
-            _LOGGER.error("Failed to get KPI data: %s", err)
+        except TechemError as err:
+            _LOGGER.debug("Failed to get KPI data: %s", err)
             raise
         
-        return None
\ No newline at end of file
+        return None
+
+    async def get_all_data(
+        self, object_id: str, days_offset: int = 1, days_back: int = 30
+    ) -> dict:
+        """Get yearly, weekly and KPI data in a single GraphQL request.
+
+        Returns a dict with "yearly", "weekly" and "kpi" sections, each
+        shaped like the result of get_data or get_kpi_data.
+        """
+        variables = {
+            "yearly": self._table_input(object_id, True, days_offset),
+            "weekly": self._table_input(object_id, False, days_offset),
+            "kpi": self._kpi_input(object_id, days_back),
+        }
+
+        try:
+            data = await self._post_authenticated(BATCH, variables)
+
+            result = data.get("data") or {}
+            sections = {"kpi": result.get("kpi")}
+            for period in ("yearly", "weekly"):
+                rows = (result.get(period) or {}).get("rows") or []
+                sections[period] = rows[0] if rows else None
+            _LOGGER.debug("Successfully retrieved batched data")
+            return sections
+        except TechemError as err:
+            _LOGGER.debug("Failed to get batched data: %s", err)
+            raise
+
+    def _daily_variables(self, object_id: str, days: list[datetime.date], meters: bool) -> dict:
+        """Return the variables of a daily_template for the given days."""
+        variables = {}
+        for index, day in enumerate(days):
+            next_day = day + datetime.timedelta(days=1)
+            variables[f"d{index}"] = self._table_period(object_id, day, next_day, "previous-period")
+            if meters:
+                variables[f"m{index}"] = self._kpi_period(object_id, day, next_day)
+        return variables
+
+    @staticmethod
+    def _parse_daily(result: dict, days: list[datetime.date]) -> dict[datetime.date, dict]:
+        """Return the per-day values and meter readings from an aliased result.
+
+        Techem nulls the alias of a selection that failed; such days are
+        left out, so they are fetched again rather than stored as zero.
+        """
+        daily = {}
+        for index, day in enumerate(days):
+            table = result.get(f"d{index}")
+            kpi_data = result.get(f"m{index}", {})
+            if table is None or kpi_data is None:
+                continue
+            rows = table.get("rows") or []
+            daily[day] = {
+                "values": rows[0]["values"] if rows else None,
+                "meters": {
+                    meter["object"]["group"]["meter"]["number"]: meter["value"]
+                    for meter in kpi_data.get("meters") or []
+                },
+            }
+        return daily
+
+    async def get_daily_data(
+        self, object_id: str, days: list[datetime.date], meters: bool = True
+    ) -> dict[datetime.date, dict]:
+        """Get the consumption of each given day in a single GraphQL request.
+
+        Each day maps to a dict with "values" (energy, water), None if
+        Techem has none, and, when meters is True, "meters" mapping meter
+        numbers to their HCA value. Days Techem failed to return are left out.
+        """
+        variables = self._daily_variables(object_id, days, meters)
+
+        try:
+            data = await self._post_authenticated(daily_template(len(days), meters, False), variables)
+
+            daily = self._parse_daily(data.get("data") or {}, days)
+            _LOGGER.debug("Successfully retrieved daily data for %d days", len(days))
+            return daily
+        except TechemError as err:
+            _LOGGER.debug("Failed to get daily data: %s", err)
+            raise
+
+    async def get_refresh_data(
+        self,
+        object_id: str,
+        days: list[datetime.date],
+        days_back: int = 30,
+        meters: bool = False,
+        kpi: bool = True,
+    ) -> dict:
+        """Get KPI data and the values of the given days in one request.
+
+        Returns a dict with the "kpi" section, None when kpi is False, and
+        a "daily" dict shaped like the result of get_daily_data.
+        """
+        variables = self._daily_variables(object_id, days, meters)
+        if kpi:
+            variables["kpi"] = self._kpi_input(object_id, days_back)
+
+        try:
+            data = await self._post_authenticated(daily_template(len(days), meters, kpi), variables)
+
+            result = data.get("data") or {}
+            _LOGGER.debug("Successfully retrieved KPI data and %d days", len(days))
+            return {"kpi": result.get("kpi"), "daily": self._parse_daily(result, days)}
+        except TechemError as err:
+            _LOGGER.debug("Failed to get refresh data: %s", err)
+            raise
@@ -0,0 +1,158 @@
+"""Precompiled GraphQL request templates for the Techem API."""
+from __future__ import annotations
+from functools import lru_cache
+import hashlib
+import json
+import re
+from typing import Any
+
+# How a body carries its document under automatic persisted queries (APQ)
+MODE_FULL = "full"
+MODE_PERSISTED = "persisted"
+MODE_REGISTER = "register"
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+# Whitespace next to GraphQL punctuation carries no meaning
+_PUNCTUATION_SPACE = re.compile(r"\s*([{}():,!$])\s*")
+
+
+def minify(query: str) -> str:
+    """Return a GraphQL document without insignificant whitespace."""
+    return _PUNCTUATION_SPACE.sub(r"\1", " ".join(query.split()))
+
+
+def encode_variables(variables: dict[str, Any]) -> bytes:
+    """Return compact JSON of a request's variables."""
+    return json.dumps(variables, separators=(",", ":")).encode()
+
+
+class RequestTemplate:
+    """A GraphQL operation with its minified document and pre-encoded body parts.
+
+    A body is the constant prefix of the chosen mode followed by the
+    encoded variables, so only the variables are serialized per request.
+    """
+
+    __slots__ = ("name", "query", "sha256", "persisted", "_prefixes")
+
+    def __init__(self, query: str, operation: str | None = None, name: str | None = None, persisted: bool = True):
+        """Minify the document, hash it and encode the constant body parts.
+
+        name labels the operation in metrics. persisted is False for
+        documents that must always be sent in full.
+        """
+        self.name = name or operation or "anonymous"
+        self.query = minify(query)
+        self.sha256 = hashlib.sha256(self.query.encode()).hexdigest()
+        self.persisted = persisted
+        head = f'{{"operationName":{json.dumps(operation)},' if operation else "{"
+        document = f'"query":{json.dumps(self.query)},'
+        extensions = f'"extensions":{{"persistedQuery":{{"version":1,"sha256Hash":"{self.sha256}"}}}},'
+        self._prefixes = {
+            MODE_FULL: f'{head}{document}"variables":'.encode(),
+            MODE_PERSISTED: f'{head}{extensions}"variables":'.encode(),
+            MODE_REGISTER: f'{head}{extensions}{document}"variables":'.encode(),
+        }
+
+    def body(self, variables: bytes, mode: str = MODE_FULL) -> bytes:
+        """Return the request body for encoded variables."""
+        return self._prefixes[mode] + variables + b"}"
+
+
+TABLE_FIELDS = "rows { values comparisonValues }"
+KPI_FIELDS = """
+    total
+    previousPeriod
+    previousYear
+    propertyComparison
+    rooms {
+        label
+        value
+    }
+    meters {
+        object {
+            id
+            group {
+                id
+                quantity
+                meter {
+                    id
+                    number
+                    roomName
+                }
+            }
+        }
+        value
+    }
+"""
+
+DAILY_METER_FIELDS = "meters { object { group { meter { number } } } value }"
+
+LOGIN = RequestTemplate(
+    """
+    mutation nucleolusLogin($credentials: CredentialsInput!) {
+        loginWithEmailAndPassword(credentials: $credentials) {
+            ok { token }
+        }
+    }
+    """,
+    name="login",
+    persisted=False,
+)
+
+TENANT_TABLE = RequestTemplate(
+    f"""
+    query TenantTable($table: TenantTableInput!) {{
+        tenantTable(table: $table) {{ {TABLE_FIELDS} }}
+    }}
+    """,
+    "TenantTable",
+)
+
+KPI = RequestTemplate(
+    f"""
+    query UnitQuantityKPIs($input: UnitQuantityKPIsInput!) {{
+        unitQuantityKpis(input: $input) {{ {KPI_FIELDS} }}
+    }}
+    """,
+    "UnitQuantityKPIs",
+)
+
+# Yearly, weekly and KPI data as aliased selections of one document
+BATCH = RequestTemplate(
+    f"""
+    query TechemRefresh(
+        $yearly: TenantTableInput!
+        $weekly: TenantTableInput!
+        $kpi: UnitQuantityKPIsInput!
+    ) {{
+        yearly: tenantTable(table: $yearly) {{ {TABLE_FIELDS} }}
+        weekly: tenantTable(table: $weekly) {{ {TABLE_FIELDS} }}
+        kpi: unitQuantityKpis(input: $kpi) {{ {KPI_FIELDS} }}
+    }}
+    """,
+    "TechemRefresh",
+)
+
+
+@lru_cache(maxsize=128)
+def daily_template(days: int, meters: bool, kpi: bool) -> RequestTemplate:
+    """Return the template selecting days per-day values, optionally with meters and KPI data.
+
+    Selections are aliased by position (d0, m0, d1, ...), not by date, so
+    the document and its hash stay the same from one day to the next.
+    """
+    declarations = []
+    selections = []
+    for index in range(days):
+        declarations.append(f"$d{index}: TenantTableInput!")
+        selections.append(f"d{index}: tenantTable(table: $d{index}) {{ {TABLE_FIELDS} }}")
+        if meters:
+            declarations.append(f"$m{index}: UnitQuantityKPIsInput!")
+            selections.append(f"m{index}: unitQuantityKpis(input: $m{index}) {{ {DAILY_METER_FIELDS} }}")
+    if kpi:
+        declarations.append("$kpi: UnitQuantityKPIsInput!")
+        selections.append(f"kpi: unitQuantityKpis(input: $kpi) {{ {KPI_FIELDS} }}")
+    operation = "TechemDailyKPIs" if kpi else "TechemDaily"
+    return RequestTemplate(
+        f"query {operation}({' '.join(declarations)}) {{ {' '.join(selections)} }}", operation
+    )
@@ -0,0 +1,83 @@
+"""Fixtures and helpers shared by the tests and the benchmarks.
+
+tests/conftest.py and bench_refresh_cycle.py import them, so both run the
+integration against the same mock server and config entry.
+"""
+from __future__ import annotations
+import pathlib
+import pytest
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from custom_components.techem.clients import TechemClientRegistry
+from custom_components.techem.const import COUNTRIES, CONF_COUNTRY, CONF_OBJECT_IDS, DATA_CLIENTS, DOMAIN
+from custom_components.techem.coordinator import TechemCoordinator
+from .mock_server import MockTechemServer
+
+EMAIL = "test@example.com"
+PASSWORD = "Test-Password-1!"
+
+
+def techem_entry(
+    hass: HomeAssistant,
+    object_ids: list[str],
+    unique_id: str = f"dk_{EMAIL}",
+    options: dict | None = None,
+) -> MockConfigEntry:
+    """Return a Techem config entry of the mock account for the given objects, added to hass."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=2,
+        data={CONF_EMAIL: EMAIL, CONF_PASSWORD: PASSWORD, CONF_OBJECT_IDS: object_ids, CONF_COUNTRY: "dk"},
+        options=options or {},
+        unique_id=unique_id,
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+async def setup_entry(hass: HomeAssistant, entry: MockConfigEntry) -> TechemCoordinator:
+    """Set up the entry and wait until its history is filled."""
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    for task in coordinator._fill_tasks.values():
+        await task
+    await hass.async_block_till_done()
+    return coordinator
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integration from custom_components."""
+
+
+@pytest.fixture(autouse=True)
+def config_dir(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
+    """Keep files written outside Home Assistant's storage helper, like the history, out of the test config."""
+    hass.config.config_dir = str(tmp_path)
+
+
+@pytest.fixture
+async def mock_techem(monkeypatch, socket_enabled):
+    """Start a mock server and point the "dk" endpoint at it."""
+    server = MockTechemServer()
+    url = await server.start()
+    monkeypatch.setitem(COUNTRIES, "dk", {**COUNTRIES["dk"], "url": url})
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+async def lifted_rate_limit(hass: HomeAssistant) -> None:
+    """Give the entries a client registry whose per-host rate limit no history fill uses up."""
+    hass.data.setdefault(DOMAIN, {})[DATA_CLIENTS] = TechemClientRegistry(
+        async_get_clientsession(hass), rate=1000.0, burst=1000
+    )
+
+
+@pytest.fixture
+def config_entry(hass: HomeAssistant) -> MockConfigEntry:
+    """Return a single-object Techem config entry added to hass."""
+    return techem_entry(hass, ["test-object"])
@@ -0,0 +1,20 @@
+"""Fixtures shared by the Techem tests.
+
+Run from the repository root with:
+
+    pip install -r benchmarks/requirements.txt
+    pytest tests
+"""
+from __future__ import annotations
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from .common import (  # noqa: E402, F401
+    auto_enable_custom_integrations,
+    config_dir,
+    config_entry,
+    lifted_rate_limit,
+    mock_techem,
+)
@@ -0,0 +1,291 @@
+"""Local stand-in for the Techem GraphQL endpoint.
+
+Handles the login mutation, TenantTable and UnitQuantityKPIs operations,
+including aliased selections of several of them in one document, and
+automatic persisted queries (documents registered by sha256 hash). Latency,
+errors, payload sizes and the first day with data are configurable, and
+every request is counted so benchmarks can report requests and logins per
+refresh.
+
+Run standalone with: python -m tests.mock_server --port 8080
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import base64
+import datetime
+import hashlib
+import json
+import random
+import re
+import time
+from collections import Counter
+from aiohttp import web
+
+GRAPHQL_PATH = "/analytics/graphql"
+FIELD_PATTERN = re.compile(
+    r"(?:(\w+)\s*:\s*)?(tenantTable|unitQuantityKpis)\s*\(\s*\w+\s*:\s*\$(\w+)\s*\)"
+)
+
+
+def _b64(data: dict) -> str:
+    """Encode a dict as unpadded base64url JSON."""
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+def _parse_day(value: str) -> datetime.date:
+    """Parse a Techem period boundary, with or without a time part."""
+    return datetime.date.fromisoformat(value[:10])
+
+
+def day_values(day: datetime.date) -> tuple[float, float]:
+    """Return the deterministic (energy, water) consumption of one day."""
+    ordinal = day.toordinal()
+    return 10.0 + ordinal % 7, 0.1 + (ordinal % 5) * 0.01
+
+
+class MockTechemServer:
+    """Configurable fake of the Techem analytics GraphQL API."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 502,
+        rooms: int = 4,
+        meters_per_room: int = 2,
+        token_lifetime: int = 3600,
+        retry_after: int = 0,
+        persisted_queries: bool = True,
+        first_day: datetime.date | None = None,
+        seed: int = 0,
+    ):
+        """Initialize the server configuration and counters.
+
+        Days before first_day, if given, have no data, as before a tenant
+        moved in.
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rooms = rooms
+        self.meters_per_room = meters_per_room
+        self.token_lifetime = token_lifetime
+        self.retry_after = retry_after
+        self.persisted_queries = persisted_queries
+        self.first_day = first_day
+        self._documents: dict[str, str] = {}
+        self._random = random.Random(seed)
+        self._tokens: dict[str, float] = {}
+        self._fail_next: list[int] = []
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+        self.reset_counters()
+
+    def reset_counters(self) -> None:
+        """Reset the request, login, operation and byte counters."""
+        self.requests = 0
+        self.logins = 0
+        self.operations: Counter[str] = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def fail_next(self, count: int = 1, status: int | None = None) -> None:
+        """Make the next count requests fail with the given HTTP status."""
+        self._fail_next.extend([status or self.error_status] * count)
+
+    def expire_tokens(self) -> None:
+        """Invalidate every token issued so far."""
+        self._tokens.clear()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the GraphQL URL."""
+        app = web.Application()
+        app.router.add_post(GRAPHQL_PATH, self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}{GRAPHQL_PATH}"
+        return self.url
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _issue_token(self) -> str:
+        """Return a new unsigned JWT with an exp claim."""
+        expires_at = time.time() + self.token_lifetime
+        token = ".".join((
+            _b64({"alg": "none", "typ": "JWT"}),
+            _b64({"exp": int(expires_at), "jti": self._random.getrandbits(64)}),
+            "mock",
+        ))
+        self._tokens[token] = expires_at
+        return token
+
+    def _authorized(self, request: web.Request) -> bool:
+        """Return True if the request carries a live token."""
+        header = request.headers.get("Authorization", "")
+        token = header.removeprefix("JWT ")
+        return self._tokens.get(token, 0) > time.time()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        """Serve one GraphQL request."""
+        raw = await request.read()
+        self.requests += 1
+        self.bytes_in += len(raw)
+        body = json.loads(raw)
+        query = body.get("query") or ""
+        variables = body.get("variables") or {}
+        self.operations[body.get("operationName") or "anonymous"] += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self._fail_next:
+            return self._respond({"errors": [{"message": "Injected failure"}]}, self._fail_next.pop(0))
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self._respond({"errors": [{"message": "Random failure"}]}, self.error_status)
+
+        persisted = ((body.get("extensions") or {}).get("persistedQuery") or {}).get("sha256Hash")
+        if persisted and not self.persisted_queries:
+            return self._respond({"errors": [{"message": "PersistedQueryNotSupported"}]}, 400)
+        if persisted and query:
+            if hashlib.sha256(query.encode()).hexdigest() != persisted:
+                return self._respond({"errors": [{"message": "provided sha does not match query"}]}, 400)
+            self._documents[persisted] = query
+        elif persisted:
+            if persisted not in self._documents:
+                return self._respond({"errors": [{"message": "PersistedQueryNotFound"}]})
+            query = self._documents[persisted]
+
+        if "loginWithEmailAndPassword" in query:
+            self.logins += 1
+            token = self._issue_token()
+            return self._respond({"data": {"loginWithEmailAndPassword": {"ok": {"token": token}}}})
+
+        if not self._authorized(request):
+            return self._respond({"errors": [{"message": "Invalid JWT token"}]}, 401)
+
+        data = {}
+        for alias, field, variable in FIELD_PATTERN.findall(query):
+            params = variables.get(variable) or {}
+            if field == "tenantTable":
+                data[alias or field] = self._tenant_table(params)
+            else:
+                data[alias or field] = self._kpis(params)
+        return self._respond({"data": data})
+
+    def _respond(self, payload: dict, status: int = 200) -> web.Response:
+        """Encode a JSON response and count its size."""
+        text = json.dumps(payload)
+        self.bytes_out += len(text)
+        headers = {"Retry-After": str(self.retry_after)} if status == 429 else None
+        return web.Response(text=text, status=status, headers=headers, content_type="application/json")
+
+    @staticmethod
+    def _window(params: dict) -> tuple[datetime.date, datetime.date]:
+        """Return the [begin, end) window of a query input."""
+        return _parse_day(params["periodBegin"]), _parse_day(params["periodEnd"])
+
+    def _sum(self, begin: datetime.date, end: datetime.date) -> list[float]:
+        """Return the summed (energy, water) consumption over [begin, end)."""
+        energy = water = 0.0
+        day = max(begin, self.first_day) if self.first_day else begin
+        while day < end:
+            day_energy, day_water = day_values(day)
+            energy += day_energy
+            water += day_water
+            day += datetime.timedelta(days=1)
+        return [energy, water]
+
+    def _tenant_table(self, params: dict) -> dict:
+        """Return a TenantTable result for the requested window."""
+        begin, end = self._window(params)
+        if self.first_day and self.first_day >= end:
+            return {"rows": []}
+        if params.get("compareWith") == "previous-year":
+            compare = (begin.replace(year=begin.year - 1), end.replace(year=end.year - 1))
+        else:
+            length = end - begin
+            compare = (begin - length, begin)
+        return {"rows": [{"values": self._sum(begin, end), "comparisonValues": self._sum(*compare)}]}
+
+    def _kpis(self, params: dict) -> dict:
+        """Return a UnitQuantityKPIs result for the requested window."""
+        begin, end = self._window(params)
+        if self.first_day and self.first_day >= end:
+            days = 0
+        else:
+            days = max((end - max(begin, self.first_day or begin)).days, 1)
+        rooms = []
+        meters = []
+        for room_index in range(self.rooms):
+            label = f"Room {room_index + 1}"
+            room_total = 0.0
+            for meter_index in range(self.meters_per_room if days else 0):
+                number = f"{room_index + 1:03d}{meter_index + 1:02d}"
+                value = days * (1.0 + meter_index * 0.5)
+                room_total += value
+                meters.append({
+                    "object": {
+                        "id": f"object-{number}",
+                        "group": {
+                            "id": f"group-{number}",
+                            "quantity": params.get("quantity", "hca"),
+                            "meter": {"id": f"meter-{number}", "number": number, "roomName": label},
+                        },
+                    },
+                    "value": value,
+                })
+            rooms.append({"label": label, "value": room_total})
+        total = sum(room["value"] for room in rooms)
+        return {
+            "total": total,
+            "previousPeriod": total * 1.1,
+            "previousYear": total * 0.9,
+            "propertyComparison": total * 1.05,
+            "rooms": rooms,
+            "meters": meters,
+        }
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    """Run the mock server until interrupted."""
+    server = MockTechemServer(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rooms=args.rooms,
+        meters_per_room=args.meters_per_room,
+        persisted_queries=not args.no_persisted_queries,
+    )
+    url = await server.start(args.host, args.port)
+    print(f"Mock Techem GraphQL endpoint at {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    """Parse arguments and serve."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--rooms", type=int, default=4)
+    parser.add_argument("--meters-per-room", type=int, default=2)
+    parser.add_argument("--no-persisted-queries", action="store_true", help="reject persisted queries")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
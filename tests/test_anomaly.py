@@ -0,0 +1,90 @@
+"""Tests for the anomaly and leak detection."""
+from __future__ import annotations
+from datetime import date, timedelta
+import random
+from custom_components.techem.anomaly import (
+    KIND_OUT_OF_RANGE,
+    LEAK_DAYS,
+    METER_FLOOR,
+    WATER_FLOOR,
+    ObjectDetector,
+    RunningStats,
+)
+
+START = date(2025, 1, 1)
+
+
+def _feed(stats: RunningStats, values: list[float], start: date = START) -> list[tuple[bool, bool]]:
+    """Add one value per day from start, returning whether each day was out of range or continuous."""
+    flags = []
+    for offset, value in enumerate(values):
+        stats.update(start + timedelta(days=offset), value)
+        flags.append((stats.out_of_range, stats.continuous_use))
+    return flags
+
+
+def test_usual_water_use_is_no_leak():
+    """Days that vary around the usual use, without a raised minimum, never count as continuous use."""
+    rng = random.Random(1)
+    # Weekends use more and about every tenth day the washing machine runs
+    values = [
+        rng.uniform(0.05, 0.3) + (0.1 if day % 7 >= 5 else 0) + (0.15 if rng.random() < 0.1 else 0)
+        for day in range(3 * 365)
+    ]
+    flags = _feed(RunningStats(WATER_FLOOR), values)
+    assert not any(continuous for _, continuous in flags)
+
+
+def test_raised_minimum_is_a_leak():
+    """A running toilet lifting even the lowest days counts as continuous use after LEAK_DAYS days."""
+    rng = random.Random(2)
+    values = [rng.uniform(0.05, 0.35) for _ in range(200)]
+    values += [rng.uniform(0.05, 0.35) + 0.4 for _ in range(LEAK_DAYS)]
+    flags = _feed(RunningStats(WATER_FLOOR), values)
+    assert not any(continuous for _, continuous in flags[:200])
+    assert flags[-1][1]
+
+
+def test_heating_season_start_is_not_out_of_range():
+    """A heat cost allocator that idled over summer learns its level again before being judged."""
+    rng = random.Random(3)
+    winter = [rng.uniform(4, 8) for _ in range(120)]
+    summer = [rng.choice([0.0, 0.0, 0.1]) for _ in range(150)]
+    autumn = [min(8.0, 0.5 * day) + rng.uniform(0, 1) for day in range(60)]
+    flags = _feed(RunningStats(METER_FLOOR), winter + summer + autumn)
+    assert not any(out_of_range for out_of_range, _ in flags[len(winter) + len(summer):])
+
+
+def test_stuck_radiator_is_out_of_range():
+    """A day far outside the usual heating level is out of range."""
+    rng = random.Random(4)
+    values = [rng.uniform(4, 6) for _ in range(60)] + [20.0]
+    flags = _feed(RunningStats(METER_FLOOR), values)
+    assert flags[-1][0]
+
+
+def test_anomaly_keeps_the_statistics_of_its_day():
+    """An anomaly on the first day of a batch reports that day's value, not the last day's."""
+    rng = random.Random(5)
+    detector = ObjectDetector()
+    days = [START + timedelta(days=offset) for offset in range(62)]
+    values = [rng.uniform(4, 6) for _ in range(60)] + [20.0, 5.0]
+    daily = {day: {"values": None, "meters": {"1": value}} for day, value in zip(days, values)}
+    detector.update(dict(list(daily.items())[:60]), days[59])
+
+    started = detector.update(daily, days[-1])
+    stats = detector.series["meter_1"]
+    assert [(anomaly.series, anomaly.kind, anomaly.day, anomaly.value) for anomaly in started] == [
+        ("meter_1", KIND_OUT_OF_RANGE, days[60], 20.0)
+    ]
+    assert stats.value == 5.0
+    assert started[0].mean > stats.mean
+
+
+def test_restore_keeps_statistics():
+    """Statistics written by as_list load into a new instance."""
+    stats = RunningStats(WATER_FLOOR)
+    _feed(stats, [0.1, 0.2, 0.3])
+    restored = RunningStats(WATER_FLOOR)
+    restored.restore(stats.as_list())
+    assert restored.as_list() == stats.as_list()
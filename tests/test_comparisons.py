@@ -0,0 +1,70 @@
+"""Tests for the comparison windows."""
+from __future__ import annotations
+from datetime import date
+import pytest
+from custom_components.techem.comparisons import comparison_windows, previous_year, previous_year_end
+from custom_components.techem.coordinator import period_windows
+
+
+def _days(window: tuple[date, date]) -> int:
+    """Return the number of days in a window."""
+    return (window[1] - window[0]).days
+
+
+@pytest.mark.parametrize(("today", "current", "comparison"), [
+    # The 1st and 2nd of a month still compare the last month
+    (date(2026, 3, 2), (date(2026, 2, 1), date(2026, 3, 1)), (date(2026, 1, 1), date(2026, 1, 29))),
+    (date(2026, 3, 3), (date(2026, 3, 1), date(2026, 3, 2)), (date(2026, 2, 1), date(2026, 2, 2))),
+    # Days past the end of a shorter last month compare all of it
+    (date(2026, 3, 31), (date(2026, 3, 1), date(2026, 3, 30)), (date(2026, 2, 1), date(2026, 3, 1))),
+    (date(2024, 3, 31), (date(2024, 3, 1), date(2024, 3, 30)), (date(2024, 2, 1), date(2024, 3, 1))),
+    (date(2026, 1, 15), (date(2026, 1, 1), date(2026, 1, 14)), (date(2025, 12, 1), date(2025, 12, 14))),
+])
+def test_month_to_date(today, current, comparison):
+    """This month to date against the same days of last month, clamped to its end."""
+    assert comparison_windows(today)["month_to_date"] == (current, comparison)
+
+
+@pytest.mark.parametrize(("today", "current", "comparison"), [
+    # Until yesterday's settled days reach October the last season continues
+    (date(2026, 10, 2), (date(2025, 10, 1), date(2026, 10, 1)), (date(2024, 10, 1), date(2025, 10, 1))),
+    (date(2026, 10, 3), (date(2026, 10, 1), date(2026, 10, 2)), (date(2025, 10, 1), date(2025, 10, 2))),
+    # February 28th of a leap year compares through February 28th of the year before
+    (date(2024, 3, 1), (date(2023, 10, 1), date(2024, 2, 29)), (date(2022, 10, 1), date(2023, 3, 1))),
+    # February 29th compares to nothing more than February 28th
+    (date(2024, 3, 2), (date(2023, 10, 1), date(2024, 3, 1)), (date(2022, 10, 1), date(2023, 3, 1))),
+    (date(2025, 3, 1), (date(2024, 10, 1), date(2025, 2, 28)), (date(2023, 10, 1), date(2024, 2, 28))),
+])
+def test_heating_season(today, current, comparison):
+    """The heating season so far against the same days of the last one."""
+    assert comparison_windows(today)["heating_season"] == (current, comparison)
+
+
+@pytest.mark.parametrize("today", [date(2024, 3, 1), date(2024, 3, 2), date(2025, 3, 1), date(2026, 1, 1)])
+def test_weekly_and_rolling_windows(today):
+    """Week and rolling windows keep their length, weekdays and adjoin their comparison."""
+    windows = comparison_windows(today, [14, 30, 30])
+    current, comparison = windows["same_week_last_year"]
+    assert _days(current) == _days(comparison) == 7
+    assert current[0].weekday() == comparison[0].weekday()
+    for days in (14, 30):
+        current, comparison = windows[f"rolling_{days}_days"]
+        assert _days(current) == _days(comparison) == days
+        assert comparison[1] == current[0]
+    assert len(windows) == 5
+
+
+def test_yearly_window_in_leap_year():
+    """The year to February 28th of a leap year compares the whole of last year's January and February."""
+    current, comparison = period_windows(date(2024, 3, 1))["yearly"]
+    assert current == (date(2024, 1, 1), date(2024, 2, 29))
+    assert comparison == (date(2023, 1, 1), date(2023, 3, 1))
+
+
+def test_previous_year():
+    """A window end moves its last day back a year, so the same days are compared."""
+    assert previous_year(date(2024, 2, 29)) == date(2023, 2, 28)
+    assert previous_year_end(date(2024, 2, 29)) == date(2023, 3, 1)
+    assert previous_year_end(date(2024, 3, 1)) == date(2023, 3, 1)
+    # Through February 28th, leaving out the 29th of the leap year
+    assert previous_year_end(date(2025, 3, 1)) == date(2024, 2, 29)
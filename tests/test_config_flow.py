@@ -0,0 +1,31 @@
+"""Tests for the Techem config flow."""
+from __future__ import annotations
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from custom_components.techem.const import DOMAIN
+from .common import techem_entry
+
+
+@pytest.mark.usefixtures("lifted_rate_limit")
+async def test_reauth_updates_every_entry_of_the_account(hass: HomeAssistant, mock_techem):
+    """A new password goes to every entry of the account and to the client they share once they reloaded."""
+    entries = [techem_entry(hass, ["object-1"]), techem_entry(hass, ["object-2"], unique_id="object-2")]
+    assert await hass.config_entries.async_setup(entries[0].entry_id)
+    await hass.async_block_till_done()
+
+    entries[0].async_start_reauth(hass)
+    await hass.async_block_till_done()
+    [flow] = hass.config_entries.flow.async_progress_by_handler(DOMAIN)
+    result = await hass.config_entries.flow.async_configure(flow["flow_id"], {CONF_PASSWORD: "New-Password-2!"})
+    await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.ABORT
+    assert result["reason"] == "reauth_successful"
+    assert [entry.data[CONF_PASSWORD] for entry in entries] == ["New-Password-2!"] * 2
+    assert [entry.state for entry in entries] == [ConfigEntryState.LOADED] * 2
+    api = hass.data[DOMAIN][entries[0].entry_id].api
+    assert hass.data[DOMAIN][entries[1].entry_id].api is api
+    assert api.password == "New-Password-2!"
@@ -0,0 +1,66 @@
+"""Tests for the Techem coordinator's refreshes."""
+from __future__ import annotations
+from datetime import date, timedelta
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from custom_components.techem.coordinator import TechemCoordinator
+from custom_components.techem.resilience import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, request_priority
+from .common import setup_entry
+
+
+async def test_days_without_data_are_not_fetched_again(hass: HomeAssistant, mock_techem, config_entry):
+    """Settled days Techem has no data for, as before move-in, count as fetched."""
+    mock_techem.first_day = date.today() - timedelta(days=120)
+    coordinator = await setup_entry(hass, config_entry)
+
+    mock_techem.reset_counters()
+    for _ in range(3):
+        await coordinator.async_refresh()
+    assert mock_techem.operations == {"TechemDailyKPIs": 3}
+    assert coordinator.history.first("test-object", "energy") == mock_techem.first_day
+
+
+def _record_priorities(coordinator: TechemCoordinator, monkeypatch) -> dict[str, list[int]]:
+    """Record the request priority of every call to the client's fetch methods."""
+    priorities = {}
+    for name in ("get_all_data", "get_refresh_data", "get_daily_data"):
+
+        async def record(*args, name=name, method=getattr(coordinator.api, name), **kwargs):
+            priorities.setdefault(name, []).append(request_priority.get())
+            return await method(*args, **kwargs)
+
+        monkeypatch.setattr(coordinator.api, name, record)
+    return priorities
+
+
+async def test_fill_started_by_user_refresh_is_background(hass: HomeAssistant, mock_techem, config_entry, monkeypatch):
+    """A history fill started by a refresh a user asked for does not inherit its priority."""
+    coordinator = await setup_entry(hass, config_entry)
+    # End the cooldown of the refresh the setup's fill requested
+    coordinator._debounced_refresh.async_cancel()
+    priorities = _record_priorities(coordinator, monkeypatch)
+    missing = coordinator.history.missing
+    monkeypatch.setattr(coordinator.history, "missing", lambda object_id, days: list(days))
+
+    await coordinator.async_request_refresh()
+    monkeypatch.setattr(coordinator.history, "missing", missing)
+    await coordinator.async_wait_for_fill("test-object")
+    coordinator._debounced_refresh.async_cancel()
+    assert priorities["get_all_data"] == [PRIORITY_INTERACTIVE]
+    assert set(priorities["get_daily_data"]) == {PRIORITY_BACKGROUND}
+
+
+async def test_debounced_refresh_is_background(hass: HomeAssistant, mock_techem, config_entry, monkeypatch):
+    """Only the refresh a request starts right away is interactive, not one the debouncer runs later."""
+    coordinator = await setup_entry(hass, config_entry)
+    # End the cooldown of the refresh the setup's fill requested
+    coordinator._debounced_refresh.async_cancel()
+    priorities = _record_priorities(coordinator, monkeypatch)
+
+    await coordinator.async_request_refresh()
+    await coordinator.async_request_refresh()
+    assert priorities["get_refresh_data"] == [PRIORITY_INTERACTIVE]
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=30))
+    await hass.async_block_till_done()
+    assert priorities["get_refresh_data"] == [PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND]
@@ -0,0 +1,41 @@
+"""Tests for per-day values Techem failed to return."""
+from __future__ import annotations
+from datetime import date
+from homeassistant.core import HomeAssistant
+from custom_components.techem.anomaly import ObjectDetector
+from custom_components.techem.history import HistoryStore
+from custom_components.techem.techem_api import TechemAPI
+
+DAYS = [date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 3)]
+# The second day's selection failed and the third has no rows
+RESULT = {
+    "d0": {"rows": [{"values": [10.0, 0.1]}]},
+    "m0": {"meters": []},
+    "d1": None,
+    "m1": {"meters": []},
+    "d2": {"rows": []},
+    "m2": {"meters": []},
+}
+
+
+def test_errored_alias_is_left_out():
+    """A day whose alias Techem nulled is not returned at all."""
+    daily = TechemAPI._parse_daily(RESULT, DAYS)
+    assert list(daily) == [DAYS[0], DAYS[2]]
+    assert daily[DAYS[2]]["values"] is None
+
+
+async def test_day_without_values_is_not_stored(hass: HomeAssistant, tmp_path):
+    """A day without values is fetched but holds no value, and a failed day stays missing."""
+    hass.config.config_dir = str(tmp_path)
+    daily = TechemAPI._parse_daily(RESULT, DAYS)
+
+    history = HistoryStore(hass, "test")
+    history.update("object", daily, date(2026, 4, 1))
+    assert history.missing("object", DAYS) == [DAYS[1]]
+    assert history.window("object", DAYS[-1], 3) == {"energy": [10.0, None, None], "water": [0.1, None, None]}
+    assert history.sum("object", "energy", DAYS[0], date(2026, 3, 4)) == 10.0
+
+    detector = ObjectDetector()
+    detector.update(daily, DAYS[-1])
+    assert detector.series["water"].count == 1
@@ -0,0 +1,48 @@
+"""Tests for the bulk export's handling of an existing output."""
+from __future__ import annotations
+from datetime import date
+import pytest
+from custom_components.techem.export import export
+
+START = date(2026, 1, 1)
+END = date(2026, 1, 3)
+
+
+class FakeAPI:
+    """Return one energy and water value for every day asked for."""
+
+    async def get_daily_data(self, object_id, days, meters=True):
+        """Return the same values for each day."""
+        return {day: {"values": [1.0, 0.1], "meters": {}} for day in days}
+
+
+async def test_existing_output_without_checkpoint_is_kept(tmp_path):
+    """An output that has no checkpoint is not emptied."""
+    output = tmp_path / "history.csv"
+    output.write_text("kept\n")
+    with pytest.raises(FileExistsError):
+        await export(FakeAPI(), ["object"], START, END, str(output))
+    assert output.read_text() == "kept\n"
+
+
+async def test_overwrite_replaces_output(tmp_path):
+    """With overwrite, an output that has no checkpoint is replaced."""
+    output = tmp_path / "history.csv"
+    output.write_text("replaced\n")
+    assert await export(FakeAPI(), ["object"], START, END, str(output), overwrite=True) == 1
+    assert output.read_text().splitlines() == [
+        "day,object,meter,quantity,value",
+        "2026-01-01,object,,energy,1.0",
+        "2026-01-01,object,,water,0.1",
+        "2026-01-02,object,,energy,1.0",
+        "2026-01-02,object,,water,0.1",
+    ]
+
+
+async def test_resume_keeps_written_windows(tmp_path):
+    """A second run with a checkpoint fetches nothing and keeps the output."""
+    output = tmp_path / "history.csv"
+    await export(FakeAPI(), ["object"], START, END, str(output))
+    written = output.read_text()
+    assert await export(FakeAPI(), ["object"], START, END, str(output)) == 0
+    assert output.read_text() == written
@@ -0,0 +1,185 @@
+"""Tests for the per-day history store."""
+from __future__ import annotations
+from array import array
+import asyncio
+from datetime import date, timedelta
+import mmap
+import os
+import sys
+import time
+import pytest
+from homeassistant.core import HomeAssistant
+from custom_components.techem.const import HISTORY_YEARS
+from custom_components.techem.history import HEADER, INDEX_ENTRY, MAGIC, HistoryStore, _align
+
+
+def _day(values: list[float] | None, meters: dict | None = None) -> dict:
+    """Return one day shaped like TechemAPI.get_daily_data."""
+    return {"values": values, "meters": meters or {}}
+
+
+async def test_first_day_of_a_series(hass: HomeAssistant, tmp_path):
+    """first is the earliest day with a value and follows later updates."""
+    hass.config.config_dir = str(tmp_path)
+    history = HistoryStore(hass, "test")
+    assert history.first("object", "meter_1") is None
+    history.update("object", {date(2026, 3, 1): _day([1.0, 0.1], {"1": 2.0})}, date(2026, 4, 1))
+    assert history.first("object", "meter_1") == date(2026, 3, 1)
+    history.update("object", {date(2025, 12, 31): _day(None, {"1": 2.0})}, date(2026, 4, 1))
+    assert history.first("object", "meter_1") == date(2025, 12, 31)
+    assert history.missing("object", [date(2025, 12, 31), date(2026, 3, 1)]) == []
+
+
+async def test_unsettled_days_are_missing(hass: HomeAssistant, tmp_path):
+    """A day fetched before Techem stopped revising it is fetched again."""
+    hass.config.config_dir = str(tmp_path)
+    history = HistoryStore(hass, "test")
+    history.update("object", {date(2026, 3, 1): _day([1.0, 0.1])}, date(2026, 3, 2))
+    assert history.missing("object", [date(2026, 3, 1)]) == [date(2026, 3, 1)]
+    history.update("object", {date(2026, 3, 1): _day([1.0, 0.1])}, date(2026, 3, 10))
+    assert history.missing("object", [date(2026, 3, 1)]) == []
+
+
+async def test_keeps_history_years(hass: HomeAssistant, tmp_path):
+    """Years before the HISTORY_YEARS kept are dropped when a new year starts."""
+    hass.config.config_dir = str(tmp_path)
+    history = HistoryStore(hass, "test")
+    oldest = date(2026 - HISTORY_YEARS, 12, 31)
+    days = {oldest: _day([1.0, 0.1]), date(oldest.year - 1, 6, 1): _day([2.0, 0.2])}
+    history.update("object", days, date(2026, 12, 31))
+    assert history.first("object", "energy") == oldest
+    partitions = history.partitions
+
+    history.update("object", {date(2027, 1, 1): _day([3.0, 0.3])}, date(2027, 1, 2))
+    assert history.first("object", "energy") == date(2027, 1, 1)
+    assert history.partitions == partitions
+
+
+async def test_drops_old_years_on_load(hass: HomeAssistant, tmp_path):
+    """A file written before a new year started loads without the years no longer kept."""
+    hass.config.config_dir = str(tmp_path)
+    history = HistoryStore(hass, "test")
+    year = date.today().year - HISTORY_YEARS
+    days = {date(year - 1, 6, 1): _day([1.0, 0.1]), date(year, 6, 1): _day([2.0, 0.2])}
+    history.update("object", days, date(year - 1, 12, 31))
+    await history.async_close()
+
+    history = HistoryStore(hass, "test")
+    await history.async_load()
+    assert history.first("object", "energy") == date(year, 6, 1)
+    await history.async_close()
+
+
+async def test_reads_float32_history(hass: HomeAssistant, tmp_path):
+    """A version 1 file, which held float32 columns, still loads."""
+    hass.config.config_dir = str(tmp_path)
+    history = HistoryStore(hass, "test")
+    key = "object\0energy".encode()
+    index = INDEX_ENTRY.pack(2026, len(key)) + key
+    column = array("f", [float("nan")]) * 366
+    column[0] = 1.5
+    os.makedirs(os.path.dirname(history.path))
+    with open(history.path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, 1, sys.byteorder == "big", 1))
+        file.write(index)
+        file.write(bytes(_align(HEADER.size + len(index)) - HEADER.size - len(index)))
+        file.write(column)
+
+    await history.async_load()
+    assert history.slice("object", "energy", date(2026, 1, 1), date(2026, 1, 3)) == [1.5, None]
+    assert history.sum("object", "energy", date(2026, 1, 1), date(2027, 1, 1)) == 1.5
+    await history.async_close()
+
+
+async def test_sum_matches_the_values(hass: HomeAssistant, tmp_path):
+    """Window sums equal the sum of the known values across a year boundary, after changes and once reloaded."""
+    hass.config.config_dir = str(tmp_path)
+    history = HistoryStore(hass, "test")
+    year = date.today().year - 1
+    start = date(year, 11, 1)
+    # Every third day has no value
+    days = {start + timedelta(days=offset): _day([offset * 0.7, 0.1]) for offset in range(120) if offset % 3}
+    history.update("object", days, date(year + 1, 6, 1))
+
+    def brute_force(first: date, end: date) -> float:
+        return sum(value for value in history.slice("object", "energy", first, end) if value is not None)
+
+    windows = [
+        (start, start + timedelta(days=120)),
+        (date(year, 12, 15), date(year + 1, 1, 15)),
+        (date(year, 12, 31), date(year + 1, 1, 1)),
+        (date(year, 11, 3), date(year, 11, 4)),
+        (date(year - 1, 1, 1), date(year + 2, 1, 1)),
+        (start, start),
+    ]
+    for first, end in windows:
+        assert history.sum("object", "energy", first, end) == pytest.approx(brute_force(first, end))
+
+    history.update("object", {date(year + 1, 1, 1): _day([100.0, 0.1])}, date(year + 1, 6, 1))
+    assert history.sum("object", "energy", *windows[1]) == pytest.approx(brute_force(*windows[1]))
+    expected = [brute_force(first, end) for first, end in windows]
+    await history.async_close()
+
+    history = HistoryStore(hass, "test")
+    await history.async_load()
+    assert [history.sum("object", "energy", first, end) for first, end in windows] == pytest.approx(expected)
+    await history.async_close()
+
+
+async def test_close_waits_for_a_running_save(hass: HomeAssistant, tmp_path):
+    """Closing while a delayed save still reads the mapped columns waits for it, then writes the rest."""
+    hass.config.config_dir = str(tmp_path)
+    year = date.today().year
+    history = HistoryStore(hass, "test")
+    history.update("object", {date(year, 1, 1): _day([1.0, 0.1])}, date(year, 1, 10))
+    # Left unchanged, so it is still read from the mapped file when saving
+    history.update("other", {date(year, 1, 1): _day([5.0, 0.5])}, date(year, 1, 10))
+    await history.async_close()
+
+    history = HistoryStore(hass, "test")
+    await history.async_load()
+    write = history._write
+    writes = []
+
+    def slow_write(partitions):
+        # Only the delayed save is slow, so closing would otherwise finish first
+        writes.append(partitions)
+        if len(writes) == 1:
+            time.sleep(0.2)
+        write(partitions)
+
+    history._write = slow_write
+    history.update("object", {date(year, 1, 2): _day([2.0, 0.2])}, date(year, 1, 10))
+    saving = hass.async_create_task(history._async_save_later(None))
+    await asyncio.sleep(0.05)
+    history.update("object", {date(year, 1, 3): _day([3.0, 0.3])}, date(year, 1, 10))
+    await history.async_close()
+    await saving
+    assert len(writes) == 2
+
+    history = HistoryStore(hass, "test")
+    await history.async_load()
+    assert history.slice("object", "energy", date(year, 1, 1), date(year, 1, 4)) == [1.0, 2.0, 3.0]
+    assert history.slice("other", "energy", date(year, 1, 1), date(year, 1, 2)) == [5.0]
+    await history.async_close()
+
+
+async def test_unreadable_file_is_unmapped(hass: HomeAssistant, tmp_path, monkeypatch):
+    """A file of an unknown format loads as an empty history without keeping its mapping open."""
+    hass.config.config_dir = str(tmp_path)
+    history = HistoryStore(hass, "test")
+    os.makedirs(os.path.dirname(history.path))
+    with open(history.path, "wb") as file:
+        file.write(HEADER.pack(b"JUNK", 2, 0, 1) + bytes(64))
+    mapped = []
+    map_file = mmap.mmap
+
+    def record(*args, **kwargs):
+        mapped.append(map_file(*args, **kwargs))
+        return mapped[-1]
+
+    monkeypatch.setattr(mmap, "mmap", record)
+    await history.async_load()
+    assert history.partitions == 0
+    assert [buffer.closed for buffer in mapped] == [True]
+    await history.async_close()
@@ -0,0 +1,88 @@
+"""Tests for the long-term statistics import."""
+from __future__ import annotations
+import asyncio
+from datetime import timedelta
+import pytest
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.statistics import get_last_statistics
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from custom_components.techem.const import DOMAIN, UNSETTLED_DAYS
+from custom_components.techem.importer import BACKFILL_DAYS, TechemStatisticsImporter
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(recorder_mock, enable_custom_integrations):
+    """Start the recorder before Home Assistant, which the shared fixtures would set up first."""
+
+
+@pytest.fixture(autouse=True)
+def config_dir(recorder_mock, hass: HomeAssistant, tmp_path) -> None:
+    """Keep the history out of the test config, once the recorder started."""
+    hass.config.config_dir = str(tmp_path)
+
+
+@pytest.fixture
+def expected_lingering_timers() -> bool:
+    """Leave the import interval of the entry running."""
+    return True
+
+
+async def test_import_reads_the_history(hass: HomeAssistant, mock_techem, config_entry):
+    """Days in the history are imported without asking Techem again, summed from the history."""
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    # The history fill and the entry's own first import
+    await asyncio.gather(*config_entry._background_tasks)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    end = dt_util.now().date() - timedelta(days=UNSETTLED_DAYS - 1)
+    start = end - timedelta(days=BACKFILL_DAYS + 1)
+    days = [start + timedelta(days=offset) for offset in range((end - start).days)]
+    assert coordinator.history.missing("test-object", days) == []
+
+    requests = mock_techem.requests
+    importer = TechemStatisticsImporter(hass, "other", coordinator)
+    await importer.async_run()
+    await get_instance(hass).async_block_till_done()
+    assert mock_techem.requests == requests
+
+    statistic_id = importer.statistic_id("test-object", "energy")
+    last = await get_instance(hass).async_add_executor_job(
+        get_last_statistics, hass, 1, statistic_id, True, {"sum"}
+    )
+    assert last[statistic_id][0]["sum"] == pytest.approx(coordinator.history.sum("test-object", "energy", start, end))
+
+
+async def test_import_stops_at_a_day_techem_did_not_return(hass: HomeAssistant, mock_techem, config_entry, monkeypatch):
+    """A day left out of the response is not skipped: the import stops before it and a later run resumes there."""
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    await asyncio.gather(*config_entry._background_tasks)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    end = dt_util.now().date() - timedelta(days=UNSETTLED_DAYS - 1)
+    start = end - timedelta(days=BACKFILL_DAYS + 1)
+    gap = start + timedelta(days=10)
+    get_daily_data = coordinator.api.get_daily_data
+
+    async def drop_gap(object_id, days, meters=True):
+        daily = await get_daily_data(object_id, days, meters)
+        daily.pop(gap, None)
+        return daily
+
+    # An object of its own, so no day is in the history yet
+    importer = TechemStatisticsImporter(hass, "other", coordinator)
+    importer._cursor = {}
+    monkeypatch.setattr(coordinator.api, "get_daily_data", drop_gap)
+    await importer._async_import_object("new-object")
+    assert importer._cursor["new-object"]["next_day"] == gap.isoformat()
+
+    monkeypatch.setattr(coordinator.api, "get_daily_data", get_daily_data)
+    await importer._async_import_object("new-object")
+    await get_instance(hass).async_block_till_done()
+    assert importer._cursor["new-object"]["next_day"] == end.isoformat()
+
+    statistic_id = importer.statistic_id("new-object", "energy")
+    last = await get_instance(hass).async_add_executor_job(
+        get_last_statistics, hass, 1, statistic_id, True, {"sum"}
+    )
+    assert last[statistic_id][0]["sum"] == pytest.approx(coordinator.history.sum("new-object", "energy", start, end))
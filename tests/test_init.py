@@ -0,0 +1,148 @@
+"""Tests for setting up, unloading and removing a Techem entry."""
+from __future__ import annotations
+from datetime import timedelta
+import os
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry, async_fire_time_changed
+from custom_components.techem.const import CONF_COUNTRY, CONF_OBJECT_ID, CONF_OBJECT_IDS, DOMAIN
+from .common import PASSWORD, setup_entry
+
+
+async def test_unload_writes_pending_stores(hass: HomeAssistant, hass_storage, mock_techem, config_entry):
+    """Unloading writes pending store changes at once, and removing leaves no store behind."""
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    prefix = f"{DOMAIN}.{config_entry.entry_id}."
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert {f"{prefix}anomalies", f"{prefix}snapshot"} <= set(hass_storage)
+
+    await hass.config_entries.async_remove(config_entry.entry_id)
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(minutes=5))
+    await hass.async_block_till_done()
+    assert not [key for key in hass_storage if key.startswith(prefix)]
+
+
+async def test_unload_closes_history(hass: HomeAssistant, mock_techem, config_entry):
+    """Unloading writes the history, unmaps it and leaves no write scheduled."""
+    for mapped in (False, True):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        history = hass.data[DOMAIN][config_entry.entry_id].history
+        assert (history._mmap is not None) == mapped
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+        await hass.async_block_till_done()
+        assert os.path.exists(history.path)
+        assert history.partitions == 0
+        assert history._mmap is None and history._unsub_save is None and history._unsub_final_write is None
+
+    await hass.config_entries.async_remove(config_entry.entry_id)
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(minutes=5))
+    await hass.async_block_till_done()
+    assert not os.path.exists(history.path)
+
+
+async def test_token_stored_per_account(hass: HomeAssistant, hass_storage, mock_techem, config_entry):
+    """Entries of one account share the token store, which goes with the account's last entry."""
+    other = MockConfigEntry(domain=DOMAIN, version=2, data={**config_entry.data, CONF_OBJECT_IDS: ["other-object"]})
+    other.add_to_hass(hass)
+    # Sets up every entry of the domain
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert other.state is ConfigEntryState.LOADED
+    assert mock_techem.logins == 1
+    key = f"{DOMAIN}.token.dk_test_example_com"
+    assert key in hass_storage
+
+    await hass.config_entries.async_remove(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert key in hass_storage
+    await hass.config_entries.async_remove(other.entry_id)
+    await hass.async_block_till_done()
+    assert key not in hass_storage
+
+
+@pytest.mark.usefixtures("lifted_rate_limit")
+async def test_setup_starts_from_snapshot(hass: HomeAssistant, hass_storage, mock_techem, config_entry):
+    """With a snapshot, setup creates every sensor from it without waiting on Techem, also while it fails."""
+    coordinator = await setup_entry(hass, config_entry)
+    data = coordinator.data
+    registry_entities = len(hass.data["entity_registry"].entities)
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert f"{DOMAIN}.{config_entry.entry_id}.snapshot" in hass_storage
+
+    mock_techem.error_rate = 1.0
+    mock_techem.error_status = 404
+    mock_techem.reset_counters()
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert not mock_techem.requests
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert coordinator.data == data
+    assert len(hass.data["entity_registry"].entities) == registry_entities
+    assert hass.states.get("sensor.techem_heat_room_1").state == str(data["test-object"].kpi.rooms["Room 1"].value)
+
+    # The refresh in the background fails, and the data stays that of the snapshot
+    for task in list(config_entry._background_tasks):
+        await task
+    assert mock_techem.requests
+    assert not coordinator.last_update_success
+    assert coordinator.data == data
+
+
+@pytest.mark.usefixtures("lifted_rate_limit")
+async def test_setup_reads_single_object_snapshot(hass: HomeAssistant, hass_storage, mock_techem, config_entry):
+    """A snapshot written before entries held several objects is restored for the entry's object."""
+    coordinator = await setup_entry(hass, config_entry)
+    payload = coordinator.data["test-object"].to_payload()
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    hass_storage[f"{DOMAIN}.{config_entry.entry_id}.snapshot"] = {
+        "version": 1, "key": f"{DOMAIN}.{config_entry.entry_id}.snapshot", "data": {"data": payload},
+    }
+
+    # A first refresh would fail, so only the snapshot lets setup finish
+    mock_techem.fail_next(10, 404)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert hass.data[DOMAIN][config_entry.entry_id].data["test-object"].kpi == coordinator.data["test-object"].kpi
+
+
+async def test_unreadable_snapshot_is_fetched_instead(hass: HomeAssistant, hass_storage, mock_techem, config_entry):
+    """A snapshot that does not parse is ignored and setup waits for a first refresh."""
+    hass_storage[f"{DOMAIN}.{config_entry.entry_id}.snapshot"] = {
+        "version": 1,
+        "key": f"{DOMAIN}.{config_entry.entry_id}.snapshot",
+        "data": {"data": {"test-object": {"yearly": {"values": "unknown"}}}},
+    }
+    coordinator = await setup_entry(hass, config_entry)
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert coordinator.last_update_success
+    assert coordinator.data["test-object"].kpi is not None
+
+
+async def test_migration_sets_account_unique_id(hass: HomeAssistant, mock_techem):
+    """A single-object entry gets its account's unique id, unless another entry of the account has it."""
+    data = {CONF_EMAIL: "Test@Example.com", CONF_PASSWORD: PASSWORD, CONF_COUNTRY: "dk"}
+    entries = [
+        MockConfigEntry(domain=DOMAIN, version=1, data={**data, CONF_OBJECT_ID: object_id}, unique_id=object_id)
+        for object_id in ("object-1", "object-2")
+    ]
+    for entry in entries:
+        entry.add_to_hass(hass)
+
+    # Sets up every entry of the domain
+    assert await hass.config_entries.async_setup(entries[0].entry_id)
+    await hass.async_block_till_done()
+    assert [entry.state for entry in entries] == [ConfigEntryState.LOADED] * 2
+    assert [entry.version for entry in entries] == [2, 2]
+    assert [entry.data[CONF_OBJECT_IDS] for entry in entries] == [["object-1"], ["object-2"]]
+    assert [entry.unique_id for entry in entries] == ["dk_test@example.com", "object-2"]
@@ -0,0 +1,148 @@
+"""Tests for the parsed Techem data and the sensor values derived from it."""
+from __future__ import annotations
+import pytest
+from custom_components.techem.models import ConsumptionRow, KpiSummary, Meter, ObjectData, Room
+from custom_components.techem.techem_api import TechemParseError
+
+KPI = {
+    "total": 30.0,
+    "previousPeriod": 20.0,
+    "previousYear": 40.0,
+    "propertyComparison": 30.0,
+    "rooms": [{"label": "Living Room", "value": 20.0}, {"label": "Bath", "value": 10.0}],
+    "meters": [
+        {"object": {"group": {"meter": {"number": "1", "roomName": "Living Room"}}}, "value": 12.0},
+        {"object": {"group": {"meter": {"number": "2", "roomName": "Living Room"}}}, "value": 8.0},
+        {"object": {"group": {"meter": {"number": "3", "roomName": "Bath"}}}, "value": 10.0},
+    ],
+}
+
+
+ROW = {"values": [1234.56, 12.3456], "comparisonValues": [1000.0, 15.0]}
+
+
+def test_sections_parse_into_typed_records():
+    """Rows, rooms and meters are parsed once, rooms and meters rounded for display."""
+    data = ObjectData.parse({
+        "yearly": ROW,
+        "weekly": None,
+        "kpi": {**KPI, "rooms": [{"label": "Hall", "value": 1.26}], "meters": [
+            {"object": {"group": {"meter": {"number": "7", "roomName": "Hall"}}}, "value": 1.24},
+        ]},
+        "series": {"energy": [1.0, None, 2]},
+    })
+    assert data.yearly == ConsumptionRow(1234.56, 12.3456, 1000.0, 15.0)
+    assert data.weekly is None
+    assert data.kpi.rooms == {"Hall": Room("Hall", 1.3)}
+    assert data.kpi.meters == {"7": Meter("7", "Hall", 1.2)}
+    assert data.series == {"energy": (1.0, None, 2.0)}
+    assert data.comparisons == {}
+
+
+def test_missing_kpi_totals_are_zero():
+    """KPI totals Techem leaves out or nulls count as zero, and rooms and meters as none."""
+    kpi = KpiSummary.parse({"total": None})
+    assert (kpi.total, kpi.previous_period, kpi.previous_year, kpi.property_comparison) == (0.0, 0.0, 0.0, 0.0)
+    assert kpi.rooms == kpi.meters == {}
+
+
+def test_payload_round_trip():
+    """Data written by to_payload, as the snapshot is, parses back to the same data."""
+    data = ObjectData.parse({
+        "yearly": ROW,
+        "weekly": ROW,
+        "kpi": KPI,
+        "series": {"water": [0.1, None]},
+        "comparisons": {"month_to_date": ROW},
+        "year_to_date": {"meter_1": [1.0, None]},
+    })
+    assert ObjectData.parse(data.to_payload()) == data
+
+
+@pytest.mark.parametrize("sections", [
+    {"yearly": {"values": [1.0]}},
+    {"yearly": {"values": [1.0, 2.0]}},
+    {"weekly": {"values": ["1.0", 2.0], "comparisonValues": [1.0, 2.0]}},
+    {"weekly": {"values": [True, 2.0], "comparisonValues": [1.0, 2.0]}},
+    {"kpi": {"total": 1.0, "rooms": [{"label": "Hall"}]}},
+    {"kpi": {"total": 1.0, "meters": [{"object": {"group": None}, "value": 1.0}]}},
+    {"series": {"energy": ["1"]}},
+    {"comparisons": {"month_to_date": {"values": None}}},
+])
+def test_unexpected_sections_raise_parse_error(sections):
+    """A section that does not look like Techem's response is one parse error, not a KeyError later."""
+    with pytest.raises(TechemParseError):
+        ObjectData.parse(sections)
+
+
+def test_derived_consumption_values():
+    """Periods and comparison windows get rounded totals, percentage changes and the weekly daily average."""
+    values = ObjectData.parse({"yearly": ROW, "weekly": ROW, "comparisons": {"rolling_30_days": ROW}}).values
+    assert values["energy_yearly"] == 1234.6
+    assert values["water_yearly"] == 12.346
+    assert values["energy_yearly_comparison"] == 1000.0
+    assert values["energy_comparison_yearly"] == 23.0
+    assert values["water_comparison_yearly"] == -18.0
+    assert values["energy_daily_average"] == 176.4
+    assert values["water_daily_average"] == 1.764
+    assert values["energy_comparison_rolling_30_days"] == 23.0
+
+
+@pytest.mark.parametrize(("current", "previous", "change"), [
+    (10.0, 0.0, None),
+    (10.0, -5.0, None),
+    (0.1 + 0.2, 0.3, 0.0),
+    (5.0, 10.0, -50.0),
+])
+def test_percentage_change(current, previous, change):
+    """No comparison total gives no percentage, and equal totals give 0, not -0."""
+    row = {"values": [current, 0.0], "comparisonValues": [previous, 0.0]}
+    values = ObjectData.parse({"yearly": row}).values
+    assert values["energy_comparison_yearly"] == change
+    assert str(change) == str(values["energy_comparison_yearly"])
+
+
+def test_derived_kpi_values():
+    """KPI comparisons are percentage changes of the total, none while the total is zero."""
+    values = ObjectData.parse({"kpi": KPI}).values
+    assert values["heat_total"] == 30.0
+    assert values["comparison_previous_period"] == 50.0
+    assert values["comparison_previous_year"] == -25.0
+    assert values["comparison_property"] == 0.0
+    assert values["room_living_room"] == 20.0
+    assert values["meter_3"] == 10.0
+
+    values = ObjectData.parse({"kpi": {**KPI, "total": 0}}).values
+    assert values["comparison_previous_period"] is None
+
+
+def test_derived_series_windows():
+    """Series windows sum their known days, rounded per quantity, and are unknown without any."""
+    days = [None] * 23 + [1.0] * 6 + [0.123456]
+    values = ObjectData.parse({"series": {"water": days, "meter_1": [None] * 30, "heat": [2.25] * 40}}).values
+    assert values["water_yesterday"] == 0.123
+    assert values["water_last_7_days"] == 6.123
+    assert values["water_last_30_days"] == 6.123
+    assert values["meter_1_yesterday"] is None
+    assert values["meter_1_last_30_days"] is None
+    assert values["heat_last_7_days"] == 15.8
+    assert values["heat_last_30_days"] == 67.5
+
+
+def test_no_sections_no_values():
+    """Sections that are missing leave their keys out, so sensors read None."""
+    assert ObjectData.parse({}).values == {}
+
+
+def test_year_to_date_of_meters_and_rooms():
+    """Rooms sum their meters' year-to-date totals, which stay unknown while one meter's is."""
+    data = ObjectData.parse({
+        "kpi": KPI,
+        "year_to_date": {"meter_1": [100.04, 90.0], "meter_2": [50.0, None], "meter_3": [None, None]},
+    })
+    assert data.values["meter_1_this_year"] == 100.0
+    assert data.values["meter_2_same_period_last_year"] is None
+    assert data.values["room_living_room_this_year"] == 150.0
+    assert data.values["room_living_room_same_period_last_year"] is None
+    assert data.values["room_bath_this_year"] is None
+    assert ObjectData.parse(data.to_payload()) == data
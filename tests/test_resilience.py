@@ -0,0 +1,176 @@
+"""Tests for the circuit breaker, rate limiter and client registry around Techem requests."""
+from __future__ import annotations
+import asyncio
+import time
+import pytest
+from custom_components.techem.clients import TechemClientRegistry
+from custom_components.techem.resilience import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    TokenBucket,
+    in_background,
+    request_priority,
+)
+from custom_components.techem.techem_api import (
+    TechemAPI,
+    TechemAuthError,
+    TechemCircuitOpenError,
+    TechemGraphQLError,
+    TechemTransientError,
+)
+
+
+def _half_open_api() -> TechemAPI:
+    """Return a client whose breaker lets one trial request through."""
+    api = TechemAPI(None, "test@example.com", "password", "dk")
+    api.breaker.failures = api.breaker.threshold
+    api.breaker.opened_at = time.monotonic() - api.breaker.reset_after
+    assert api.breaker.state == "half_open"
+    return api
+
+
+@pytest.mark.parametrize("error", [TechemAuthError("rejected"), TechemGraphQLError("bad query")])
+async def test_rejected_trial_closes_breaker(monkeypatch, error):
+    """A trial the endpoint answers with an error proves it is up."""
+    api = _half_open_api()
+
+    async def post(*args):
+        raise error
+
+    monkeypatch.setattr(api, "_post", post)
+    with pytest.raises(type(error)):
+        await api._request(None, b"{}", {})
+    assert api.breaker.state == "closed"
+    assert api.breaker.allow()
+
+
+async def test_failed_trial_opens_breaker(monkeypatch):
+    """A trial that fails transiently opens the breaker again."""
+    api = _half_open_api()
+
+    async def post(*args):
+        raise TechemTransientError("down")
+
+    monkeypatch.setattr(api, "_post", post)
+    with pytest.raises(TechemCircuitOpenError):
+        await api._request(None, b"{}", {})
+    assert api.breaker.state == "open"
+
+
+async def test_cancelled_trial_releases_breaker(monkeypatch):
+    """A trial that is cancelled lets the next request try."""
+    api = _half_open_api()
+    started = asyncio.Event()
+
+    async def post(*args):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(api, "_post", post)
+    task = asyncio.ensure_future(api._request(None, b"{}", {}))
+    await started.wait()
+    assert not api.breaker.allow()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert api.breaker.state == "half_open"
+    assert api.breaker.allow()
+
+
+async def test_waiting_requests_are_served_by_priority():
+    """Interactive requests overtake background ones that waited longer; equal ones keep their order."""
+    bucket = TokenBucket(rate=100, burst=1)
+    await bucket.acquire()
+    served = []
+
+    async def request(name: str, priority: int):
+        request_priority.set(priority)
+        await bucket.acquire()
+        served.append(name)
+
+    tasks = []
+    for name, priority in (("poll 1", PRIORITY_BACKGROUND), ("poll 2", PRIORITY_BACKGROUND), ("user", PRIORITY_INTERACTIVE)):
+        tasks.append(asyncio.create_task(request(name, priority)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    assert served == ["user", "poll 1", "poll 2"]
+    assert bucket.waited == 3
+
+
+async def test_cancelled_waiter_gives_up_its_place():
+    """A waiter cancelled before its token came takes none from the next one."""
+    bucket = TokenBucket(rate=100, burst=1)
+    await bucket.acquire()
+    cancelled = asyncio.create_task(bucket.acquire(PRIORITY_INTERACTIVE))
+    waiting = asyncio.create_task(bucket.acquire(PRIORITY_BACKGROUND))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.wait_for(waiting, 1)
+    assert cancelled.cancelled()
+
+
+async def test_cancelled_grant_returns_token():
+    """A waiter cancelled after it was handed a token puts the token back."""
+    bucket = TokenBucket(rate=20, burst=1)
+    await bucket.acquire()
+    waiter = asyncio.create_task(bucket.acquire())
+    await asyncio.sleep(0)
+    bucket._tokens = 1
+    bucket._release()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert bucket._tokens >= 1
+    # Let the timer of the waiter run out
+    await asyncio.sleep(0.1)
+
+
+async def test_in_background_resets_priority_of_tasks():
+    """A task started through in_background runs at background priority, leaving the caller's alone."""
+
+    async def priority():
+        return request_priority.get()
+
+    token = request_priority.set(PRIORITY_INTERACTIVE)
+    try:
+        assert await in_background(asyncio.create_task, priority()) == PRIORITY_BACKGROUND
+        assert await asyncio.create_task(priority()) == PRIORITY_INTERACTIVE
+        assert request_priority.get() == PRIORITY_INTERACTIVE
+    finally:
+        request_priority.reset(token)
+
+
+def test_registry_shares_clients_per_account():
+    """Entries of an account share one client, and every account of a host shares the rate limiter."""
+    registry = TechemClientRegistry(None)
+    api = registry.acquire("Test@example.com", "password", "dk")
+    assert registry.acquire("test@example.com", "password", "dk") is api
+    other = registry.acquire("other@example.com", "password", "dk")
+    assert other is not api
+    assert other.limiter is api.limiter is registry.limiter("dk")
+    assert registry.acquire("test@example.com", "password", "no") is not api
+
+
+def test_registry_takes_only_validated_password():
+    """Another entry's password does not replace the client's; a validated one does and drops the old token."""
+    registry = TechemClientRegistry(None)
+    api = registry.acquire("test@example.com", "new", "dk")
+    api.token_manager.set("token")
+    assert registry.acquire("test@example.com", "old", "dk") is api
+    assert api.password == "new"
+    assert api.token_manager.token == "token"
+    registry.set_password("Test@example.com", "newer", "dk")
+    assert api.password == "newer"
+    assert not api.token_manager.token
+
+
+def test_registry_release_drops_unused_client():
+    """A client lives until the last entry using it releases it."""
+    registry = TechemClientRegistry(None)
+    api = registry.acquire("test@example.com", "password", "dk")
+    registry.acquire("test@example.com", "password", "dk")
+    registry.release(api)
+    assert registry.acquire("test@example.com", "password", "dk") is api
+    registry.release(api)
+    registry.release(api)
+    assert registry.acquire("test@example.com", "password", "dk") is not api
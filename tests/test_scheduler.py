@@ -0,0 +1,41 @@
+"""Tests for the adaptive poll schedule."""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from custom_components.techem.scheduler import AdaptivePollScheduler
+
+START = datetime(2026, 3, 2, 10)
+
+
+def _published(day: str) -> dict:
+    """Return published values whose last day is day."""
+    return {"object": {"water": [day, 0.1]}}
+
+
+def test_learns_publish_hour():
+    """The hours between the last unchanged poll and a changed one are learned."""
+    scheduler = AdaptivePollScheduler()
+    for day in range(5):
+        morning = START + timedelta(days=day)
+        scheduler.succeeded(_published(f"day {day - 1}"), morning - timedelta(hours=1))
+        scheduler.succeeded(_published(f"day {day}"), morning)
+    assert scheduler.publish_hours == [9]
+
+
+def test_unchanged_days_learn_nothing():
+    """Polls across midnight, which leave the published days as they were, teach no hour."""
+    scheduler = AdaptivePollScheduler()
+    for hour in range(72):
+        scheduler.succeeded(_published("day 0"), START + timedelta(hours=hour))
+    assert scheduler.as_dict()["observations"] == 0
+
+
+def test_first_poll_after_restart_learns_nothing():
+    """A changed fingerprint on the first poll after a restart does not teach the startup hour."""
+    scheduler = AdaptivePollScheduler()
+    scheduler.succeeded(_published("day 0"), START)
+    restarted = AdaptivePollScheduler()
+    restarted.restore(scheduler.as_dict())
+    restarted.succeeded(_published("day 1"), START + timedelta(days=1, hours=5))
+    assert restarted.as_dict()["observations"] == 0
+    restarted.succeeded(_published("day 2"), START + timedelta(days=2))
+    assert restarted.as_dict()["observations"] == 1
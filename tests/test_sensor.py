@@ -0,0 +1,107 @@
+"""Tests for the Techem sensors."""
+from __future__ import annotations
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from custom_components.techem.const import DOMAIN
+from custom_components.techem.entity import TechemEntity
+from .common import setup_entry
+
+
+async def test_diagnostic_sensors_update_without_data_change(hass: HomeAssistant, mock_techem, config_entry):
+    """The request statistics follow every refresh, also when the data stayed the same."""
+    unique_id = f"techem_{config_entry.entry_id}_diagnostic_requests"
+    registry = er.async_get(hass)
+    registry.async_get_or_create("sensor", DOMAIN, unique_id, config_entry=config_entry)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    for task in coordinator._fill_tasks.values():
+        await task
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    entity_id = registry.async_get_entity_id("sensor", DOMAIN, unique_id)
+    requests = int(hass.states.get(entity_id).state)
+
+    data = coordinator.data
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert coordinator.data == data
+    assert int(hass.states.get(entity_id).state) == requests + 1
+
+
+async def test_rooms_and_meters_follow_the_kpi_data(hass: HomeAssistant, mock_techem, config_entry):
+    """Rooms and meters Techem starts reporting get sensors without a reload; gone ones turn unavailable."""
+    mock_techem.rooms = 2
+    mock_techem.meters_per_room = 1
+    coordinator = await setup_entry(hass, config_entry)
+    registry = er.async_get(hass)
+
+    def state(key: str) -> str | None:
+        """Return the state of an object's sensor, None if it has none."""
+        entity_id = registry.async_get_entity_id("sensor", DOMAIN, f"techem_test-object_{key}")
+        return hass.states.get(entity_id).state if entity_id else None
+
+    assert state("room_room_2") not in (None, STATE_UNAVAILABLE)
+    assert state("room_room_3") is None
+    entities = len(hass.states.async_entity_ids("sensor"))
+
+    mock_techem.rooms = 3
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert state("room_room_3") not in (None, STATE_UNAVAILABLE)
+    assert state("meter_00301") not in (None, STATE_UNAVAILABLE)
+    assert len(hass.states.async_entity_ids("sensor")) == entities + 2
+
+    mock_techem.rooms = 1
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert state("room_room_1") not in (None, STATE_UNAVAILABLE)
+    assert state("room_room_2") == state("meter_00201") == STATE_UNAVAILABLE
+    assert state("room_room_3") == state("meter_00301") == STATE_UNAVAILABLE
+    assert len(hass.states.async_entity_ids("sensor")) == entities + 2
+
+
+def _count_writes(monkeypatch) -> dict[str, int]:
+    """Count the state writes of every Techem entity by entity id."""
+    writes = {}
+    write = TechemEntity.async_write_ha_state
+
+    def count(entity):
+        writes[entity.entity_id] = writes.get(entity.entity_id, 0) + 1
+        write(entity)
+
+    monkeypatch.setattr(TechemEntity, "async_write_ha_state", count)
+    return writes
+
+
+async def test_unchanged_update_skips_the_write(hass: HomeAssistant, mock_techem, config_entry, monkeypatch):
+    """An update that leaves the state as written does not write it again."""
+    mock_techem.meters_per_room = 1
+    coordinator = await setup_entry(hass, config_entry)
+    entity_id = er.async_get(hass).async_get_entity_id("sensor", DOMAIN, "techem_test-object_room_room_1")
+    writes = _count_writes(monkeypatch)
+
+    mock_techem.meters_per_room = 2
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert writes[entity_id] == 1
+    # Unlike a refresh, which skips the listeners when the data is equal, this updates every entity
+    for _ in range(2):
+        coordinator.async_set_updated_data(coordinator.data)
+    assert writes[entity_id] == 1
+
+
+async def test_availability_change_is_written(hass: HomeAssistant, mock_techem, config_entry, monkeypatch):
+    """A failed refresh writes the unchanged state as unavailable, and the next update writes it back."""
+    coordinator = await setup_entry(hass, config_entry)
+    entity_id = er.async_get(hass).async_get_entity_id("sensor", DOMAIN, "techem_test-object_room_room_1")
+    state = hass.states.get(entity_id).state
+    writes = _count_writes(monkeypatch)
+
+    coordinator.async_set_update_error(Exception("Injected failure"))
+    assert writes[entity_id] == 1
+    assert hass.states.get(entity_id).state == STATE_UNAVAILABLE
+    coordinator.async_set_updated_data(coordinator.data)
+    assert writes[entity_id] == 2
+    assert hass.states.get(entity_id).state == state
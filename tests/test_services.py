@@ -0,0 +1,54 @@
+"""Tests for the Techem refresh service."""
+from __future__ import annotations
+import asyncio
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from custom_components.techem.const import DOMAIN
+from custom_components.techem.services import SERVICE_REFRESH
+from .common import setup_entry
+
+
+async def _refresh(hass: HomeAssistant, **data) -> dict:
+    """Call the refresh service and return its response."""
+    return await hass.services.async_call(DOMAIN, SERVICE_REFRESH, data, blocking=True, return_response=True)
+
+
+async def test_repeated_scope_is_debounced(hass: HomeAssistant, mock_techem, config_entry):
+    """A scope refreshed again within the cooldown is listed as debounced and sends nothing."""
+    await setup_entry(hass, config_entry)
+    response = await _refresh(hass, scope=["weekly"])
+    assert response["refreshed"] == ["test-object"]
+    assert response["debounced"] == []
+
+    mock_techem.reset_counters()
+    response = await _refresh(hass, scope="weekly", object_ids=["test-object"])
+    assert response["refreshed"] == []
+    assert response["debounced"] == ["test-object"]
+    assert not mock_techem.operations
+
+    response = await _refresh(hass, scope=["kpi"])
+    assert response["refreshed"] == ["test-object"]
+    assert mock_techem.operations
+
+
+async def test_concurrent_calls_share_a_refresh(hass: HomeAssistant, mock_techem, config_entry):
+    """Identical calls while a scoped refresh runs wait for it instead of sending their own."""
+    coordinator = await setup_entry(hass, config_entry)
+    # Send full documents, so the refresh below is one request and not a registration too
+    coordinator.api.persisted_queries = False
+    mock_techem.reset_counters()
+
+    responses = await asyncio.gather(*(_refresh(hass, scope=["meters"]) for _ in range(3)))
+    assert all(response["refreshed"] == ["test-object"] for response in responses)
+    assert sum(mock_techem.operations.values()) == 1
+
+
+async def test_unknown_object_is_rejected(hass: HomeAssistant, mock_techem, config_entry):
+    """Object ids that no entry holds fail validation before anything is sent."""
+    await setup_entry(hass, config_entry)
+    mock_techem.reset_counters()
+
+    with pytest.raises(ServiceValidationError, match="other-object"):
+        await _refresh(hass, object_ids=["test-object", "other-object"])
+    assert not mock_techem.operations
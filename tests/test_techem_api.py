@@ -0,0 +1,273 @@
+"""Tests for how Techem responses are classified and tokens cached."""
+from __future__ import annotations
+import asyncio
+import json
+import time
+import pytest
+from custom_components.techem.techem_api import (
+    TechemAPI,
+    TechemAuthError,
+    TechemBadRequestError,
+    TechemError,
+    TechemForbiddenError,
+    TechemGraphQLError,
+    TechemParseError,
+    TokenManager,
+)
+from custom_components.techem.templates import BATCH, KPI, LOGIN, TENANT_TABLE, daily_template
+
+
+def _api() -> TechemAPI:
+    """Return a client that is never connected."""
+    return TechemAPI(None, "test@example.com", "password", "dk")
+
+
+def _errors(code: str) -> bytes:
+    """Return a response with one GraphQL error of the given code and no data."""
+    return json.dumps({"errors": [{"message": "Not allowed", "extensions": {"code": code}}]}).encode()
+
+
+@pytest.mark.parametrize(("status", "raw", "error"), [
+    (401, b"{}", TechemAuthError),
+    (200, _errors("UNAUTHENTICATED"), TechemAuthError),
+    (403, b"{}", TechemForbiddenError),
+    (200, _errors("FORBIDDEN"), TechemForbiddenError),
+])
+def test_auth_and_access_errors(status, raw, error):
+    """Only 401 and UNAUTHENTICATED reject the token; 403 and FORBIDDEN deny access to the object."""
+    with pytest.raises(error) as raised:
+        _api()._check(status, raw, None)
+    assert type(raised.value) is error
+
+
+async def test_forbidden_object_keeps_token(monkeypatch):
+    """An object the account may not see fails without logging in again."""
+    api = _api()
+    api.token_manager.set("token")
+    logins = []
+
+    async def login():
+        logins.append(True)
+        return "new token"
+
+    async def send(payload, headers):
+        return 403, b"", None
+
+    monkeypatch.setattr(api, "_login", login)
+    monkeypatch.setattr(api, "_send", send)
+    with pytest.raises(TechemForbiddenError):
+        await api.get_kpi_data("other-object")
+    assert not logins
+    assert api.token_manager.token == "token"
+
+
+async def test_token_cache_hits_and_misses(monkeypatch):
+    """A valid cached token, or one that already replaced the rejected one, is a hit; each login is a miss."""
+    api = _api()
+
+    async def login():
+        return f"token-{api.metrics.token_misses}"
+
+    monkeypatch.setattr(api, "_login", login)
+    assert await api.get_token() == "token-1"
+    assert await api.get_token() == "token-1"
+    assert await api.get_token(force=True, rejected="token-0") == "token-1"
+    assert await api.get_token(force=True, rejected="token-1") == "token-2"
+    assert (api.metrics.token_hits, api.metrics.token_misses) == (2, 2)
+    assert api.metrics.as_dict()["token_hits"] == 2
+
+
+@pytest.mark.parametrize("raw", [b"", b"<html>Bad gateway</html>", b"[]", b"[{}]", b"42", b"null", b'"ok"',
+                                 b'{"data": []}', b'{"errors": "failed"}', b'{"errors": ["failed"]}'])
+def test_body_that_is_not_an_object(raw):
+    """A successful response must be a JSON object with GraphQL's data and errors members."""
+    with pytest.raises(TechemParseError):
+        _api()._check(200, raw, None)
+
+
+async def test_unparsable_response_is_raised(monkeypatch):
+    """get_data raises for a body that is not JSON instead of returning nothing."""
+    api = _api()
+    api.token_manager.set("token")
+
+    async def send(payload, headers):
+        return 200, b"<html>Maintenance</html>", None
+
+    monkeypatch.setattr(api, "_send", send)
+    with pytest.raises(TechemParseError):
+        await api.get_data("object", yearly=True)
+
+
+KPI_DATA = {"data": {"unitQuantityKpis": {"total": 1}}}
+
+
+def _persisted_api(monkeypatch, responses: list[tuple[int, dict]]) -> tuple[TechemAPI, list[str]]:
+    """Return a client answering with responses in turn, then with KPI data, and the bodies it sent.
+
+    Each body sent is recorded as persisted (hash only), register (hash
+    and document) or full (document only).
+    """
+    api = _api()
+    api.token_manager.set("token")
+    sent = []
+
+    async def send(payload, headers):
+        body = json.loads(payload)
+        if "extensions" not in body:
+            sent.append("full")
+        else:
+            sent.append("register" if "query" in body else "persisted")
+        status, response = responses.pop(0) if responses else (200, KPI_DATA)
+        return status, json.dumps(response).encode(), None
+
+    monkeypatch.setattr(api, "_send", send)
+    return api, sent
+
+
+async def test_persisted_query_is_registered_once(monkeypatch):
+    """An unknown hash is registered with the document, then sent alone."""
+    api, sent = _persisted_api(monkeypatch, [(200, {"errors": [{"message": "PersistedQueryNotFound"}]})])
+    await api.get_kpi_data("object")
+    await api.get_kpi_data("other-object")
+    assert sent == ["persisted", "register", "persisted"]
+    assert api.persisted_queries is True
+
+
+async def test_persisted_query_cache_miss_registers_again(monkeypatch):
+    """A hash the endpoint forgot is registered again without turning persisted queries off."""
+    api, sent = _persisted_api(monkeypatch, [
+        (200, KPI_DATA),
+        (200, {"errors": [{"message": "PersistedQueryNotFound"}]}),
+    ])
+    await api.get_kpi_data("object")
+    await api.get_kpi_data("object")
+    assert sent == ["persisted", "persisted", "register"]
+    assert api.persisted_queries is True
+
+
+@pytest.mark.parametrize(("status", "response"), [
+    (400, {"errors": [{"message": "Unknown field extensions"}]}),
+    (400, {}),
+    (200, {"errors": [{"message": "PersistedQueryNotSupported"}]}),
+    (400, {"errors": [{"message": "PersistedQueryNotSupported"}]}),
+    (200, {"errors": [{"message": "Must provide query string."}]}),
+    (200, {"errors": [{"message": "Syntax Error: Unexpected <EOF>."}]}),
+])
+async def test_persisted_queries_not_supported(monkeypatch, status, response):
+    """An endpoint without persisted queries gets full documents from then on."""
+    api, sent = _persisted_api(monkeypatch, [(status, response)])
+    assert await api.get_kpi_data("object") == {"total": 1}
+    await api.get_kpi_data("other-object")
+    assert sent == ["persisted", "full", "full"]
+    assert api.persisted_queries is False
+
+
+@pytest.mark.parametrize(("status", "error"), [(400, TechemBadRequestError), (200, TechemGraphQLError)])
+async def test_failed_fallback_keeps_persisted_queries(monkeypatch, status, error):
+    """An error that the full document gets too is raised and does not turn persisted queries off."""
+    bad = (status, {"errors": [{"message": "Variable objectId is invalid"}]})
+    api, sent = _persisted_api(monkeypatch, [bad, bad])
+    with pytest.raises(error, match="objectId"):
+        await api.get_kpi_data("object")
+    assert sent == ["persisted", "full"]
+    assert api.persisted_queries is None
+
+
+@pytest.mark.parametrize(("status", "response", "error"), [
+    (200, {"errors": [{"message": "Not allowed", "extensions": {"code": "FORBIDDEN"}}]}, TechemForbiddenError),
+    (404, {}, TechemError),
+])
+async def test_other_errors_keep_persisted_queries(monkeypatch, status, response, error):
+    """Access and transport errors are raised as is, with persisted queries left as they were."""
+    api, sent = _persisted_api(monkeypatch, [(status, response)])
+    with pytest.raises(error) as raised:
+        await api.get_kpi_data("object")
+    assert type(raised.value) is error
+    assert sent == ["persisted"]
+    assert api.persisted_queries is None
+
+
+def _gated_api(monkeypatch) -> tuple[TechemAPI, asyncio.Event, list[bytes]]:
+    """Return a client whose requests wait for a gate, the gate, and the bodies sent."""
+    api = _api()
+    api.token_manager.set("token")
+    gate = asyncio.Event()
+    sent = []
+
+    async def send(payload, headers):
+        sent.append(payload)
+        await gate.wait()
+        return 200, json.dumps(KPI_DATA).encode(), None
+
+    monkeypatch.setattr(api, "_send", send)
+    return api, gate, sent
+
+
+async def test_identical_requests_share_one_post(monkeypatch):
+    """Concurrent identical queries send one request and get the same result; other variables do not share it."""
+    api, gate, sent = _gated_api(monkeypatch)
+    calls = [asyncio.create_task(api.get_kpi_data(object_id)) for object_id in ("object", "object", "other")]
+    await asyncio.sleep(0)
+    gate.set()
+    first, second, other = await asyncio.gather(*calls)
+    assert first is second
+    assert other == first
+    assert len(sent) == 2
+    assert api.metrics.coalesced == 1
+    assert not api._in_flight
+
+
+async def test_cancelled_caller_leaves_shared_post_running(monkeypatch):
+    """A caller that is cancelled does not cancel the request another caller still waits for."""
+    api, gate, sent = _gated_api(monkeypatch)
+    cancelled = asyncio.create_task(api.get_kpi_data("object"))
+    waiting = asyncio.create_task(api.get_kpi_data("object"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    gate.set()
+    assert await waiting == KPI_DATA["data"]["unitQuantityKpis"]
+    assert cancelled.cancelled()
+    assert len(sent) == 1
+
+
+async def test_post_is_cancelled_with_its_last_caller(monkeypatch):
+    """Once every caller is cancelled the shared request is cancelled and forgotten."""
+    api, gate, sent = _gated_api(monkeypatch)
+    calls = [asyncio.create_task(api.get_kpi_data("object")) for _ in range(2)]
+    await asyncio.sleep(0)
+    flight = next(iter(api._in_flight.values()))[0]
+    for call in calls:
+        call.cancel()
+    await asyncio.gather(*calls, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert flight.cancelled()
+    assert not api._in_flight
+
+    gate.set()
+    await api.get_kpi_data("object")
+    assert len(sent) == 2
+
+
+def test_documents_have_their_own_operation_names():
+    """Metrics and the endpoint tell every document apart by its operation name."""
+    templates = [LOGIN, TENANT_TABLE, KPI, BATCH] + [daily_template(2, True, kpi) for kpi in (False, True)]
+    names = [template.name for template in templates]
+    assert len(set(names)) == len(names)
+
+
+def test_message_mentioning_token_is_not_auth_error():
+    """Only the error code is trusted, not words in the message."""
+    raw = json.dumps({"errors": [{"message": "Invalid token in field periodToken"}]}).encode()
+    with pytest.raises(TechemGraphQLError):
+        _api()._check(200, raw, None)
+
+
+def test_restore_keeps_later_token():
+    """A stored token replaces a valid cached one only if it expires later."""
+    manager = TokenManager()
+    manager.token, manager.expires_at = "current", time.time() + 3600
+    manager.restore({"token": "older", "expires_at": time.time() + 1800})
+    assert manager.token == "current"
+    manager.restore({"token": "newer", "expires_at": time.time() + 7200})
+    assert manager.token == "newer"